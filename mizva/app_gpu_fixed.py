@@ -7,10 +7,17 @@ from pathlib import Path
 import numpy as np
 import cv2
 import json
+import math
 import threading
 import time
+import random
+import re
+import shutil
+import subprocess
 from collections import deque
-from typing import Dict, Any, Optional
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional, Tuple
 import queue
 
 # Ensure project root is on sys.path so we can import local packages (mizva.*)
@@ -31,6 +38,39 @@ except ImportError:
     # Fallback to direct import
     import db as dbm
 
+try:
+    from mizva.frame_ring import DecoderProcess, PtsClock
+except ImportError:
+    from frame_ring import DecoderProcess, PtsClock
+try:
+    from mizva.camera_schedule import (CameraSchedule, SCHEDULE_ACTIVE, SCHEDULE_PAUSED, SCHEDULE_REDUCED,
+                                       SCHEDULE_SNAPSHOT, parse_schedule)
+except ImportError:
+    from camera_schedule import (CameraSchedule, SCHEDULE_ACTIVE, SCHEDULE_PAUSED, SCHEDULE_REDUCED,
+                                 SCHEDULE_SNAPSHOT, parse_schedule)
+try:
+    from mizva.face_boxes import merge_faces
+except ImportError:
+    from face_boxes import merge_faces
+try:
+    from mizva.face_tracking import FaceTracker
+except ImportError:
+    from face_tracking import FaceTracker
+try:
+    from mizva.frame_sources import (PushFrameQueue, RtspSource, SOURCE_PUSH, SOURCE_RTSP,
+                                     open_local_source, probe_isolated, source_kind)
+except ImportError:
+    from frame_sources import (PushFrameQueue, RtspSource, SOURCE_PUSH, SOURCE_RTSP,
+                               open_local_source, probe_isolated, source_kind)
+try:
+    from mizva.inference import InferenceService, embed_faces
+except ImportError:
+    from inference import InferenceService, embed_faces
+try:
+    from mizva.inference_pool import CpuInferencePool
+except ImportError:
+    from inference_pool import CpuInferencePool
+
 # Global quality threshold (default 0.4)
 QUALITY_THRESHOLD = 0.4
 
@@ -107,6 +147,10 @@ except Exception as e:
     except Exception as e2:
         print(f"❌ All import attempts failed: {e2}")
         raise ImportError("Could not import FaceAnalysis from any source")
+try:
+    from insightface.app.common import Face  # type: ignore
+except Exception:
+    Face = None  # only needed by the split detect/embed path
 import uuid
 
 app = Flask(__name__)
@@ -161,6 +205,48 @@ except Exception as e:
     fa.prepare(ctx_id=-1, det_size=(640,640))  # ctx_id=-1 for CPU fallback
     print("✅ FaceAnalysis initialized with CPU fallback (ctx_id=-1)")
 
+# Camera workers detect through one scheduler that batches frames (and tiles) from all
+# cameras: up to INFERENCE_MAX_BATCH per run, waiting at most INFERENCE_MAX_WAIT_MS to fill it
+INFERENCE_MAX_BATCH = 8
+INFERENCE_MAX_WAIT_MS = 4.0
+INFERENCE = InferenceService(fa.det_model, INFERENCE_MAX_BATCH, INFERENCE_MAX_WAIT_MS)
+INFERENCE.start()
+# Recognition runs one ArcFace forward pass per RECOGNITION_MAX_BATCH aligned face chips
+RECOGNITION_MAX_BATCH = 32
+
+# Detector input-size profiles (square, like det_size) a camera can pick with det_profile:
+# near-field cameras detect at 320/480, wide 4K scenes at 1024. One detector session serves
+# all of them; a model exported with a fixed input size only offers that size.
+DET_PROFILES = (320, 480, 640, 1024)
+DET_PROFILE_DEFAULT = 640
+_det_shape = getattr(fa.det_model, 'input_shape', None)
+if _det_shape is not None and isinstance(_det_shape[2], int):
+    DET_PROFILE_SIZES = (int(_det_shape[3]),)
+    DET_PROFILE_DEFAULT = DET_PROFILE_SIZES[0]
+else:
+    DET_PROFILE_SIZES = DET_PROFILES
+    for _size in DET_PROFILE_SIZES:  # warm up each input shape once (allocations, cuDNN autotune)
+        try:
+            fa.det_model.detect(np.zeros((_size, _size, 3), dtype=np.uint8), input_size=(_size, _size),
+                                max_num=0, metric='default')
+        except Exception as e:
+            print(f"⚠️ Detector warm-up at {_size}x{_size} failed: {e}")
+DET_MODEL_VERSION = 'insightface-buffalo_l'
+
+# CPU-only boxes: detection and recognition run in CPU_POOL_WORKERS processes with
+# CPU_POOL_THREADS intra-op threads each, instead of every thread sharing fa's sessions
+CPU_POOL_THREADS = 2
+CPU_POOL_WORKERS = max(1, (os.cpu_count() or 1) // CPU_POOL_THREADS)
+try:
+    _cpu_only = all(p == 'CPUExecutionProvider'
+                    for m in fa.models.values() for p in m.session.get_providers())
+except Exception:
+    _cpu_only = False
+CPU_POOL = CpuInferencePool(CPU_POOL_WORKERS, CPU_POOL_THREADS, DET_PROFILE_DEFAULT,
+                            max(DET_PROFILE_SIZES), RECOGNITION_MAX_BATCH)
+if _cpu_only and CPU_POOL_WORKERS > 1:
+    CPU_POOL.start()  # workers load their models in the background; fa serves until then
+
 # Helpers
 IMAGES_DIR = DATA_DIR / "images"
 IMAGES_DIR.mkdir(parents=True, exist_ok=True)
@@ -170,12 +256,294 @@ def _normalize(v: np.ndarray) -> np.ndarray:
     return (v / n).astype(np.float32)
 
 def _face_embedding(img: np.ndarray):
-    faces = fa.get(img)
+    faces = _analyze_faces(img)
     if not faces:
         return None, None
     face = faces[0]
     return _normalize(face.embedding), face.bbox.astype(int).tolist()
 
+def _detect_faces(img: np.ndarray, cam_id: Optional[str] = None, det_size: Optional[int] = None) -> list:
+    """Run only the detector stage of fa.get(); the returned faces have no embedding yet."""
+    return _detect_faces_many([img], cam_id, det_size)[0]
+
+def _detect_faces_many(imgs: list, cam_id: Optional[str] = None, det_size: Optional[int] = None) -> list:
+    """Detector stage for several images (e.g. tiles), one face list each. Camera workers pass
+    their cam_id and go through the shared INFERENCE scheduler, which batches across cameras;
+    on CPU-only boxes everything goes to the CPU_POOL processes instead.
+    det_size: detector input profile (None = the size fa was prepared with)."""
+    input_size = (det_size, det_size) if det_size else None
+    results = None
+    if CPU_POOL.running:
+        try:
+            results = CPU_POOL.detect_many(imgs, input_size)
+        except Exception as e:
+            print(f"⚠️ CPU pool detection failed, using the in-process model: {e}")
+    if results is None and cam_id is not None:
+        results = INFERENCE.detect_many(cam_id, imgs, input_size=input_size)
+    elif results is None:
+        results = [fa.det_model.detect(img, input_size=input_size, max_num=0, metric='default') for img in imgs]
+    out = []
+    for bboxes, kpss in results:
+        faces = []
+        for i in range(bboxes.shape[0]):
+            kps = kpss[i] if kpss is not None else None
+            faces.append(Face(bbox=bboxes[i, 0:4], kps=kps, det_score=bboxes[i, 4]))
+        out.append(faces)
+    return out
+
+def _embed_faces(img: np.ndarray, faces: list) -> None:
+    """Run the remaining fa.get() stages (recognition) on detected faces, in place."""
+    _embed_faces_many([(img, face) for face in faces])
+
+def _embed_faces_many(items: list) -> None:
+    """_embed_faces() for (image, face) pairs from one or several frames; the recognition
+    model sees all their chips batched (see inference.embed_faces)."""
+    if not items:
+        return
+    if CPU_POOL.running:
+        try:
+            CPU_POOL.embed_faces(items)
+            return
+        except Exception as e:
+            print(f"⚠️ CPU pool recognition failed, using the in-process model: {e}")
+    for taskname, model in fa.models.items():
+        if taskname == 'detection':
+            continue
+        if taskname == 'recognition':
+            embed_faces(model, items, RECOGNITION_MAX_BATCH)
+        else:
+            for img, face in items:
+                model.get(img, face)
+
+def _analyze_faces(img: np.ndarray) -> list:
+    """fa.get(): detection + recognition, on the CPU pool's processes when it runs."""
+    if not CPU_POOL.running:
+        return fa.get(img)
+    faces = _detect_faces(img)
+    _embed_faces(img, faces)
+    return faces
+
+def _scale_faces(faces: list, sx: float, sy: float) -> None:
+    """Map detections from one frame size to another (bbox and landmarks), in place."""
+    for face in faces:
+        face.bbox = face.bbox * np.array([sx, sy, sx, sy], dtype=np.float32)
+        if face.kps is not None:
+            face.kps = face.kps * np.array([sx, sy], dtype=np.float32)
+
+def _offset_faces(faces: list, dx: float, dy: float) -> None:
+    """Map detections from a crop back to the frame it was cut from, in place."""
+    for face in faces:
+        face.bbox = face.bbox + np.array([dx, dy, dx, dy], dtype=np.float32)
+        if face.kps is not None:
+            face.kps = face.kps + np.array([dx, dy], dtype=np.float32)
+
+def _parse_roi(value) -> Optional[list]:
+    """Validate detection zones: a list of polygons [[x, y], ...] or rectangles [x1, y1, x2, y2]
+    in normalized 0..1 frame coordinates. Returns a list of polygons, None for "whole frame".
+    Raises ValueError."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    if not isinstance(value, list):
+        raise ValueError('roi must be a list of polygons or rectangles')
+    polys = []
+    for zone in value:
+        if isinstance(zone, list) and len(zone) == 4 and all(isinstance(v, (int, float)) for v in zone):
+            x1, y1, x2, y2 = (float(v) for v in zone)
+            zone = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+        try:
+            pts = [[float(x), float(y)] for x, y in zone]
+        except (TypeError, ValueError):
+            raise ValueError('roi zones must be [[x, y], ...] or [x1, y1, x2, y2]')
+        if len(pts) < 3 or not all(0.0 <= v <= 1.0 for p in pts for v in p):
+            raise ValueError('roi zones need >= 3 points with coordinates in 0..1')
+        polys.append(pts)
+    return polys or None
+
+
+def _parse_det_profile(value) -> str:
+    """Validate a detector profile: one of DET_PROFILE_SIZES (as text) or 'auto'. Raises ValueError."""
+    profile = str(value).strip().lower()
+    if profile == 'auto' or (profile.isdigit() and int(profile) in DET_PROFILE_SIZES):
+        return profile
+    raise ValueError(f"det_profile must be 'auto' or one of {list(DET_PROFILE_SIZES)}")
+
+
+def _stored_det_profile(value) -> str:
+    """A camera record's det_profile as this detector can run it: NULL (never set) and sizes
+    a fixed-shape model does not offer mean the default profile."""
+    try:
+        return _parse_det_profile(value) if value is not None else str(DET_PROFILE_DEFAULT)
+    except ValueError:
+        return str(DET_PROFILE_DEFAULT)
+
+
+def _parse_tiling(value) -> Optional[dict]:
+    """Validate a tiled-detection layout, e.g. {"cols": 3, "rows": 2, "overlap": 0.2,
+    "full_frame": true, "nms_iou": 0.4}. Returns the completed layout, None for "off".
+    Raises ValueError."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    if not value:
+        return None
+    if not isinstance(value, dict):
+        raise ValueError('tiling must be an object like {"cols": 2, "rows": 2}')
+    try:
+        spec = {
+            'cols': int(value.get('cols', 2)),
+            'rows': int(value.get('rows', 2)),
+            'overlap': float(value.get('overlap', 0.2)),
+            'full_frame': bool(value.get('full_frame', True)),
+            'nms_iou': float(value.get('nms_iou', 0.4)),
+        }
+    except (TypeError, ValueError):
+        raise ValueError('tiling cols/rows must be integers and overlap/nms_iou numbers')
+    if not (1 <= spec['cols'] <= 8 and 1 <= spec['rows'] <= 8) or spec['cols'] * spec['rows'] < 2:
+        raise ValueError('tiling needs 1..8 cols and rows and at least 2 tiles')
+    if not 0.0 <= spec['overlap'] <= 0.5:
+        raise ValueError('tiling overlap must be in 0..0.5')
+    if not 0.0 < spec['nms_iou'] <= 1.0:
+        raise ValueError('tiling nms_iou must be in (0, 1]')
+    return spec
+
+
+def _tile_rects(w: int, h: int, cols: int, rows: int, overlap: float) -> list:
+    """cols x rows tiles covering a w x h frame, neighbours overlapping by the given fraction."""
+    tw = w / (cols - (cols - 1) * overlap)
+    th = h / (rows - (rows - 1) * overlap)
+    rects = []
+    for r in range(rows):
+        for c in range(cols):
+            x1, y1 = int(round(c * tw * (1 - overlap))), int(round(r * th * (1 - overlap)))
+            rects.append((x1, y1, min(w, int(round(x1 + tw))), min(h, int(round(y1 + th)))))
+    return rects
+
+
+class DetectionZone:
+    """Per-camera ROI: crops the detector input to the zones' bounding box and drops faces outside.
+
+    detect runs on the crop: _detect_faces, or a TiledDetector's detect to tile only the ROI.
+    input_side is the long side of the last crop detected on.
+    """
+
+    def __init__(self, polygons: list, detect: Optional[Callable[[np.ndarray], list]] = None):
+        self.polygons = polygons
+        self._detect = detect or _detect_faces
+        self._size = None
+        self._px: list = []
+        self._crop = (0, 0, 0, 0)
+        self.input_side = 0
+        self.faces_dropped = 0
+
+    def _for_size(self, w: int, h: int):
+        if self._size != (w, h):
+            self._px = [np.array([[x * w, y * h] for x, y in poly], dtype=np.float32) for poly in self.polygons]
+            allpts = np.concatenate(self._px)
+            x1, y1 = np.floor(allpts.min(axis=0)).astype(int)
+            x2, y2 = np.ceil(allpts.max(axis=0)).astype(int)
+            self._crop = (max(0, x1), max(0, y1), min(w, x2), min(h, y2))
+            self._size = (w, h)
+        return self._crop
+
+    def contains(self, x: float, y: float) -> bool:
+        return any(cv2.pointPolygonTest(p, (float(x), float(y)), False) >= 0 for p in self._px)
+
+    def detect(self, frame: np.ndarray) -> list:
+        """Detect on the zone's bounding crop; boxes come back in full-frame coordinates."""
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = self._for_size(w, h)
+        self.input_side = int(max(x2 - x1, y2 - y1))
+        if x2 - x1 < 16 or y2 - y1 < 16:
+            return []
+        faces = self._detect(frame[y1:y2, x1:x2])
+        _offset_faces(faces, x1, y1)
+        kept = []
+        for face in faces:
+            cx, cy = (face.bbox[0] + face.bbox[2]) / 2, (face.bbox[1] + face.bbox[3]) / 2
+            if self.contains(cx, cy):
+                kept.append(face)
+            else:
+                self.faces_dropped += 1
+        return kept
+
+
+class TiledDetector:
+    """Detection on overlapping tiles of the frame (plus the whole frame, for faces larger than a
+    tile), merged with NMS. Each tile gets the detector's full input size, so small faces in 4K
+    and wide-angle frames are not shrunk away as they are when the whole frame is resized.
+    input_side is the long side of a tile in the last frame detected on."""
+
+    def __init__(self, spec: dict, cam_id: Optional[str] = None):
+        self.spec = spec
+        self.cam_id = cam_id
+        self._size = None
+        self._tiles: list = []
+        self.input_side = 0
+        self.tiles_run = 0
+
+    def tiles_for(self, w: int, h: int) -> list:
+        if self._size != (w, h):
+            self._tiles = _tile_rects(w, h, self.spec['cols'], self.spec['rows'], self.spec['overlap'])
+            self._size = (w, h)
+        return self._tiles
+
+    def detect(self, frame: np.ndarray, det_size: Optional[int] = None) -> list:
+        h, w = frame.shape[:2]
+        tiles = self.tiles_for(w, h)
+        x1, y1, x2, y2 = tiles[0]
+        self.input_side = max(x2 - x1, y2 - y1)
+        # all tiles (and the full frame) go to the scheduler together, so they share batches
+        imgs = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+        if self.spec['full_frame']:
+            imgs.append(frame)
+        results = _detect_faces_many(imgs, self.cam_id, det_size)
+        faces = results[len(tiles)] if self.spec['full_frame'] else []
+        for (x1, y1, _, _), tile_faces in zip(tiles, results):
+            _offset_faces(tile_faces, x1, y1)
+            faces.extend(tile_faces)
+        self.tiles_run += len(tiles)
+        return merge_faces(faces, self.spec['nms_iou'])
+
+
+class AutoDetSize:
+    """Detector input size for det_profile='auto': the smallest profile at which the camera's
+    small faces (10th percentile height, relative to the detector input's long side) still come
+    out MIN_FACE_PX tall. Starts at the default profile; every RECHECK_S (CALIBRATE_S until
+    MIN_SAMPLES faces are in) one frame runs at the largest profile. Only those frames are
+    sampled: a smaller profile misses exactly the small faces, and learning from its own
+    detections would keep pulling the size further down."""
+
+    MIN_FACE_PX = 40
+    MIN_SAMPLES = 8
+    RECHECK_S = 60.0
+    CALIBRATE_S = 2.0
+
+    def __init__(self, sizes: tuple = DET_PROFILE_SIZES, default: int = DET_PROFILE_DEFAULT):
+        self.sizes = tuple(sorted(sizes))
+        self.size = default if default in self.sizes else self.sizes[-1]
+        self._heights: deque = deque(maxlen=64)
+        self._last_check = time.time()
+
+    def next_size(self, now: float) -> int:
+        interval = self.RECHECK_S if len(self._heights) >= self.MIN_SAMPLES else self.CALIBRATE_S
+        if self.size < self.sizes[-1] and now - self._last_check >= interval:
+            self._last_check = now
+            return self.sizes[-1]
+        return self.size
+
+    def observe(self, faces: list, long_side: int, det_size: int):
+        if det_size != self.sizes[-1]:
+            return
+        for f in faces:
+            self._heights.append(float(f.bbox[3] - f.bbox[1]) / max(1, long_side))
+        if len(self._heights) >= self.MIN_SAMPLES:
+            small = float(np.percentile(self._heights, 10))
+            self.size = next((s for s in self.sizes if small * s >= self.MIN_FACE_PX), self.sizes[-1])
+
+
 def _extract_face_features(face, face_crop_img=None):
     """
     Extract basic facial features - SIMPLIFIED for faster detection.
@@ -250,7 +618,7 @@ def _extract_face_features(face, face_crop_img=None):
         
         features['recognition_details'] = {
             'detection_confidence': detection_confidence,
-            'detection_threshold': 0.6,
+            'detection_threshold': float(getattr(fa.det_model, 'det_thresh', 0.5)),
             'recognition_threshold': 0.6
         }
         
@@ -273,7 +641,7 @@ def _extract_face_features(face, face_crop_img=None):
         features['processing'] = {
             'time_ms': None,
             'fps': None,
-            'model_version': 'insightface-buffalo_l'
+            'model_version': DET_MODEL_VERSION
         }
         
     except Exception as e:
@@ -287,7 +655,7 @@ def _extract_face_features(face, face_crop_img=None):
             'recognition_details': {},
             'tracking': {},
             'classification': {},
-            'processing': {'model_version': 'insightface-buffalo_l'}
+            'processing': {'model_version': DET_MODEL_VERSION}
         }
     
     return features
@@ -384,7 +752,7 @@ def detect():
     img = cv2.imread(str(fp))
     if img is None:
         return jsonify({'error':'failed to read uploaded image'}),400
-    faces = fa.get(img)
+    faces = _analyze_faces(img)
     if len(faces)==0:
         return jsonify({'error':'no faces detected'}),400
     out = []
@@ -443,8 +811,8 @@ def compare():
 
     emb1 = None
     emb2 = None
-    faces1 = fa.get(img1)
-    faces2 = fa.get(img2)
+    faces1 = _analyze_faces(img1)
+    faces2 = _analyze_faces(img2)
     # try selected embeddings first
     if sel_a:
         emb1 = load_selected_embedding('a', sel_a)
@@ -523,7 +891,7 @@ def find():
     kp = UPLOAD_DIR / 'known.jpg'
     known.save(kp)
     known_img = cv2.imread(str(kp))
-    faces = fa.get(known_img)
+    faces = _analyze_faces(known_img)
     sel_known = request.form.get('selected_known')
     known_emb = None
     if sel_known:
@@ -557,7 +925,7 @@ def find():
                     if not ret:
                         break
                     processed += 1
-                    faces = fa.get(frame)
+                    faces = _analyze_faces(frame)
                     for face in faces:
                         emb = face.embedding
                         emb = emb/(np.linalg.norm(emb)+1e-10)
@@ -676,7 +1044,7 @@ def api_pic_to_video():
                 ret, frame = cap.read()
                 if not ret:
                     break
-                faces = fa.get(frame)
+                faces = _analyze_faces(frame)
                 best_local = None
                 for f in faces:
                     emb = _normalize(f.embedding)
@@ -719,28 +1087,699 @@ def api_pic_to_video():
 # RTSP LIVE RECOGNITION (Phase 2)
 # =============================
 
+DECODER_MODES = ('inprocess', 'subprocess')
+# Decoder subprocess frame ring (max frame size) for streams whose size is not probed yet
+DECODER_RING_SIZE = (1920, 1080)
+# 'all': decode every frame; 'keyframes': FFmpeg decodes I-frames only (needs the ffmpeg CLI);
+# 'fraction': only every Nth frame is converted and handed to recognition
+DECODE_MODES = ('all', 'keyframes', 'fraction')
+FFMPEG_BIN = shutil.which('ffmpeg')
+_FFMPEG_RTSP_TIMEOUT_FLAG: Optional[str] = None
+
+
+_CUDA_DECODE: Optional[bool] = None
+
+
+def _cuda_decode_available() -> bool:
+    """Whether NVIDIA hardware decoding can be asked for (the CUDA runtime loads). Checked, and
+    the decode mode logged, once per process."""
+    global _CUDA_DECODE
+    if _CUDA_DECODE is None:
+        try:
+            import ctypes
+            ctypes.CDLL('cudart64_12.dll')
+            _CUDA_DECODE = True
+            print("🚀 Using NVIDIA CUDA hardware acceleration for video decoding (optimized)")
+        except Exception:
+            _CUDA_DECODE = False
+            print("⚠️ CUDA not available - using optimized CPU decoding")
+    return _CUDA_DECODE
+
+
+def _ffmpeg_rtsp_timeout_flag() -> str:
+    """The RTSP socket I/O timeout option of the installed ffmpeg: -timeout since 5.0, -stimeout
+    before (where -timeout was the listen timeout and would make ffmpeg wait for a connection)."""
+    global _FFMPEG_RTSP_TIMEOUT_FLAG
+    if _FFMPEG_RTSP_TIMEOUT_FLAG is None:
+        try:
+            out = subprocess.run([FFMPEG_BIN, '-hide_banner', '-h', 'demuxer=rtsp'], capture_output=True,
+                                 timeout=10).stdout
+        except Exception:
+            out = b''
+        _FFMPEG_RTSP_TIMEOUT_FLAG = '-stimeout' if b'-stimeout' in out else '-timeout'
+    return _FFMPEG_RTSP_TIMEOUT_FLAG
+
+# First connect to a stream tries each transport x decode thread count and keeps the
+# cheapest variant that still delivers (close to) the best frame rate
+PROBE_TRANSPORTS = ('tcp', 'udp')
+PROBE_THREADS = (1, 2, 4)
+PROBE_FRAMES = 12
+PROBE_FPS_TOLERANCE = 0.9
+
+# Decode-time scaling (analysis_width / display_width): ffmpeg's scale filter with an explicit
+# even height, so the piped frame geometry can be computed here exactly as ffmpeg computes it
+_SCALE_HEIGHT = 'trunc(ow*ih/iw/2)*2'
+
+
+def _scaled_height(in_w: int, in_h: int, width: int) -> int:
+    """Height of an in_w x in_h frame scaled by scale=width:_SCALE_HEIGHT."""
+    return int(width * in_h / in_w / 2) * 2
+
+
+def _scale_graph(analysis_width: int, display_width: int = 0, stride: int = 1) -> str:
+    """-vf graph for the ffmpeg pipe: every stride-th frame scaled to analysis_width and, with a
+    display_width, a second scale of the same decoded frame stacked below it (both padded to
+    the wider of the two)."""
+    steps = [f'select=not(mod(n\\,{stride}))'] if stride > 1 else []
+    scale = 'scale={}:' + _SCALE_HEIGHT + ':flags=bilinear'
+    if not display_width:
+        return ','.join(steps + [scale.format(analysis_width)])
+    width = max(analysis_width, display_width)
+    steps.append('split=2[a][d]')
+    return (','.join(steps) + f';[a]{scale.format(analysis_width)},pad={width}:ih[ap]'
+            f';[d]{scale.format(display_width)},pad={width}:ih[dp];[ap][dp]vstack')
+
+
+# Frames a push:// camera may have waiting before ingest answers 429
+PUSH_QUEUE_SIZE = 32
+# Camera (re)connects allowed at the same time, process-wide, and the spread of start times
+# when many cameras start together (boot / reload). In-process connects overlap only when the
+# cameras share FFmpeg capture options (frame_sources.CaptureOptionsEnv); subprocess decoders
+# always do, each child has its own environment.
+CONNECT_CONCURRENCY = 8
+START_JITTER_S = 5.0
+_CONNECT_SLOTS = threading.BoundedSemaphore(CONNECT_CONCURRENCY)
+# Low-res previews for camera walls (/api/rtsp/previews): default width, JPEG quality, and
+# the minimum age before a camera's preview is regenerated
+PREVIEW_WIDTH = 256
+PREVIEW_QUALITY = 70
+PREVIEW_INTERVAL_S = 2.0
+
+# Stream health states reported by RtspWorker
+HEALTH_CONNECTING = 'connecting'      # first connection attempt
+HEALTH_STREAMING = 'streaming'        # frames are arriving
+HEALTH_STALLED = 'stalled'            # watchdog tripped, tearing the capture down
+HEALTH_RECONNECTING = 'reconnecting'  # waiting out the backoff / reopening after a stall
+
+
+class FFmpegPipeCapture:
+    """Minimal VideoCapture look-alike reading raw BGR frames from an ffmpeg CLI pipe.
+
+    Used where OpenCV cannot pass decoder options, e.g. ``-skip_frame nokey`` for
+    keyframe-only decoding: non-key frames are never decoded at all, or where frames
+    should leave the decoder already scaled (``filters``, a -vf graph). ``output_size``
+    maps the input stream size to the size of the frames the graph produces.
+    """
+
+    _SIZE_RE = re.compile(r'\b(\d{2,5})x(\d{2,5})\b')
+
+    def __init__(self, url: str, input_args: Optional[list] = None, transport: str = 'tcp',
+                 open_timeout: float = 10.0, filters: Optional[str] = None,
+                 output_size: Optional[Callable[[int, int], Tuple[int, int]]] = None,
+                 io_timeout: float = 10.0):
+        self.width = 0
+        self.height = 0
+        self.input_size = (0, 0)
+        self._output_size = output_size
+        self._stderr_tail: list = []
+        self._size_ready = threading.Event()
+        cmd = [FFMPEG_BIN, '-hide_banner', '-nostdin', '-loglevel', 'info']
+        # A server that goes silent must end ffmpeg (and with it read()), not block it forever
+        timeout_us = str(int(io_timeout * 1e6))
+        scheme = url.split('://', 1)[0].lower() if '://' in url else ''
+        if scheme in ('rtsp', 'rtsps'):
+            cmd += ['-rtsp_transport', transport, _ffmpeg_rtsp_timeout_flag(), timeout_us]
+        elif scheme:
+            cmd += ['-rw_timeout', timeout_us]
+        cmd += list(input_args or []) + ['-i', url, '-an', '-sn']
+        if filters:
+            cmd += ['-vf', filters]
+        cmd += ['-vsync', 'passthrough', '-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1']
+        try:
+            self.proc: Optional[subprocess.Popen] = subprocess.Popen(
+                cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            self.proc = None
+            self._stderr_tail.append(str(e))
+            return
+        threading.Thread(target=self._drain_stderr, daemon=True).start()
+        # The decoded size is only known from ffmpeg's stream report
+        if not self._size_ready.wait(open_timeout) or not self.width:
+            self.release()
+
+    def _drain_stderr(self):
+        for raw in self.proc.stderr:
+            line = raw.decode('utf-8', 'replace').strip()
+            if not line:
+                continue
+            self._stderr_tail = (self._stderr_tail + [line])[-20:]
+            if not self._size_ready.is_set() and 'Video:' in line:
+                m = self._SIZE_RE.search(line)
+                if m:
+                    self.input_size = (int(m.group(1)), int(m.group(2)))
+                    if self._output_size is not None:
+                        self.width, self.height = self._output_size(*self.input_size)
+                    else:
+                        self.width, self.height = self.input_size
+                    self._size_ready.set()
+        self._size_ready.set()
+
+    @property
+    def last_error(self) -> str:
+        return self._stderr_tail[-1] if self._stderr_tail else 'ffmpeg exited'
+
+    def isOpened(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None and self.width > 0
+
+    def read(self, image: Optional[np.ndarray] = None):
+        proc = self.proc  # release() from another thread clears it; the kill ends readinto
+        if proc is None:
+            return False, None
+        shape = (self.height, self.width, 3)
+        if image is None or image.shape != shape or image.dtype != np.uint8 or not image.flags.c_contiguous:
+            image = np.empty(shape, dtype=np.uint8)
+        view = memoryview(image).cast('B')
+        got = 0
+        while got < len(view):
+            n = proc.stdout.readinto(view[got:])
+            if not n:
+                return False, None
+            got += n
+        return True, image
+
+    def get(self, prop) -> float:
+        # No container timestamps through the raw pipe; callers fall back to receive time
+        return -1.0
+
+    def release(self):
+        proc, self.proc = self.proc, None
+        if proc is None:
+            return
+        try:
+            proc.kill()
+            proc.wait(timeout=2.0)
+        except Exception:
+            pass
+
+
+class OnDemandFrameTap:
+    """Keeps a secondary capture drained with grab() and only converts frames to BGR when asked.
+
+    Used for the main stream of dual-stream cameras: detection runs on the sub-stream
+    and the full-resolution frame is retrieved only when a face was found. While faces
+    keep coming (ARM_S after the last fetch) every grabbed frame is retrieved into a short
+    timestamped ring, so fetch() can return the main frame nearest the sub-stream frame.
+    A match further than max_skew_s away is refused rather than paired with the wrong moment.
+    """
+
+    RING = 6      # main frames kept while armed
+    ARM_S = 2.0   # retrieve every frame this long after the last fetch
+
+    def __init__(self, max_skew_s: float = 0.2):
+        self._cond = threading.Condition()
+        self._armed_until = 0.0
+        self._ring: deque = deque(maxlen=self.RING)
+        self.max_skew_s = max_skew_s
+        self.retrieved = 0
+        self.matched = 0
+        self.skew_rejected = 0
+        self.last_skew_ms: Optional[float] = None
+
+    def run(self, cap, stop: threading.Event, max_failures: int = 25):
+        failures = 0
+        clock = PtsClock()
+        try:
+            while not stop.is_set():
+                if not cap.grab():
+                    failures += 1
+                    if failures >= max_failures:
+                        break
+                    time.sleep(0.1)
+                    continue
+                failures = 0
+                # Stamped like the sub-stream frames (stream PTS mapped to wall-clock), so neither
+                # side's buffering delay shows up as skew; every grab keeps the mapping current
+                now = time.time()
+                ts = clock.stamp(cap.get(cv2.CAP_PROP_POS_MSEC), now)
+                if now > self._armed_until:
+                    continue
+                ok, frame = cap.retrieve()
+                if ok and frame is not None:
+                    with self._cond:
+                        self._ring.append((ts, frame))
+                        self.retrieved += 1
+                        self._cond.notify_all()
+        finally:
+            cap.release()
+
+    def fetch(self, frame_ts: float, timeout: float = 0.5):
+        """Main frame nearest frame_ts. Returns (ts, frame), or None if the stream is not
+        delivering or the nearest frame is more than max_skew_s away."""
+        with self._cond:
+            self._armed_until = time.time() + self.ARM_S
+            # Wait for a frame at or after frame_ts so both neighbours are candidates
+            self._cond.wait_for(lambda: self._ring and self._ring[-1][0] >= frame_ts, timeout=timeout)
+            if not self._ring:
+                return None
+            ts, frame = min(self._ring, key=lambda item: abs(item[0] - frame_ts))
+            skew = ts - frame_ts
+            self.last_skew_ms = skew * 1000
+            if abs(skew) > self.max_skew_s:
+                self.skew_rejected += 1
+                return None
+            self.matched += 1
+            return ts, frame
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'retrieved': self.retrieved,
+            'matched': self.matched,
+            'skew_rejected': self.skew_rejected,
+            'last_skew_ms': round(self.last_skew_ms, 1) if self.last_skew_ms is not None else None,
+            'max_skew_ms': self.max_skew_s * 1000,
+        }
+
+
+class AdaptiveFpsController:
+    """Closed-loop recognition rate for one camera (additive increase, multiplicative decrease).
+
+    Once per interval it looks at the smoothed inference time, how much older than usual
+    frames are when inference starts (queue lag) and whether faces were seen:
+      - saturated (lag above budget or busy > high_util of the time): fps *= backoff
+      - faces present and headroom (busy < low_util): fps += step
+      - no face for idle_after_s: fps *= idle_decay, down to fps_min
+
+    A frame's age also includes network and decode latency, which no fps change removes, so
+    queue lag is the age above the camera's baseline: the lowest age of the last LAG_WINDOW frames.
+    """
+
+    LAG_WINDOW = 120
+
+    def __init__(self, fps: float, fps_min: float, fps_max: float, interval_s: float = 1.0,
+                 step: float = 1.0, backoff: float = 0.7, idle_decay: float = 0.85,
+                 high_util: float = 0.85, low_util: float = 0.6, idle_after_s: float = 3.0):
+        self.fps_min = max(0.1, float(fps_min))
+        self.fps_max = max(self.fps_min, float(fps_max))
+        self.fps = min(self.fps_max, max(self.fps_min, float(fps)))
+        self.interval_s = interval_s
+        self.step = step
+        self.backoff = backoff
+        self.idle_decay = idle_decay
+        self.high_util = high_util
+        self.low_util = low_util
+        self.idle_after_s = idle_after_s
+        self.proc_s: Optional[float] = None  # EWMA of inference seconds per frame
+        self.lag_s: Optional[float] = None    # EWMA of frame age above baseline when inference starts
+        self.base_lag_s: Optional[float] = None  # baseline frame age (network + decode)
+        self._ages: deque = deque(maxlen=self.LAG_WINDOW)
+        self.last_face_ts = 0.0
+        self._last_eval = 0.0
+        self.last_reason = 'init'
+
+    @staticmethod
+    def _ewma(prev: Optional[float], x: float, alpha: float = 0.2) -> float:
+        return x if prev is None else prev + alpha * (x - prev)
+
+    def update(self, proc_s: float, lag_s: float, faces_present: bool, now: float) -> float:
+        """Feed one processed frame; returns the fps to use from now on."""
+        self.proc_s = self._ewma(self.proc_s, proc_s)
+        self._ages.append(max(0.0, lag_s))
+        self.base_lag_s = min(self._ages)
+        self.lag_s = self._ewma(self.lag_s, self._ages[-1] - self.base_lag_s)
+        if faces_present:
+            self.last_face_ts = now
+        if now - self._last_eval < self.interval_s:
+            return self.fps
+        self._last_eval = now
+        util = self.proc_s * self.fps
+        if self.lag_s > 1.0 / self.fps or util > self.high_util:
+            self.fps *= self.backoff
+            self.last_reason = 'saturated'
+        elif now - self.last_face_ts <= self.idle_after_s:
+            if util < self.low_util:
+                self.fps += self.step
+                self.last_reason = 'faces'
+            else:
+                self.last_reason = 'hold'
+        else:
+            self.fps *= self.idle_decay
+            self.last_reason = 'idle'
+        self.fps = min(self.fps_max, max(self.fps_min, self.fps))
+        return self.fps
+
+
+class LatencyStats:
+    """Rolling per-stage latency samples (ms) for one camera, reported as percentiles."""
+
+    STAGES = ('queue', 'detect', 'embed', 'persist', 'publish', 'capture_to_event', 'capture_to_publish')
+
+    def __init__(self, window: int = 500):
+        self._samples = {stage: deque(maxlen=window) for stage in self.STAGES}
+
+    def add(self, **stage_ms: float):
+        for stage, ms in stage_ms.items():
+            self._samples[stage].append(ms)
+
+    def percentiles(self) -> Dict[str, Any]:
+        out = {}
+        for stage, vals in self._samples.items():
+            if not vals:
+                continue
+            p50, p90, p99 = np.percentile(np.fromiter(vals, dtype=np.float64), [50, 90, 99])
+            out[stage] = {'p50': round(float(p50), 1), 'p90': round(float(p90), 1),
+                          'p99': round(float(p99), 1), 'n': len(vals)}
+        return out
+
+
+class MotionGate:
+    """Cheap change detector that decides whether a frame is worth running the face detector on.
+
+    Compares a downscaled, blurred grayscale frame with a running-average background
+    and passes when the fraction of changed pixels reaches the threshold, or when
+    nothing has passed for keepalive_s (so a person standing still is still seen).
+    """
+
+    def __init__(self, threshold: float = 0.01, keepalive_s: float = 2.0,
+                 width: int = 160, alpha: float = 0.05, pixel_delta: int = 25):
+        self.threshold = float(threshold)
+        self.keepalive_s = float(keepalive_s)
+        self.width = int(width)
+        self.alpha = float(alpha)
+        self.pixel_delta = int(pixel_delta)
+        self._bg: Optional[np.ndarray] = None
+        self._last_pass = 0.0
+        self.last_fraction = 0.0
+
+    def check(self, frame: np.ndarray, now: float) -> bool:
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, int(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        if self._bg is None or self._bg.shape != gray.shape:
+            self._bg = gray.astype(np.float32)
+            self._last_pass = now
+            self.last_fraction = 1.0
+            return True
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._bg))
+        self.last_fraction = float(np.count_nonzero(diff > self.pixel_delta)) / diff.size
+        cv2.accumulateWeighted(gray, self._bg, self.alpha)
+        if self.last_fraction >= self.threshold or now - self._last_pass >= self.keepalive_s:
+            self._last_pass = now
+            return True
+        return False
+
+
+class LatestFrameMailbox:
+    """Single-slot frame handoff between a capture thread and its consumer.
+
+    The writer never blocks: each put() overwrites the previous frame, so the
+    reader always gets the newest one and the decoder buffer never backs up.
+
+    Frames are decoded into a small pool of recycled buffers: write_buffer() hands
+    the writer a buffer that is neither the latest frame nor the one the reader is
+    working on (the frame from its last get()), so steady-state capture allocates
+    nothing.
+
+    on_put, when set, is called with (frame, ts) on the writer's thread after each put(),
+    while the frame is still the newest and so not handed out for reuse.
+    """
+
+    def __init__(self, pool_size: int = 3):
+        self._cond = threading.Condition()
+        self._frame: Optional[np.ndarray] = None
+        self._held: Optional[np.ndarray] = None
+        self._pool: list = []
+        self.pool_size = pool_size
+        self._ts = 0.0
+        self._seq = 0
+        self._taken_seq = 0
+        self.put_count = 0
+        self.dropped = 0  # frames overwritten before the consumer took them
+        self.allocations = 0  # frames that did not land in a pooled buffer
+        self.on_put: Optional[Callable[[np.ndarray, float], None]] = None
+
+    def _is_free(self, buf: np.ndarray) -> bool:
+        return buf is not self._frame and buf is not self._held
+
+    def write_buffer(self) -> Optional[np.ndarray]:
+        """A pooled buffer safe to decode into, or None while the pool is still filling."""
+        with self._cond:
+            if len(self._pool) < self.pool_size:
+                return None
+            return next((b for b in self._pool if self._is_free(b)), None)
+
+    def put(self, frame: np.ndarray, ts: float):
+        with self._cond:
+            if self._frame is not None and self._taken_seq != self._seq:
+                self.dropped += 1
+            if not any(frame is b for b in self._pool):
+                # fresh allocation (pool filling, or the stream changed size): recycle it from now on
+                self.allocations += 1
+                if len(self._pool) >= self.pool_size:
+                    stale = next((b for b in self._pool if self._is_free(b)), None)
+                    if stale is not None:
+                        self._pool.remove(stale)
+                if len(self._pool) < self.pool_size:
+                    self._pool.append(frame)
+            self._frame = frame
+            self._ts = ts
+            self._seq += 1
+            self.put_count += 1
+            self._cond.notify_all()
+        if self.on_put is not None:
+            self.on_put(frame, ts)
+
+    def get(self, after_seq: int = 0, timeout: float = 1.0):
+        """Wait for a frame newer than after_seq. Returns (seq, ts, frame) or None on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after_seq, timeout=timeout):
+                return None
+            self._taken_seq = self._seq
+            self._held = self._frame
+            return self._seq, self._ts, self._frame
+
+
+class FrameSubscription:
+    """One consumer's view of a FrameBus: the newest frame at most every 1/fps seconds.
+
+    Frames are copied into the subscription's own buffer pool when due, so the consumer
+    can keep a frame for as long as it likes while the camera recycles its buffers, and a
+    slow consumer only ever sees the latest frame (same get() contract as the mailbox).
+    """
+
+    def __init__(self, fps: float = 0.0):
+        self.interval = 1.0 / fps if fps and fps > 0 else 0.0  # 0 = every frame the camera hands out
+        self._mailbox = LatestFrameMailbox()
+        self._next_due = 0.0
+        self.closed = False
+
+    @property
+    def delivered(self) -> int:
+        return self._mailbox.put_count
+
+    @property
+    def dropped(self) -> int:
+        return self._mailbox.dropped
+
+    def _offer(self, frame: np.ndarray, ts: float, now: float):
+        if now < self._next_due:
+            return
+        self._next_due = now + self.interval
+        buf = self._mailbox.write_buffer()
+        if buf is not None and buf.shape == frame.shape and buf.dtype == frame.dtype:
+            np.copyto(buf, frame)
+        else:
+            buf = frame.copy()
+        self._mailbox.put(buf, ts)
+
+    def get(self, after_seq: int = 0, timeout: float = 1.0):
+        """Wait for a frame newer than after_seq. Returns (seq, ts, frame), or None on timeout
+        or once the bus is closed (check .closed)."""
+        if self.closed:
+            return None
+        item = self._mailbox.get(after_seq, timeout=timeout)
+        return None if self.closed else item
+
+
+class FrameBus:
+    """Fan-out of one camera's decoded frames, so the stream is decoded once however many
+    consumers there are (live recognition, analysis jobs, recordings...).
+
+    The worker publishes from the capture thread as frames are decoded, so subscribers see
+    the stream rate however long recognition takes (frames from the decoder subprocess and
+    push sources go through the worker loop). publish() is a no-op without subscribers and
+    otherwise only copies for subscriptions that are due.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: list = []
+        self.published = 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subs)
+
+    def subscribe(self, fps: float = 0.0) -> FrameSubscription:
+        sub = FrameSubscription(fps)
+        with self._lock:
+            self._subs = self._subs + [sub]
+        return sub
+
+    def unsubscribe(self, sub: FrameSubscription):
+        sub.closed = True
+        with self._lock:
+            self._subs = [s for s in self._subs if s is not sub]
+
+    def publish(self, frame: np.ndarray, ts: float, now: float):
+        subs = self._subs  # copy-on-write list: no lock on the hot path
+        if not subs:
+            return
+        self.published += 1
+        for sub in subs:
+            sub._offer(frame, ts, now)
+
+    def close(self):
+        """Camera stopped: end every subscription (their get() returns None from now on)."""
+        with self._lock:
+            subs, self._subs = self._subs, []
+        for sub in subs:
+            sub.closed = True
+
+
+class RecognitionParams:
+    """What a worker matches faces against. Never mutated: reconfigure() builds a new one and
+    swaps the reference, and the loop takes one snapshot per frame, so a frame is matched
+    entirely with the old or entirely with the new settings."""
+
+    __slots__ = ('mode', 'threshold', 'known', 'gallery')
+
+    def __init__(self, mode: str, threshold: float, known: Optional[np.ndarray] = None,
+                 gallery: Optional[list] = None):
+        self.mode = mode
+        self.threshold = float(threshold)
+        self.known = known.astype(np.float32) if known is not None else None
+        # gallery: list of tuples (person_id, person_name, embedding np.ndarray), L2-normalized
+        self.gallery = []
+        for pid, pname, emb in gallery or []:
+            e = emb / (np.linalg.norm(emb) + 1e-10)
+            self.gallery.append((pid, pname, e.astype(np.float32)))
+
+    def match(self, emb: np.ndarray) -> tuple:
+        """(similarity, matched, person_id, person_name) for an L2-normalized embedding."""
+        if self.mode == 'single' and self.known is not None:
+            sim = float(np.dot(self.known, emb))
+            return sim, sim >= self.threshold, None, None
+        best = None
+        for pid, pname, e in self.gallery:
+            s = float(np.dot(e, emb))
+            if best is None or s > best[0]:
+                best = (s, pid, pname)
+        if best is None:
+            return 0.0, False, None, None
+        if best[0] >= self.threshold:
+            return best[0], True, best[1], best[2]
+        return best[0], False, None, None
+
+    def replace(self, **changes) -> 'RecognitionParams':
+        new = RecognitionParams.__new__(RecognitionParams)
+        for name in self.__slots__:
+            setattr(new, name, getattr(self, name))
+        if 'mode' in changes:
+            new.mode = changes['mode']
+        if 'threshold' in changes:
+            new.threshold = float(changes['threshold'])
+        if 'known' in changes:
+            new.known = changes['known'].astype(np.float32) if changes['known'] is not None else None
+        if 'gallery' in changes:
+            new.gallery = RecognitionParams(new.mode, new.threshold, gallery=changes['gallery']).gallery
+        return new
+
+
+# Options reconfigure() can swap on a running worker, in groups that are applied together;
+# anything else needs a restart
+LIVE_OPTION_GROUPS = (('motion_gate', 'motion_threshold', 'motion_keepalive_s'),
+                      ('roi',),
+                      ('tiling',),
+                      ('schedule',),
+                      ('adaptive_fps', 'fps_min', 'fps_max'),
+                      ('face_tracking', 'track_refresh_s'),
+                      ('det_profile',))
+LIVE_OPTIONS = tuple(k for group in LIVE_OPTION_GROUPS for k in group)
+
+
 class RtspWorker:
     def __init__(self, cam_id: str, url: str, 
                  known_emb: Optional[np.ndarray] = None,
                  threshold: float = 0.6, target_fps: float = 15.0, transport: str = 'tcp', timeout_ms: int = 5000000,
                  mode: str = 'watchlist',
-                 gallery: Optional[list] = None):
+                 gallery: Optional[list] = None,
+                 decoder: str = 'inprocess',
+                 max_read_failures: int = 25,
+                 stall_timeout_s: float = 10.0,
+                 motion_gate: bool = False,
+                 motion_threshold: float = 0.01,
+                 motion_keepalive_s: float = 2.0,
+                 substream_url: Optional[str] = None,
+                 decode_mode: str = 'all',
+                 decode_fraction: float = 0.25,
+                 roi: Optional[list] = None,
+                 adaptive_fps: bool = False,
+                 fps_min: float = 1.0,
+                 fps_max: float = 15.0,
+                 schedule: Optional[dict] = None,
+                 probe: Optional[dict] = None,
+                 analysis_width: int = 0,
+                 display_width: int = 0,
+                 tiling: Optional[dict] = None,
+                 face_tracking: bool = True,
+                 track_refresh_s: float = 2.0,
+                 det_profile: str = str(DET_PROFILE_DEFAULT)):
         self.cam_id = cam_id
         self.url = url
-        self.mode = mode
-        self.known = known_emb.astype(np.float32) if known_emb is not None else None
-        self.threshold = float(threshold)
+        # Dual-stream cameras: detect on the cheap sub-stream, crop/embed from the main stream (url)
+        self.substream_url = substream_url or None
+        self._main_tap: Optional[OnDemandFrameTap] = None
+        self._main_thread: Optional[threading.Thread] = None
+        self._main_stop: Optional[threading.Event] = None
+        # Matching settings; swapped whole by reconfigure() while the stream keeps running
+        self._params = RecognitionParams(mode, threshold, known_emb, gallery)
+        self._params_lock = threading.Lock()
         self.target_dt = 1.0 / max(0.1, float(target_fps))
         self.stream_dt = 1.0 / 30.0  # 30 FPS for live streaming (GPU-optimized)
         self.transport = transport if transport in ('tcp', 'udp') else 'tcp'
         self.timeout_ms = int(timeout_ms)
-        # gallery: list of tuples (person_id, person_name, embedding np.ndarray)
-        self.gallery = []
-        if gallery:
-            for pid, pname, emb in gallery:
-                e = emb / (np.linalg.norm(emb) + 1e-10)
-                self.gallery.append((pid, pname, e.astype(np.float32)))
+        # 'inprocess': decode on a thread of this process; 'subprocess': dedicated decoder
+        # process per camera writing into a shared-memory frame ring
+        self.decoder = decoder if decoder in DECODER_MODES else 'inprocess'
+        self.decode_mode = decode_mode if decode_mode in DECODE_MODES else 'all'
+        # Frames scaled inside the decoder (ffmpeg pipe): analysis_width for recognition and,
+        # optionally, display_width for the live stream from the same decode. 0 = native size
+        self.analysis_width = max(0, int(analysis_width or 0))
+        self.display_width = max(0, int(display_width or 0)) if self.analysis_width else 0
+        self._display_split: Optional[Tuple[int, int, int, int]] = None  # (rows, width) analysis, display
+        # 'fraction' mode: keep 1 of every decode_stride frames
+        self.decode_stride = max(1, int(round(1.0 / min(1.0, max(0.01, float(decode_fraction))))))
+        self._decode_mode_active = self.decode_mode  # what the current session actually does
+        self.frames_skipped = 0  # grabbed but never converted/handed over ('fraction' mode)
+        # Detection zones: detector sees only the zones' bounding crop (None = whole frame)
+        self._tiler: Optional[TiledDetector] = None
+        self._zone: Optional[DetectionZone] = None
+        self._set_detector(roi, tiling)
+        # Detector input profile: fixed size, or AutoDetSize following the faces seen
+        self._set_det_profile(det_profile)
+        # Adaptive recognition rate: target_dt follows the controller, target_fps is the start point
+        self._rate = AdaptiveFpsController(target_fps, fps_min, fps_max) if adaptive_fps else None
+        if self._rate is not None:
+            self.target_dt = 1.0 / self._rate.fps
+        # Track-aware recognition: tracked faces keep their identity between refreshes
+        self._tracker = FaceTracker(track_refresh_s) if face_tracking else None
+        self.latency = LatencyStats()
+        # Compute schedule: the scheduler thread sets schedule_state, the loop obeys it
+        self._schedule = CameraSchedule(schedule) if schedule else None
+        self.schedule_state = SCHEDULE_ACTIVE
+        self.apply_schedule(datetime.now())
         self.thread: Optional[threading.Thread] = None
+        self._start_delay = 0.0
         self.stop_event = threading.Event()
         self.last_error: Optional[str] = None
         self.matches_count = 0
@@ -752,14 +1791,55 @@ class RtspWorker:
         self._sub_lock = threading.Lock()
         self._next_sub_id = 1
         self._last_jpeg: Optional[bytes] = None
+        self._last_jpeg_width = 0
+        self._preview_lock = threading.Lock()
+        self._preview: Optional[tuple] = None  # (made_at, width, image, jpeg)
         self._last_emit_ts = 0.0
         self._last_stream_ts = 0.0  # For live streaming frame rate control
         self._stream_frame_counter = 0  # Counter for frame skipping
-
-    def start(self):
+        # Capture runs on its own thread (or decoder process) and hands the newest frame
+        # over through a mailbox (LatestFrameMailbox or SharedFrameRing)
+        self._frames = None
+        self._grab_thread: Optional[threading.Thread] = None
+        self._pipe_cap: Optional[FFmpegPipeCapture] = None  # killed directly by _stop_capture
+        self._grab_stop: Optional[threading.Event] = None
+        self._decoder_proc: Optional[DecoderProcess] = None
+        self._frames_captured = 0  # totals of finished capture sessions
+        self._frames_dropped = 0
+        # Frame buffer allocations: capture side (outside the mailbox pool) and hot loop (resize targets)
+        self._capture_allocs = 0
+        self._loop_allocs = 0
+        self._stream_buf: Optional[np.ndarray] = None
+        # push:// cameras: frames come from the ingest API instead of a capture thread
+        self._push_queue = PushFrameQueue(PUSH_QUEUE_SIZE) if source_kind(url) == SOURCE_PUSH else None
+        # Probed capture variant per stream URL ({url: {codec, width, height, fps, decode_ms,
+        # transport, threads, variant...}}); persisted so reconnects skip the variant search
+        self.probe: Dict[str, dict] = dict(probe or {})
+        # Other consumers of this camera's decoded frames (analysis jobs...) subscribe here
+        self.frame_bus = FrameBus()
+        self.last_processing_ms = 0.0
+        # Watchdog: reconnect after N consecutive read failures or no new frame within the timeout
+        self.max_read_failures = max(1, int(max_read_failures))
+        self.stall_timeout_s = max(1.0, float(stall_timeout_s))
+        self.health = HEALTH_CONNECTING
+        self.health_since = time.time()
+        self.read_failures = 0  # consecutive, current capture
+        self.reconnects = 0
+        self._outage_start: Optional[float] = None
+        self.recovery_times = deque(maxlen=50)  # seconds from last good frame to first frame after reconnect
+        # Motion gate: only run the detector when the scene changes (plus a keep-alive rate)
+        self._motion_gate = MotionGate(motion_threshold, motion_keepalive_s) if motion_gate else None
+        self.frames_gated = 0  # recognition ticks skipped by the motion gate
+        self.stale_after_s = 1.0  # frames older than this when picked up count as stale
+        self.frames_stale = 0
+        self.frames_failed = 0  # frames whose processing raised (skipped, the loop keeps running)
+
+    def start(self, delay: float = 0.0):
+        """Start the worker thread; delay postpones the first connect (staggered boot)."""
         if self.thread and self.thread.is_alive():
             return
         self.stop_event.clear()
+        self._start_delay = max(0.0, float(delay))
         self.thread = threading.Thread(target=self._run, daemon=True)
         self.thread.start()
 
@@ -767,6 +1847,121 @@ class RtspWorker:
         self.stop_event.set()
         if self.thread:
             self.thread.join(timeout=2.0)
+        self.frame_bus.close()
+
+    @property
+    def mode(self) -> str:
+        return self._params.mode
+
+    @property
+    def threshold(self) -> float:
+        return self._params.threshold
+
+    @property
+    def known(self) -> Optional[np.ndarray]:
+        return self._params.known
+
+    @property
+    def gallery(self) -> list:
+        return self._params.gallery
+
+    def reconfigure(self, threshold: Optional[float] = None, target_fps: Optional[float] = None,
+                    mode: Optional[str] = None, known_emb: Optional[np.ndarray] = None,
+                    gallery: Optional[list] = None, **options):
+        """Swap runtime parameters on the running worker; the capture stays open.
+
+        options: any of LIVE_OPTIONS, as produced by _worker_options().
+        """
+        with self._params_lock:
+            changes: Dict[str, Any] = {}
+            if threshold is not None:
+                changes['threshold'] = threshold
+            if mode is not None:
+                changes['mode'] = mode
+            if known_emb is not None:
+                changes['known'] = known_emb
+            if gallery is not None:
+                changes['gallery'] = gallery
+            if changes:
+                self._params = self._params.replace(**changes)
+            if 'roi' in options or 'tiling' in options:
+                self._set_detector(options['roi'] if 'roi' in options else self._zone and self._zone.polygons,
+                                   options['tiling'] if 'tiling' in options else self._tiler and self._tiler.spec)
+            if 'schedule' in options:
+                self._schedule = CameraSchedule(options['schedule']) if options['schedule'] else None
+                self.apply_schedule(datetime.now())
+            if 'motion_gate' in options:
+                self._motion_gate = (MotionGate(options.get('motion_threshold', 0.01),
+                                                options.get('motion_keepalive_s', 2.0))
+                                     if options['motion_gate'] else None)
+            if 'det_profile' in options:
+                self._set_det_profile(options['det_profile'])
+            if 'face_tracking' in options:
+                self._tracker = (FaceTracker(options.get('track_refresh_s', 2.0))
+                                 if options['face_tracking'] else None)
+            if 'adaptive_fps' in options:
+                base = target_fps if target_fps is not None else 1.0 / self.target_dt
+                self._rate = (AdaptiveFpsController(base, options.get('fps_min', 1.0), options.get('fps_max', 15.0))
+                              if options['adaptive_fps'] else None)
+            if self._rate is not None:
+                if target_fps is not None:
+                    self._rate.fps = min(self._rate.fps_max, max(self._rate.fps_min, float(target_fps)))
+                self.target_dt = 1.0 / self._rate.fps
+            elif target_fps is not None:
+                self.target_dt = 1.0 / max(0.1, float(target_fps))
+
+    def _set_detector(self, roi: Optional[list], tiling: Optional[dict]):
+        """Detector for the loop: whole frame, ROI crop and/or tiles (with an ROI, only it is tiled)."""
+        tiler = TiledDetector(tiling, self.cam_id) if tiling else None
+        if tiler:
+            detect = lambda img: tiler.detect(img, self.det_size)
+        else:
+            detect = lambda img: _detect_faces(img, self.cam_id, self.det_size)
+        self._zone = DetectionZone(roi, detect) if roi else None
+        self._tiler = tiler
+
+    def _set_det_profile(self, profile: str):
+        self.det_profile = profile
+        self._det_auto = AutoDetSize() if profile == 'auto' else None
+        if self._det_auto is not None:
+            self.det_size = self._det_auto.size
+        else:
+            # a stored size this detector model cannot run (fixed input shape) falls back to its own
+            self.det_size = int(profile) if int(profile) in DET_PROFILE_SIZES else DET_PROFILE_DEFAULT
+
+    def _detect(self, frame: np.ndarray) -> list:
+        zone, tiler, auto = self._zone, self._tiler, self._det_auto
+        if auto is not None:
+            self.det_size = auto.next_size(time.time())
+        if zone is not None:
+            faces = zone.detect(frame)
+        else:
+            faces = tiler.detect(frame, self.det_size) if tiler is not None else _detect_faces(frame, self.cam_id, self.det_size)
+        if auto is not None:
+            # face size relative to what the detector input was scaled from: a tile (of the ROI
+            # crop, with both), the ROI crop, or the frame
+            if tiler is not None:
+                side = tiler.input_side
+            elif zone is not None:
+                side = zone.input_side
+            else:
+                side = max(frame.shape[:2])
+            auto.observe(faces, side, self.det_size)
+        return faces
+
+    def apply_schedule(self, now: datetime) -> str:
+        sched = self._schedule
+        self.schedule_state = sched.state(now) if sched is not None else SCHEDULE_ACTIVE
+        return self.schedule_state
+
+    def schedule_info(self, now: datetime) -> Dict[str, Any]:
+        sched = self._schedule
+        return {
+            'state': self.schedule_state,
+            'today': sched.today(now) if sched is not None else None,
+            'outside': sched.spec['outside'] if sched is not None else None,
+            'outside_fps': sched.outside_fps if sched is not None else None,
+        }
 
     def subscribe(self) -> int:
         with self._sub_lock:
@@ -808,18 +2003,50 @@ class RtspWorker:
     def snapshot(self) -> Optional[bytes]:
         return self._last_jpeg
 
-    def _open_variants(self):
-        """Try multiple URL variants and return an opened VideoCapture or None."""
-        import os as _os
-        # Set global capture options for FFMPEG
-        # Try hardware acceleration if available, fall back to software decoding
-        try:
-            # Check if CUDA is available by testing for cudart
-            import ctypes
-            ctypes.CDLL('cudart64_12.dll')
+    def preview(self, width: int = PREVIEW_WIDTH, max_age: float = PREVIEW_INTERVAL_S):
+        """Low-res copy of the live snapshot as (image, jpeg), or None before the first frame.
+
+        Made from the snapshot JPEG with libjpeg's DCT-domain downscale (no full-size decode)
+        and regenerated at most once per max_age however many clients ask.
+        """
+        with self._preview_lock:
+            now = time.time()
+            cached = self._preview
+            if cached is not None and cached[1] == width and now - cached[0] < max_age:
+                return cached[2], cached[3]
+            jpg = self._last_jpeg
+            if not jpg:
+                return None
+            src_w = self._last_jpeg_width or 1280
+            flag = cv2.IMREAD_COLOR
+            for factor, reduced in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                    (2, cv2.IMREAD_REDUCED_COLOR_2)):
+                if src_w // factor >= width:
+                    flag = reduced
+                    break
+            img = cv2.imdecode(np.frombuffer(jpg, np.uint8), flag)
+            if img is None:
+                return None
+            h, w = img.shape[:2]
+            if w > width:
+                img = cv2.resize(img, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+            ok, buf = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_QUALITY])
+            if not ok:
+                return None
+            self._preview = (now, width, img, buf.tobytes())
+            return img, self._preview[3]
+
+    def _capture_options(self, transport: Optional[str] = None, threads: Optional[int] = None) -> str:
+        """FFmpeg capture options for this camera (hardware decoding when CUDA is present).
+
+        transport/threads override the camera's defaults for probed variants; threads
+        only applies to software decoding.
+        """
+        transport = transport or self.transport
+        if _cuda_decode_available():
             # CUDA available - use hardware acceleration with optimized settings
-            _os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = (
-                f"rtsp_transport;{self.transport}|"
+            return (
+                f"rtsp_transport;{transport}|"
                 f"stimeout;{self.timeout_ms}|"
                 "hwaccel;cuda|"
                 "hwaccel_output_format;cuda|"  # Keep frames in GPU memory
@@ -829,89 +2056,471 @@ class RtspWorker:
                 "surfaces;16|"  # More decode surfaces for smoother playback
                 "flags;low_delay"
             )
-            print("🚀 Using NVIDIA CUDA hardware acceleration for video decoding (optimized)")
-        except:
-            # CUDA not available - use optimized software decoding
-            _os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = (
-                f"rtsp_transport;{self.transport}|"
-                f"stimeout;{self.timeout_ms}|"
-                "fflags;nobuffer|"  # No buffering for low latency
-                "flags;low_delay|"  # Low delay mode
-                "threads;4|"  # Use 4 threads for software decoding
-                "probesize;32768|"  # Smaller probe size for faster startup
-                "analyzeduration;500000"  # Shorter analysis for faster startup
-            )
-            print("⚠️ CUDA not available - using optimized CPU decoding")
+        # CUDA not available - use optimized software decoding
+        return (
+            f"rtsp_transport;{transport}|"
+            f"stimeout;{self.timeout_ms}|"
+            "fflags;nobuffer|"  # No buffering for low latency
+            "flags;low_delay|"  # Low delay mode
+            f"threads;{threads or 4}|"  # Software decoding threads (probed per camera)
+            "probesize;32768|"  # Smaller probe size for faster startup
+            "analyzeduration;500000"  # Shorter analysis for faster startup
+        )
 
+    def _url_variants(self, url: str):
         variants = []
         # Prefer explicit FFMPEG backend
-        variants.append(('orig', self.url))
+        variants.append(('orig', url))
         # Append rtsp_transport tcp param if not present
-        if 'rtsp_transport=' not in self.url:
-            sep = '&' if ('?' in self.url) else '?'
-            variants.append(('tcp_query', f"{self.url}{sep}rtsp_transport=tcp"))
-            variants.append(('prefer_tcp', f"{self.url}{sep}rtsp_flags=prefer_tcp"))
-        cap = None
+        if 'rtsp_transport=' not in url:
+            sep = '&' if ('?' in url) else '?'
+            variants.append(('tcp_query', f"{url}{sep}rtsp_transport=tcp"))
+            variants.append(('prefer_tcp', f"{url}{sep}rtsp_flags=prefer_tcp"))
+        return variants
+
+    def _open_variants(self, url: Optional[str] = None):
+        """Open the stream with its probed variant, or search for the cheapest one on first connect.
+
+        Returns (RtspSource, info) or (None, reason).
+        """
+        url = url or self.url
+        plan = self.probe.get(url)
+        if plan:
+            src = RtspSource([(plan['variant'], plan['variant_url'])],
+                             self._capture_options(plan['transport'], plan['threads']))
+            ok, info = src.open()
+            if ok:
+                return src, f"{info} (probed {plan['transport']}/{plan['threads'] or 'hw'})"
+            print(f"⚠️ Camera {self.cam_id}: probed variant failed ({info}), probing again")
+        return self._probe_variants(url)
+
+    def _probe_variants(self, url: str):
+        """Open every transport x thread-count variant, measure it and keep the cheapest working one."""
+        hw = 'hwaccel;' in self._capture_options()
+        threads_opts = (None,) if hw else PROBE_THREADS
+        transports = (self.transport,) + tuple(t for t in PROBE_TRANSPORTS if t != self.transport)
+        variants = self._url_variants(url)
+        results = []
         reason = None
-        for tag, u in variants:
-            try:
-                c = cv2.VideoCapture(u, cv2.CAP_FFMPEG)
-                if c.isOpened():
-                    # Optimize buffer and resolution settings for high FPS with GPU
-                    c.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimal buffer for lowest latency
-                    c.set(cv2.CAP_PROP_FPS, 30)  # Request 30 FPS from camera
-                    # Higher resolution for GPU processing
-                    c.set(cv2.CAP_PROP_FRAME_WIDTH, 1920)
-                    c.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
-                    # Force H.264 codec (more compatible than HEVC)
-                    c.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('H','2','6','4'))
-                    return c, tag
+        for transport in transports:
+            for threads in threads_opts:
+                # In a child process: decode_ms is then this variant's decode, not the server's load
+                stats, info = probe_isolated(variants, self._capture_options(transport, threads),
+                                             frames=PROBE_FRAMES, open_timeout=self.timeout_ms / 1e6 + 5.0)
+                if stats is None:
+                    reason = info
+                    break  # transport does not open at all: skip its other thread counts
+                if stats['frames'] >= 2:
+                    variant_url = next(u for tag, u in variants if tag == info)
+                    results.append(dict(stats, transport=transport, threads=threads,
+                                        variant=info, variant_url=variant_url))
                 else:
-                    c.release()
-            except Exception as e:
-                reason = str(e)
-        return None, reason or 'unknown error'
+                    reason = f'{transport}/{threads}: opened but no frames'
+        if not results:
+            return None, reason or 'no working variant'
+        best_fps = max(r['fps'] for r in results)
+        fast_enough = [r for r in results if r['fps'] >= PROBE_FPS_TOLERANCE * best_fps]
+        plan = min(fast_enough, key=lambda r: r['decode_ms'])
+        plan['probed_at'] = int(time.time() * 1000)
+        plan['candidates'] = [{k: r[k] for k in ('transport', 'threads', 'fps', 'decode_ms')} for r in results]
+        if plan['fps'] and plan['decode_ms'] > 1000.0 / plan['fps']:
+            print(f"⚠️ Camera {self.cam_id}: {plan['codec'] or 'stream'} {plan['width']}x{plan['height']} "
+                  f"costs {plan['decode_ms']:.0f} ms/frame at {plan['fps']} fps; consider a sub-stream "
+                  f"or decode_mode=keyframes")
+        self.probe = dict(self.probe, **{url: plan})
+        try:
+            dbm.update_camera_probe(DB_CONN, self.cam_id, self.probe)
+        except Exception as e:
+            print(f"⚠️ Camera {self.cam_id}: probe not persisted: {e}")
+        src = RtspSource([(plan['variant'], plan['variant_url'])],
+                         self._capture_options(plan['transport'], plan['threads']))
+        ok, info = src.open()
+        if not ok:
+            return None, info
+        return src, f"{info} (probed {plan['transport']}/{plan['threads'] or 'hw'}, {len(results)} variants)"
+
+    def _decoder_plan(self, url: str):
+        """URL variants, capture options and frame ring size for the decoder subprocess (probed
+        variant and stream size when known)."""
+        plan = self.probe.get(url)
+        if plan:
+            # a ring that holds the probed stream at full resolution (no downscale in the child)
+            size = (max(DECODER_RING_SIZE[0], plan.get('width') or 0),
+                    max(DECODER_RING_SIZE[1], plan.get('height') or 0))
+            return [plan['variant_url']], self._capture_options(plan['transport'], plan['threads']), size
+        return [u for _, u in self._url_variants(url)], self._capture_options(), DECODER_RING_SIZE
+
+    def _open_source(self, url: str):
+        """Open any camera URL: RTSP/FFmpeg URLs, or file://, dir://, synthetic:// test sources."""
+        if source_kind(url) != SOURCE_RTSP:
+            return open_local_source(url)
+        return self._open_variants(url)
+
+    def _start_capture(self):
+        """Open the stream and start feeding frames. Returns (mailbox, info) or (None, reason)."""
+        if self._push_queue is not None:
+            return self._push_queue, 'push'
+        detect_url = self.substream_url or self.url
+        # Decoder subprocess, keyframe-only decode and decode-time scaling apply to camera
+        # streams, not test sources
+        is_stream = source_kind(detect_url) == SOURCE_RTSP
+        self._decode_mode_active = self.decode_mode
+        self._display_split = None
+        if self.decode_mode == 'keyframes':
+            if FFMPEG_BIN and is_stream:
+                return self._start_ffmpeg_capture(detect_url, ['-skip_frame', 'nokey'])
+            print(f"⚠️ Camera {self.cam_id}: keyframe decode needs ffmpeg on PATH and a stream URL, "
+                  f"falling back to 'fraction' (1/{self.decode_stride})")
+            self._decode_mode_active = 'fraction'
+        stride = self.decode_stride if self._decode_mode_active == 'fraction' else 1
+        if self.analysis_width:
+            if FFMPEG_BIN and is_stream:
+                return self._start_ffmpeg_capture(detect_url, stride=stride)
+            print(f"⚠️ Camera {self.cam_id}: analysis_width needs ffmpeg on PATH and a stream URL, "
+                  f"decoding at native size")
+        if self.decoder == 'subprocess' and is_stream:
+            variants, options, (ring_w, ring_h) = self._decoder_plan(detect_url)
+            proc = DecoderProcess(variants, options, max_width=ring_w, max_height=ring_h,
+                                  max_read_failures=self.max_read_failures, stride=stride)
+            ok, info = proc.start(timeout=self.timeout_ms / 1e6 + 5.0)
+            if ok and proc.downscaled:
+                # The child would shrink every frame (no full-resolution tiles or crops): restart
+                # it once with a ring that holds the stream's real size
+                ring_w, ring_h = proc.ring.source_size
+                print(f"⚠️ Camera {self.cam_id}: {ring_w}x{ring_h} frames exceed the decoder ring, "
+                      f"restarting the decoder with a {ring_w}x{ring_h} ring")
+                proc.stop()
+                proc = DecoderProcess(variants, options, max_width=ring_w, max_height=ring_h,
+                                      max_read_failures=self.max_read_failures, stride=stride)
+                ok, info = proc.start(timeout=self.timeout_ms / 1e6 + 5.0)
+            if not ok:
+                return None, info
+            self._decoder_proc = proc
+            self._start_main_tap()
+            return proc.ring, info
+        cap, info = self._open_source(detect_url)
+        if not cap:
+            return None, info
+        mailbox = LatestFrameMailbox()
+        mailbox.on_put = self._publish_captured
+        self._grab_stop = threading.Event()
+        self._grab_thread = threading.Thread(target=self._grab_loop, args=(cap, mailbox, self._grab_stop), daemon=True)
+        self._grab_thread.start()
+        self._start_main_tap()
+        return mailbox, info
+
+    def _start_ffmpeg_capture(self, url: str, input_args: Optional[list] = None, stride: int = 1):
+        """Decode through the ffmpeg CLI, for what OpenCV cannot ask of the decoder: keyframe-only
+        decode (skip_frame) and frames scaled to analysis_width (plus display_width) before the
+        BGR conversion, so no full-resolution BGR frame is ever produced."""
+        a, d = self.analysis_width, self.display_width
+        # Same decoder setup as the OpenCV path: the probed variant (transport, decode threads)
+        # when the camera has one, CUDA decoding when available
+        transport = self.transport
+        info = 'ffmpeg-keyframes' if input_args else 'ffmpeg'
+        input_args = list(input_args or [])
+        plan = self.probe.get(url)
+        if plan:
+            url, transport = plan['variant_url'], plan['transport']
+        if _cuda_decode_available():
+            input_args = ['-hwaccel', 'cuda'] + input_args
+        else:
+            input_args = ['-threads', str((plan or {}).get('threads') or 4)] + input_args
+        if a:
+            filters = _scale_graph(a, d, stride)
+
+            def output_size(w, h):
+                return max(a, d), _scaled_height(w, h, a) + (_scaled_height(w, h, d) if d else 0)
+        else:
+            filters = output_size = None
+        cap = FFmpegPipeCapture(url, input_args, transport=transport,
+                                open_timeout=self.timeout_ms / 1e6 + 5.0,
+                                filters=filters, output_size=output_size,
+                                io_timeout=self.timeout_ms / 1e6)
+        if not cap.isOpened():
+            reason = cap.last_error
+            cap.release()
+            return None, reason
+        if d:
+            self._display_split = (_scaled_height(*cap.input_size, a), a, _scaled_height(*cap.input_size, d), d)
+        self._pipe_cap = cap
+        mailbox = LatestFrameMailbox()
+        mailbox.on_put = self._publish_captured
+        self._grab_stop = threading.Event()
+        # select in the filter graph already dropped the frames 'fraction' mode skips
+        self._grab_thread = threading.Thread(target=self._grab_loop, args=(cap, mailbox, self._grab_stop, 1),
+                                             daemon=True)
+        self._grab_thread.start()
+        self._start_main_tap()
+        return mailbox, f'{info}-scaled-{a}' + (f'+{d}' if d else '') if a else info
+
+    def _publish_captured(self, frame: np.ndarray, ts: float):
+        """Capture-thread side of the frame bus: every decoded frame, before recognition sees it."""
+        if self._display_split is not None:
+            frame = self._split_display(frame)[0]
+        self.frame_bus.publish(frame, ts, time.time())
+
+    def _split_display(self, frame: np.ndarray):
+        """Views of a stacked ffmpeg frame: (analysis frame, display frame)."""
+        rows, width, display_rows, display_width = self._display_split
+        return frame[:rows, :width], frame[rows:rows + display_rows, :display_width]
+
+    def _start_main_tap(self):
+        """Dual-stream cameras: open the main stream for on-demand full-resolution frames."""
+        if not self.substream_url:
+            return
+        cap, info = self._open_source(self.url)
+        if not cap:
+            # Keep running on the sub-stream alone; crops just come out at sub-stream resolution
+            print(f"⚠️ Camera {self.cam_id}: main stream unavailable ({info}), using sub-stream frames")
+            return
+        self._main_tap = OnDemandFrameTap()
+        self._main_stop = threading.Event()
+        self._main_thread = threading.Thread(target=self._main_tap.run,
+                                             args=(cap, self._main_stop, self.max_read_failures), daemon=True)
+        self._main_thread.start()
+
+    def _main_frame_for(self, faces: list, frame: np.ndarray, frame_ts: float) -> np.ndarray:
+        """Swap a sub-stream frame for the main-stream frame taken nearest to it, rescaling
+        detections to it. Keeps the sub-stream frame when no main frame is close enough in time."""
+        if self._main_tap is None or not (self._main_thread and self._main_thread.is_alive()):
+            return frame
+        got = self._main_tap.fetch(frame_ts, timeout=0.5)
+        if got is None:
+            return frame
+        main = got[1]
+        (sh, sw), (mh, mw) = frame.shape[:2], main.shape[:2]
+        _scale_faces(faces, mw / sw, mh / sh)
+        return main
+
+    def _capture_alive(self) -> bool:
+        if self._push_queue is not None:
+            return True
+        if self._decoder_proc is not None:
+            return self._decoder_proc.is_alive()
+        return bool(self._grab_thread and self._grab_thread.is_alive())
+
+    def _stop_capture(self):
+        frames = self._frames
+        self._frames = None
+        if self._decoder_proc is not None:
+            self._decoder_proc.stop()
+            self._decoder_proc = None
+        if self._pipe_cap is not None:
+            # A grab thread stuck in a read on a silent stream never sees _grab_stop: killing
+            # ffmpeg ends the read, so neither the process nor the thread outlives the session
+            self._pipe_cap.release()
+            self._pipe_cap = None
+        if self._grab_thread is not None:
+            # The grab thread owns the capture and releases it on exit
+            self._grab_stop.set()
+            self._grab_thread.join(timeout=2.0)
+            self._grab_thread = None
+        if self._main_thread is not None:
+            self._main_stop.set()
+            self._main_thread.join(timeout=2.0)
+            self._main_thread = None
+            self._main_tap = None
+        if frames is not None:
+            self._frames_captured += frames.put_count
+            self._frames_dropped += frames.dropped
+            self._capture_allocs += getattr(frames, 'allocations', 0)
+
+    def rate_stats(self) -> Dict[str, Any]:
+        rate = self._rate
+        return {
+            'effective_fps': round(1.0 / self.target_dt, 2),
+            'adaptive_fps': rate is not None,
+            'fps_min': rate.fps_min if rate is not None else None,
+            'fps_max': rate.fps_max if rate is not None else None,
+            'fps_reason': rate.last_reason if rate is not None else None,
+            'inference_ms': round(rate.proc_s * 1000, 1) if rate is not None and rate.proc_s is not None else None,
+            'queue_lag_ms': round(rate.lag_s * 1000, 1) if rate is not None and rate.lag_s is not None else None,
+            'base_lag_ms': round(rate.base_lag_s * 1000, 1) if rate is not None and rate.base_lag_s is not None else None,
+        }
+
+    def _set_health(self, state: str):
+        if state != self.health:
+            self.health = state
+            self.health_since = time.time()
+
+    def health_stats(self) -> Dict[str, Any]:
+        recov = list(self.recovery_times)
+        return {
+            'health': self.health,
+            'health_since': self.health_since,
+            'read_failures': self.read_failures,
+            'reconnects': self.reconnects,
+            'last_recovery_s': round(recov[-1], 3) if recov else None,
+            'avg_recovery_s': round(sum(recov) / len(recov), 3) if recov else None,
+            'max_recovery_s': round(max(recov), 3) if recov else None,
+        }
+
+    def gate_stats(self) -> Dict[str, Any]:
+        gate = self._motion_gate
+        ticks = self.frames_gated + self.frame_idx
+        return {
+            'motion_gate': gate is not None,
+            'motion_fraction': round(gate.last_fraction, 4) if gate is not None else None,
+            'frames_gated': self.frames_gated,
+            'gate_skip_ratio': round(self.frames_gated / ticks, 4) if ticks else 0.0,
+        }
+
+    def _stream_canvas(self, frame: np.ndarray, display: Optional[np.ndarray] = None) -> np.ndarray:
+        """Frame downscaled to the live-stream width (1280px) in a reused buffer; small frames as-is.
+        A display frame scaled by the decoder (display_width) is used as it is."""
+        if display is not None:
+            return display
+        h, w = frame.shape[:2]
+        if w <= 1280:
+            return frame
+        size = (1280, int(h * 1280 / w))
+        if self._stream_buf is None or self._stream_buf.shape[:2] != (size[1], size[0]):
+            self._stream_buf = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            self._loop_allocs += 1
+        return cv2.resize(frame, size, dst=self._stream_buf, interpolation=cv2.INTER_LINEAR)
+
+    def submit_frames(self, frames: list) -> Tuple[int, int]:
+        """Queue pushed (jpeg_bytes, capture_ts) frames. Returns (accepted, rejected)."""
+        accepted = 0
+        for data, ts in frames:
+            if not self._push_queue.submit(data, ts):
+                break
+            accepted += 1
+        rejected = len(frames) - accepted
+        if rejected > 1:
+            # keep batch order: everything after the first refused frame is refused too
+            self._push_queue.rejected += rejected - 1
+        return accepted, rejected
+
+    def push_retry_after(self) -> int:
+        """Seconds until the push queue has likely drained, for Retry-After."""
+        backlog_s = len(self._push_queue) * self.last_processing_ms / 1000.0
+        return max(1, int(np.ceil(backlog_s)))
+
+    def frame_stats(self) -> Dict[str, int]:
+        frames = self._frames
+        captured = self._frames_captured + (frames.put_count if frames is not None else 0)
+        allocs = self._capture_allocs + self._loop_allocs + (getattr(frames, 'allocations', 0) if frames is not None else 0)
+        return {
+            'frame_allocations': allocs,
+            'allocations_per_frame': round(allocs / captured, 4) if captured else 0.0,
+            'frames_captured': self._frames_captured + (frames.put_count if frames is not None else 0),
+            'frames_dropped': self._frames_dropped + (frames.dropped if frames is not None else 0),
+            'frames_stale': self.frames_stale,
+            'frames_skipped': self.frames_skipped,
+            'frames_failed': self.frames_failed,
+        }
+
+    def _grab_loop(self, cap, mailbox: LatestFrameMailbox, grab_stop: threading.Event,
+                   stride: Optional[int] = None):
+        """Drain the capture as fast as the stream delivers and publish the newest frame."""
+        if stride is None:
+            stride = self.decode_stride if self._decode_mode_active == 'fraction' else 1
+        n = 0
+        clock = PtsClock()  # frames carry the stream PTS mapped to wall-clock
+        try:
+            while not grab_stop.is_set() and not self.stop_event.is_set():
+                n += 1
+                if stride > 1 and n % stride:
+                    # Skipped frames still go through the decoder but are never converted to BGR
+                    if cap.grab():
+                        self.read_failures = 0
+                        self.frames_skipped += 1
+                        continue
+                    ok, frame = False, None
+                else:
+                    ok, frame = cap.read(mailbox.write_buffer())
+                if not ok or frame is None:
+                    self.read_failures += 1
+                    self.last_error = 'failed to read frame'
+                    if self.read_failures >= self.max_read_failures:
+                        # Dead capture: exit so the watchdog reconnects instead of retrying it forever
+                        self.last_error = f'failed to read frame ({self.read_failures} consecutive failures)'
+                        break
+                    time.sleep(0.1)
+                    continue
+                self.read_failures = 0
+                self.last_seen = time.time()
+                mailbox.put(frame, clock.stamp(cap.get(cv2.CAP_PROP_POS_MSEC), self.last_seen))
+        finally:
+            cap.release()
+
+    def _backoff_sleep(self, backoff: float):
+        """Sleep for a jittered backoff so cameras that dropped together don't reconnect in lockstep."""
+        self.stop_event.wait(min(10.0, backoff) * random.uniform(0.5, 1.5))
 
     def _run(self):
         backoff = 1.0
+        self._set_health(HEALTH_CONNECTING)
+        if self._start_delay and self.stop_event.wait(self._start_delay):
+            return
         while not self.stop_event.is_set():
-            cap, info = self._open_variants()
-            if not cap:
+            # Bounded connect pool: at most CONNECT_CONCURRENCY cameras open streams at once
+            with _CONNECT_SLOTS:
+                frames, info = self._start_capture()
+            if frames is None:
                 self.last_error = f'failed to open rtsp (tried variants): {info}'
-                time.sleep(min(10.0, backoff))
+                self._backoff_sleep(backoff)
                 backoff = min(10.0, backoff * 2.0)
                 continue
-            backoff = 1.0
+            self._frames = frames
+            self.read_failures = 0
             last_ts = time.time()
+            last_seq = 0
+            last_frame_at = time.time()  # session start counts as activity for the stall timeout
+            # Pushed frames are all analysed and an idle edge device is not a stalled stream
+            lossless = getattr(frames, 'lossless', False)
             try:
                 while not self.stop_event.is_set():
+                    # Always take the newest frame; anything older was already overwritten
+                    item = frames.get(last_seq, timeout=0.5)
+                    if item is None:
+                        # Watchdog: capture gave up on read failures, or the stream went quiet
+                        if not self._capture_alive():
+                            if self._decoder_proc is not None:
+                                self.last_error = self._decoder_proc.last_error
+                            self._set_health(HEALTH_STALLED)
+                            break
+                        if not lossless and time.time() - last_frame_at > self.stall_timeout_s:
+                            self.last_error = f'no new frame for {self.stall_timeout_s:.0f}s'
+                            self._set_health(HEALTH_STALLED)
+                            break
+                        continue
+                    last_seq, frame_ts, frame = item
+                    display = None
+                    if self._display_split is not None:
+                        frame, display = self._split_display(frame)
                     now = time.time()
-                    
-                    # Read frame from camera
-                    ok, frame = cap.read()
-                    if not ok or frame is None:
-                        self.last_error = 'failed to read frame'
-                        time.sleep(0.1)
+                    last_frame_at = now
+                    self.last_seen = max(self.last_seen, frame_ts)
+                    if self.health != HEALTH_STREAMING:
+                        if self._outage_start is not None:
+                            self.recovery_times.append(frame_ts - self._outage_start)
+                            self._outage_start = None
+                        self._set_health(HEALTH_STREAMING)
+                        backoff = 1.0
+
+                    if getattr(frames, 'on_put', None) is None:
+                        # Sources without a capture thread here (decoder subprocess, push): publish as
+                        # taken, before the schedule check (jobs run regardless) and before annotation
+                        self.frame_bus.publish(frame, frame_ts, now)
+
+                    # Outside the camera's schedule window: keep the stream drained, skip the work
+                    sched_state = self.schedule_state
+                    if sched_state == SCHEDULE_PAUSED:
                         continue
 
-                    self.last_seen = now
-                    
                     # Increment frame counter
                     self._stream_frame_counter += 1
                     
                     # Update JPEG for live streaming - process EVERY frame for 30 FPS streaming
                     # GPU can handle this easily
-                    if now - self._last_stream_ts >= self.stream_dt:
+                    stream_dt = 1.0 if sched_state == SCHEDULE_SNAPSHOT else self.stream_dt
+                    if now - self._last_stream_ts >= stream_dt:
                         try:
                             # Downscale frame for faster streaming (720p optimal for GPU)
-                            h, w = frame.shape[:2]
-                            if w > 1280:  # Only downscale if larger than 1280px
-                                scale = 1280 / w
-                                new_w = 1280
-                                new_h = int(h * scale)
-                                stream_frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
-                            else:
-                                stream_frame = frame
+                            stream_frame = self._stream_canvas(frame, display)
                             
                             # Fast JPEG encoding with higher quality for GPU
                             ok2, buf = cv2.imencode('.jpg', stream_frame, [
@@ -921,144 +2530,155 @@ class RtspWorker:
                             ])
                             if ok2:
                                 self._last_jpeg = buf.tobytes()
+                                self._last_jpeg_width = stream_frame.shape[1]
                                 self._last_stream_ts = now
                         except Exception:
                             pass
                     
+                    if sched_state == SCHEDULE_SNAPSHOT:
+                        continue
+                    target_dt = self.target_dt
+                    if sched_state == SCHEDULE_REDUCED:
+                        target_dt = max(target_dt, 1.0 / self._schedule.outside_fps)
                     # Process faces at lower frequency (configurable FPS for recognition)
-                    if now - last_ts < self.target_dt:
+                    if not lossless and now - last_ts < target_dt:
                         # Don't sleep here - let the stream continue at full speed
                         continue
                     last_ts = now
+                    # reconfigure() may swap these while the frame is in flight: read each once
+                    gate, rate = self._motion_gate, self._rate
+                    if gate is not None and not gate.check(frame, now):
+                        self.frames_gated += 1
+                        continue
+                    if now - frame_ts > self.stale_after_s:
+                        self.frames_stale += 1
 
-                    self.frame_idx += 1
+                    try:
+                        self.frame_idx += 1
                     
-                    # Record processing start time for performance metrics
-                    processing_start = time.time()
-                    faces = fa.get(frame)
-                    processing_time_ms = (time.time() - processing_start) * 1000
+                        # Record processing start time for performance metrics
+                        processing_start = time.time()
+                        # Same stages as fa.get(), split so each can be timed: detect on the sub-stream
+                        # and/or the zone crop, then embed the surviving faces on the full (main-stream) frame
+                        params = self._params  # one consistent snapshot for the whole frame
+                        faces = self._detect(frame)
+                        det_size = self.det_size  # the profile this frame was detected at
+                        detect_done = time.time()
+                        # Track on detection coordinates (before any main-stream rescale); faces whose
+                        # track already has a confirmed identity skip the recognition model
+                        tracker = self._tracker
+                        tracks = tracker.update(faces, frame_ts, self.target_dt) if tracker is not None else [None] * len(faces)
+                        to_embed = [f for f, t in zip(faces, tracks)
+                                    if t is None or tracker.needs_recognition(t, frame_ts, params)]
+                        if faces and self.substream_url:
+                            frame = self._main_frame_for(faces, frame, frame_ts)
+                        if to_embed:
+                            _embed_faces(frame, to_embed)
+                        embed_done = time.time()
+                        processing_time_ms = (embed_done - processing_start) * 1000
+                        self.last_processing_ms = processing_time_ms
+                        stage_ms = {
+                            'queue': (processing_start - frame_ts) * 1000,
+                            'detect': (detect_done - processing_start) * 1000,
+                            'embed': (embed_done - detect_done) * 1000,
+                        }
+                        if rate is not None:
+                            fps = rate.update(processing_time_ms / 1000.0, processing_start - frame_ts,
+                                                    bool(faces), time.time())
+                            self.target_dt = 1.0 / fps
                     
-                    evts = []
-                    best_sim = None
+                        evts = []
+                        best_sim = None
                     
-                    for f in faces:
-                        emb = f.embedding
-                        emb = emb / (np.linalg.norm(emb) + 1e-10)
-                        matched = False
-                        sim = 0.0
-                        person_id = None
-                        person_name = None
-                        
-                        # Recognition logic
-                        if self.mode == 'single' and self.known is not None:
-                            sim = float(np.dot(self.known, emb))
-                            matched = sim >= self.threshold
-                        else:
-                            # watchlist mode
-                            best = None
-                            for pid, pname, e in self.gallery:
-                                s = float(np.dot(e, emb))
-                                if best is None or s > best[0]:
-                                    best = (s, pid, pname)
-                            if best is not None:
-                                sim = best[0]
-                                if sim >= self.threshold:
-                                    matched = True
-                                    person_id = best[1]
-                                    person_name = best[2]
+                        for f, track in zip(faces, tracks):
+                            if getattr(f, 'embedding', None) is not None:
+                                # Recognition logic (fresh embedding)
+                                emb = f.embedding
+                                emb = emb / (np.linalg.norm(emb) + 1e-10)
+                                sim, matched, person_id, person_name = params.match(emb)
+                                if track is not None:
+                                    tracker.record(track, frame_ts, emb, (sim, matched, person_id, person_name), params)
+                                    tracker.recognized += 1
+                            elif track is not None and track.result is not None:
+                                # Same face as on the previous frames: carry its identity forward
+                                f.embedding = emb = track.embedding
+                                sim, matched, person_id, person_name = track.result
+                                tracker.reused += 1
+                            else:
+                                continue  # recognition model produced no embedding
                         
-                        if best_sim is None or sim > best_sim:
-                            best_sim = sim
+                            if best_sim is None or sim > best_sim:
+                                best_sim = sim
                             
-                        # Extract comprehensive face features
-                        bbox = f.bbox.astype(int).tolist()
-                        x1, y1, x2, y2 = bbox
+                            # Extract comprehensive face features
+                            bbox = f.bbox.astype(int).tolist()
+                            x1, y1, x2, y2 = bbox
                         
-                        # Ensure bbox is within frame boundaries
-                        h, w = frame.shape[:2]
-                        x1 = max(0, min(x1, w-1))
-                        y1 = max(0, min(y1, h-1))
-                        x2 = max(x1+1, min(x2, w))
-                        y2 = max(y1+1, min(y2, h))
-                        bbox = [x1, y1, x2, y2]
+                            # Ensure bbox is within frame boundaries
+                            h, w = frame.shape[:2]
+                            x1 = max(0, min(x1, w-1))
+                            y1 = max(0, min(y1, h-1))
+                            x2 = max(x1+1, min(x2, w))
+                            y2 = max(y1+1, min(y2, h))
+                            bbox = [x1, y1, x2, y2]
                         
-                        face_crop = frame[y1:y2, x1:x2]
+                            face_crop = frame[y1:y2, x1:x2]
                         
-                        # Validate face crop is not empty
-                        if face_crop is None or face_crop.size == 0:
-                            continue  # Skip this face if crop failed
+                            # Validate face crop is not empty
+                            if face_crop is None or face_crop.size == 0:
+                                continue  # Skip this face if crop failed
                         
-                        # Extract detailed facial features and metadata
-                        features = _extract_face_features(f, face_crop)
+                            # Extract detailed facial features and metadata
+                            features = _extract_face_features(f, face_crop)
                         
-                        # Calculate image quality for the face crop
-                        quality_score = calculate_image_quality(face_crop)
-                        is_low_quality = quality_score < QUALITY_THRESHOLD
+                            # Calculate image quality for the face crop
+                            quality_score = calculate_image_quality(face_crop)
+                            is_low_quality = quality_score < QUALITY_THRESHOLD
                         
-                        # Save thumbnail
-                        rel = _save_thumb(frame, bbox, f"rtsp_{self.cam_id}_{self.frame_idx}")
+                            # Save thumbnail
+                            rel = _save_thumb(frame, bbox, f"rtsp_{self.cam_id}_{self.frame_idx}")
                         
-                        # Save full frame image
-                        full_image_path = None
-                        try:
-                            timestamp = int(self.last_seen * 1000)
-                            full_image_filename = f"full_{self.cam_id}_{timestamp}_{self.frame_idx}.jpg"
-                            full_image_path = os.path.join(UPLOAD_DIR, full_image_filename)
-                            cv2.imwrite(full_image_path, frame)
-                        except Exception as e:
-                            print(f"Failed to save full image: {e}")
+                            # Save full frame image
                             full_image_path = None
+                            try:
+                                timestamp = int(frame_ts * 1000)
+                                full_image_filename = f"full_{self.cam_id}_{timestamp}_{self.frame_idx}.jpg"
+                                full_image_path = os.path.join(UPLOAD_DIR, full_image_filename)
+                                cv2.imwrite(full_image_path, frame)
+                            except Exception as e:
+                                print(f"Failed to save full image: {e}")
+                                full_image_path = None
                         
-                        # Enhance features with recognition results
-                        features['recognition_details']['similarity_score'] = sim
-                        features['recognition_details']['recognition_threshold'] = self.threshold
-                        features['processing']['time_ms'] = processing_time_ms
-                        features['processing']['fps'] = 1.0 / self.target_dt if self.target_dt > 0 else 0.0
+                            # Enhance features with recognition results
+                            features['recognition_details']['similarity_score'] = sim
+                            features['recognition_details']['recognition_threshold'] = params.threshold
+                            features['processing']['time_ms'] = processing_time_ms
+                            features['processing']['fps'] = 1.0 / self.target_dt if self.target_dt > 0 else 0.0
+                            features['processing']['model_version'] = f"{DET_MODEL_VERSION}@det{det_size}"
                         
-                        # Classification based on recognition results
-                        if matched:
-                            features['classification']['event_type'] = 'recognized'
-                            features['classification']['alert_level'] = 'medium' if sim >= 0.8 else 'low'
-                        else:
-                            features['classification']['event_type'] = 'unknown'
-                            features['classification']['alert_level'] = 'info'
+                            # Classification based on recognition results
+                            if matched:
+                                features['classification']['event_type'] = 'recognized'
+                                features['classification']['alert_level'] = 'medium' if sim >= 0.8 else 'low'
+                            else:
+                                features['classification']['event_type'] = 'unknown'
+                                features['classification']['alert_level'] = 'info'
                         
-                        # Add tracking info (basic implementation)
-                        track_id = f"track_{self.cam_id}_{self.frame_idx}"
-                        features['tracking']['is_new_track'] = True  # For now, each detection is new
+                            # Add tracking info
+                            if track is not None:
+                                track_id = f"track_{self.cam_id}_{track.id}"
+                                features['tracking'].update(duration=round(frame_ts - track.first_ts, 3),
+                                                            is_new_track=track.hits == 1)
+                            else:
+                                track_id = f"track_{self.cam_id}_{self.frame_idx}"
+                                features['tracking']['is_new_track'] = True
                         
-                        # Insert event into DB with cooldown (1s) and enhanced metadata
-                        now_ms = int(self.last_seen * 1000)
-                        if (self.last_seen - self._last_emit_ts) >= 1.0:
-                            try:
-                                # Prepare enhanced event data structure
-                                event_data = {
-                                    'camera_id': self.cam_id,
-                                    'ts': now_ms,
-                                    'confidence': sim,
-                                    'bbox': bbox,
-                                    'thumb_relpath': rel,
-                                    'matched': matched,
-                                    'person_id': person_id,
-                                    'person_name': person_name,
-                                    'quality_score': quality_score,
-                                    'is_low_quality': is_low_quality,
-                                    'full_image_path': full_image_path,
-                                    
-                                    # Enhanced metadata from features
-                                    'track_id': track_id,
-                                    'frame_number': self.frame_idx,
-                                    **features  # Merge all extracted features
-                                }
-                                
-                                dbm.insert_event(DB_CONN, event_data)
-                                self._last_emit_ts = self.last_seen
-                                      
-                            except Exception as e:
-                                print(f"Failed to insert enhanced event: {e}")
-                                # Fallback to basic event insertion
+                            # Insert event into DB with cooldown (1s) and enhanced metadata
+                            now_ms = int(frame_ts * 1000)
+                            if (frame_ts - self._last_emit_ts) >= 1.0:
                                 try:
-                                    dbm.insert_event(DB_CONN, {
+                                    # Prepare enhanced event data structure
+                                    event_data = {
                                         'camera_id': self.cam_id,
                                         'ts': now_ms,
                                         'confidence': sim,
@@ -1067,100 +2687,160 @@ class RtspWorker:
                                         'matched': matched,
                                         'person_id': person_id,
                                         'person_name': person_name,
-                                        'extra': {'mode': self.mode, 'quality_score': quality_score},
                                         'quality_score': quality_score,
                                         'is_low_quality': is_low_quality,
-                                        'full_image_path': full_image_path
-                                    })
-                                except Exception as e2:
-                                    print(f"Fallback event insertion also failed: {e2}")
-                                    pass
-                        # For live UI, publish all detection events with enhanced metadata
-                        # Publish both matched and unmatched events for live monitoring
-                        evt = {
-                            # Core identification
-                            'id': self.cam_id,
-                            'frame': self.frame_idx,
-                            'timeSec': round(self.last_seen, 3),
-                            'timestamp': now_ms,
-                            'confidence': round(sim, 4),
-                            'bbox': bbox,
-                            'thumb_relpath': rel,
-                            'matched': matched,
-                            'person_id': person_id,
-                            'person_name': person_name if matched else 'Unknown',
+                                        'full_image_path': full_image_path,
+                                    
+                                        # Enhanced metadata from features
+                                        'track_id': track_id,
+                                        'frame_number': self.frame_idx,
+                                        'capture_ts': now_ms,
+                                        'latency_ms': (time.time() - frame_ts) * 1000,
+                                        'latency_breakdown': {k: round(v, 2) for k, v in stage_ms.items()},
+                                        **features  # Merge all extracted features
+                                    }
+                                
+                                    dbm.insert_event(DB_CONN, event_data)
+                                    self._last_emit_ts = frame_ts
+                                      
+                                except Exception as e:
+                                    print(f"Failed to insert enhanced event: {e}")
+                                    # Fallback to basic event insertion
+                                    try:
+                                        dbm.insert_event(DB_CONN, {
+                                            'camera_id': self.cam_id,
+                                            'ts': now_ms,
+                                            'confidence': sim,
+                                            'bbox': bbox,
+                                            'thumb_relpath': rel,
+                                            'matched': matched,
+                                            'person_id': person_id,
+                                            'person_name': person_name,
+                                            'extra': {'mode': params.mode, 'quality_score': quality_score},
+                                            'quality_score': quality_score,
+                                            'is_low_quality': is_low_quality,
+                                            'full_image_path': full_image_path
+                                        })
+                                    except Exception as e2:
+                                        print(f"Fallback event insertion also failed: {e2}")
+                                        pass
+                            # For live UI, publish all detection events with enhanced metadata
+                            # Publish both matched and unmatched events for live monitoring
+                            evt = {
+                                # Core identification
+                                'id': self.cam_id,
+                                'frame': self.frame_idx,
+                                'timeSec': round(frame_ts, 3),
+                                'timestamp': now_ms,
+                                'confidence': round(sim, 4),
+                                'bbox': bbox,
+                                'thumb_relpath': rel,
+                                'matched': matched,
+                                'person_id': person_id,
+                                'person_name': person_name if matched else 'Unknown',
                             
-                            # Enhanced metadata for rich UI display
-                            'quality_score': round(quality_score, 3),
-                            'is_low_quality': is_low_quality,
-                            'track_id': track_id,
+                                # Enhanced metadata for rich UI display
+                                'quality_score': round(quality_score, 3),
+                                'is_low_quality': is_low_quality,
+                                'track_id': track_id,
                             
-                            # Face metrics for display
-                            'face_width': features['face_metrics']['width'],
-                            'face_height': features['face_metrics']['height'],
-                            'face_size': features['face_metrics']['size'],
+                                # Face metrics for display
+                                'face_width': features['face_metrics']['width'],
+                                'face_height': features['face_metrics']['height'],
+                                'face_size': features['face_metrics']['size'],
                             
-                            # Facial features for UI display
-                            'age_estimate': features['facial_features']['age']['estimate'],
-                            'gender': features['facial_features']['gender']['name'],
-                            'age_confidence': features['facial_features']['age']['confidence'],
-                            'gender_confidence': features['facial_features']['gender']['confidence'],
+                                # Facial features for UI display
+                                'age_estimate': features['facial_features']['age']['estimate'],
+                                'gender': features['facial_features']['gender']['name'],
+                                'age_confidence': features['facial_features']['age']['confidence'],
+                                'gender_confidence': features['facial_features']['gender']['confidence'],
                             
-                            # Recognition details
-                            'similarity_score': round(sim, 4),
-                            'recognition_threshold': self.threshold,
+                                # Recognition details
+                                'similarity_score': round(sim, 4),
+                                'recognition_threshold': params.threshold,
                             
-                            # Event classification
-                            'event_type': features['classification']['event_type'],
-                            'alert_level': features['classification']['alert_level'],
+                                # Event classification
+                                'event_type': features['classification']['event_type'],
+                                'alert_level': features['classification']['alert_level'],
                             
-                            # Processing metrics
-                            'processing_time_ms': round(processing_time_ms, 2),
-                            'model_version': features['processing']['model_version'],
+                                # Processing metrics
+                                'processing_time_ms': round(processing_time_ms, 2),
+                                'capture_ts': now_ms,
+                                'model_version': features['processing']['model_version'],
+                                'det_size': det_size,
+                                'detection_threshold': features['recognition_details'].get('detection_threshold'),
                             
-                            # Image quality details
-                            'sharpness': features['face_metrics'].get('sharpness'),
-                            'brightness': features['face_metrics'].get('brightness')
-                        }
-                        evts.append(evt)
-                    # annotate frame for snapshot with detection results
-                    try:
-                        # Create annotated frame for streaming
-                        annotated_frame = frame.copy()
-                        for f in faces:
-                            bbox = f.bbox.astype(int)
-                            x1, y1, x2, y2 = bbox
-                            # Draw face bounding box
-                            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                                # Image quality details
+                                'sharpness': features['face_metrics'].get('sharpness'),
+                                'brightness': features['face_metrics'].get('brightness')
+                            }
+                            evts.append(evt)
+                        persist_done = time.time()
+                        # annotate frame for snapshot with detection results
+                        try:
+                            # Draw overlays on the stream-size image: the downscaled copy for large
+                            # frames, else the frame itself (nothing reads it after this point)
+                            annotated_frame = self._stream_canvas(frame, display)
+                            scale = annotated_frame.shape[1] / frame.shape[1]
+                            for f in faces:
+                                bbox = f.bbox.astype(int)
+                                x1, y1, x2, y2 = (bbox * scale).astype(int)
+                                # Draw face bounding box
+                                cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
                             
-                            # Add confidence score if we have events
-                            conf_text = ""
-                            for e in evts:
-                                if e['bbox'] == bbox.tolist():
-                                    conf_text = f"{e['confidence']:.2f}"
-                                    if e.get('person_name'):
-                                        conf_text += f" - {e['person_name']}"
-                                    break
+                                # Add confidence score if we have events
+                                conf_text = ""
+                                for e in evts:
+                                    if e['bbox'] == bbox.tolist():
+                                        conf_text = f"{e['confidence']:.2f}"
+                                        if e.get('person_name'):
+                                            conf_text += f" - {e['person_name']}"
+                                        break
                             
-                            if conf_text:
-                                cv2.putText(annotated_frame, conf_text, (x1, max(0, y1-10)), 
-                                          cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+                                if conf_text:
+                                    cv2.putText(annotated_frame, conf_text, (x1, max(0, y1-10)), 
+                                              cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
                         
-                        # Update the JPEG with annotated frame for streaming
-                        ok2, buf = cv2.imencode('.jpg', annotated_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                        if ok2:
-                            self._last_jpeg = buf.tobytes()
-                    except Exception:
-                        pass
+                            # Update the JPEG with annotated frame for streaming
+                            ok2, buf = cv2.imencode('.jpg', annotated_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                            if ok2:
+                                self._last_jpeg = buf.tobytes()
+                                self._last_jpeg_width = annotated_frame.shape[1]
+                        except Exception:
+                            pass
                         
-                    for e in evts:
-                        self.matches_count += 1
-                        self.publish(e)
-                    # update last_confidence with the best similarity from this frame (may be unmatched)
-                    if best_sim is not None:
-                        self.last_confidence = float(best_sim)
+                        for e in evts:
+                            self.matches_count += 1
+                            e['latency_ms'] = round((time.time() - frame_ts) * 1000, 2)
+                            self.publish(e)
+                        if evts:
+                            publish_done = time.time()
+                            # 'publish' covers the annotated snapshot encode and the SSE fan-out
+                            stage_ms.update(persist=(persist_done - embed_done) * 1000,
+                                            publish=(publish_done - persist_done) * 1000,
+                                            capture_to_event=(persist_done - frame_ts) * 1000,
+                                            capture_to_publish=(publish_done - frame_ts) * 1000)
+                        self.latency.add(**stage_ms)
+                        # update last_confidence with the best similarity from this frame (may be unmatched)
+                        if best_sim is not None:
+                            self.last_confidence = float(best_sim)
+                    except Exception as e:
+                        # one bad frame (model error, scheduler timeout, ...) must not end the camera
+                        self.frames_failed += 1
+                        self.last_error = f'frame processing failed: {e}'
+                        print(f"⚠️ Camera {self.cam_id}: {self.last_error}")
             finally:
-                cap.release()
+                self._stop_capture()
+            if self.stop_event.is_set():
+                break
+            # Stalled: the capture is released, reconnect with backoff
+            if self._outage_start is None:
+                self._outage_start = self.last_seen or time.time()
+            self.reconnects += 1
+            print(f"⚠️ Camera {self.cam_id} stalled ({self.last_error}), reconnecting")
+            self._set_health(HEALTH_RECONNECTING)
+            self._backoff_sleep(backoff)
+            backoff = min(10.0, backoff * 2.0)
 
 
 RTSP_WORKERS: Dict[str, RtspWorker] = {}
@@ -1175,16 +2855,187 @@ def _parse_float(val: Optional[str], default: float) -> float:
         return default
 
 
+def _parse_bool(val: Optional[str], default: bool) -> bool:
+    if val is None:
+        return default
+    return str(val).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _worker_options(cam: Dict[str, Any]) -> Dict[str, Any]:
+    """RtspWorker keyword options stored with a camera record (column name == kwarg name)."""
+    def _get(key, default):
+        val = cam.get(key)
+        return default if val is None else val
+    return {
+        'decoder': _get('decoder', 'inprocess'),
+        'motion_gate': bool(_get('motion_gate', 0)),
+        'motion_threshold': float(_get('motion_threshold', 0.01)),
+        'motion_keepalive_s': float(_get('motion_keepalive_s', 2.0)),
+        'substream_url': cam.get('substream_url') or None,
+        'decode_mode': _get('decode_mode', 'all'),
+        'decode_fraction': float(_get('decode_fraction', 0.25)),
+        'roi': cam.get('roi') or None,
+        'schedule': cam.get('schedule') or None,
+        'adaptive_fps': bool(_get('adaptive_fps', 0)),
+        'fps_min': float(_get('fps_min', 1.0)),
+        'fps_max': float(_get('fps_max', 15.0)),
+        'probe': cam.get('probe') or None,
+        'analysis_width': int(_get('analysis_width', 0)),
+        'display_width': int(_get('display_width', 0)),
+        'tiling': cam.get('tiling') or None,
+        'face_tracking': bool(_get('face_tracking', 1)),
+        'track_refresh_s': float(_get('track_refresh_s', 2.0)),
+        'det_profile': _stored_det_profile(cam.get('det_profile')),
+    }
+
+
+def _worker_options_from_form(form, base: Dict[str, Any]) -> Dict[str, Any]:
+    """Override stored camera options with the ones present in a request form. Raises ValueError."""
+    opts = dict(base)
+    if form.get('decoder') is not None:
+        opts['decoder'] = form.get('decoder').lower()
+        if opts['decoder'] not in DECODER_MODES:
+            raise ValueError(f'decoder must be one of {list(DECODER_MODES)}')
+    opts['motion_gate'] = _parse_bool(form.get('motion_gate'), opts['motion_gate'])
+    opts['motion_threshold'] = _parse_float(form.get('motion_threshold'), opts['motion_threshold'])
+    opts['motion_keepalive_s'] = _parse_float(form.get('motion_keepalive_s'), opts['motion_keepalive_s'])
+    if form.get('substream_url') is not None:
+        opts['substream_url'] = form.get('substream_url').strip() or None
+    if form.get('decode_mode') is not None:
+        opts['decode_mode'] = form.get('decode_mode').lower()
+        if opts['decode_mode'] not in DECODE_MODES:
+            raise ValueError(f'decode_mode must be one of {list(DECODE_MODES)}')
+    opts['decode_fraction'] = _parse_float(form.get('decode_fraction'), opts['decode_fraction'])
+    if form.get('roi') is not None:
+        opts['roi'] = _parse_roi(form.get('roi'))
+    if form.get('schedule') is not None:
+        opts['schedule'] = parse_schedule(form.get('schedule'))
+    if form.get('tiling') is not None:
+        opts['tiling'] = _parse_tiling(form.get('tiling'))
+    opts['adaptive_fps'] = _parse_bool(form.get('adaptive_fps'), opts['adaptive_fps'])
+    opts['fps_min'] = _parse_float(form.get('fps_min'), opts['fps_min'])
+    opts['fps_max'] = _parse_float(form.get('fps_max'), opts['fps_max'])
+    opts['face_tracking'] = _parse_bool(form.get('face_tracking'), opts['face_tracking'])
+    opts['det_profile'] = _parse_det_profile(form.get('det_profile') or opts['det_profile'])
+    opts['track_refresh_s'] = _parse_float(form.get('track_refresh_s'), opts['track_refresh_s'])
+    for key in ('analysis_width', 'display_width'):
+        opts[key] = int(_parse_float(form.get(key), opts[key]))
+        if opts[key] and not 64 <= opts[key] <= 7680:
+            raise ValueError(f'{key} must be 0 (native) or 64..7680 pixels')
+    if opts['display_width'] and not opts['analysis_width']:
+        raise ValueError('display_width needs analysis_width')
+    if opts['analysis_width'] and opts['decoder'] == 'subprocess':
+        # analysis_width decodes through an ffmpeg pipe owned by the worker, not a decoder child
+        raise ValueError('analysis_width cannot be combined with decoder=subprocess')
+    if _parse_bool(form.get('reprobe'), False):
+        opts['probe'] = None
+    if not 0.0 < opts['fps_min'] <= opts['fps_max']:
+        raise ValueError('fps_min/fps_max must satisfy 0 < fps_min <= fps_max')
+    if not 0.0 < opts['motion_threshold'] <= 1.0:
+        raise ValueError('motion_threshold must be a changed-pixel fraction in (0, 1]')
+    if not 0.0 < opts['decode_fraction'] <= 1.0:
+        raise ValueError('decode_fraction must be in (0, 1]')
+    if opts['track_refresh_s'] <= 0.0:
+        raise ValueError('track_refresh_s must be > 0')
+    return opts
+
+
+def _load_gallery() -> list:
+    """Watchlist embeddings as RtspWorker gallery tuples (person_id, person_name, embedding)."""
+    gallery = []
+    for p in dbm.get_watchlist(DB_CONN):
+        for vec in p.get('embeddings', []):
+            try:
+                arr = np.array(vec, dtype=np.float32)
+            except Exception:
+                continue
+            gallery.append((p['person_id'], p['person_name'], arr))
+    return gallery
+
+
+def _start_camera_workers(cams: list, progress: Optional[Dict[str, Any]] = None):
+    """(Re)start workers for camera records. Returns (started_ids, failed).
+
+    The watchlist is loaded once for all cameras, running workers are stopped in
+    parallel, and first connects are spread over START_JITTER_S (connects are also
+    bounded by _CONNECT_SLOTS) so a site does not reconnect all at once.
+    """
+    cams = [c for c in cams if c.get('url')]
+    gallery = _load_gallery()
+    running = [RTSP_WORKERS.pop(c['id']) for c in cams if c['id'] in RTSP_WORKERS]
+    if running:
+        with ThreadPoolExecutor(max_workers=CONNECT_CONCURRENCY) as pool:
+            list(pool.map(lambda w: w.stop(), running))
+    started, failed = [], []
+    for cam in cams:
+        cam_id = cam['id']
+        try:
+            w = RtspWorker(
+                cam_id,
+                cam['url'],
+                None,
+                threshold=float(cam['threshold'] if cam.get('threshold') is not None else 0.6),
+                target_fps=float(cam.get('fps') or 15.0),
+                transport=cam.get('transport') or 'tcp',
+                timeout_ms=5000000,
+                mode=cam.get('mode') or 'watchlist',
+                gallery=gallery,
+                **_worker_options(cam)
+            )
+            RTSP_WORKERS[cam_id] = w
+            w.start(delay=random.uniform(0.0, START_JITTER_S) if len(cams) > 1 else 0.0)
+            started.append(cam_id)
+        except Exception as e:
+            failed.append({'id': cam_id, 'error': str(e)})
+        if progress is not None:
+            progress['started'] = len(started)
+            progress['failed'] = list(failed)
+    return started, failed
+
+
+def _get_camera(cam_id: str) -> Optional[Dict[str, Any]]:
+    return next((c for c in dbm.list_cameras(DB_CONN) if c['id'] == cam_id), None)
+
+
 @app.route('/api/rtsp/start', methods=['POST'])
 def api_rtsp_start():
     """
     Start RTSP monitoring for a camera.
     multipart/form-data expected:
       - id: camera id (optional, generated if missing)
-      - url: rtsp url (required)
+      - url: rtsp url (required); file://, dir:// and synthetic:// test sources are
+        accepted too, and push:// for frames POSTed to /api/ingest/<id>/frames
       - known: image file containing the known face (required for now)
       - threshold: float (optional, default 0.6)
       - fps: float target processing fps (optional, default 15.0)
+      - decoder: 'inprocess' | 'subprocess' (optional)
+      - motion_gate, motion_threshold, motion_keepalive_s: skip detection on static scenes (optional)
+      - substream_url: low-res camera sub-stream used for detection; url is then only
+        decoded to BGR when a face is found (optional, empty string clears it)
+      - decode_mode: all | keyframes | fraction, decode_fraction: kept share of frames
+        in 'fraction' mode (optional; for low-FPS cameras)
+      - roi: JSON list of detection zones, polygons [[x, y], ...] or rectangles
+        [x1, y1, x2, y2] in 0..1 frame coordinates (optional, empty string clears it)
+      - adaptive_fps, fps_min, fps_max: let recognition FPS follow load and face presence
+        within [fps_min, fps_max], starting from fps (optional)
+      - schedule: JSON weekly windows, e.g. {"windows": [{"days": "mon-fri", "start": "08:00",
+        "end": "18:00"}], "outside": "snapshot" | "pause" | "reduced", "outside_fps": 0.5}
+        (optional, empty string clears it)
+      - tiling: JSON tiled-detection layout for 4K / wide-angle cameras, e.g. {"cols": 3,
+        "rows": 2, "overlap": 0.2, "full_frame": true, "nms_iou": 0.4}; with an roi only the
+        zone is tiled (optional, empty string clears it)
+      - analysis_width: decode straight to this width for recognition (ffmpeg scale filter,
+        camera streams only; optional, 0 = native size)
+      - display_width: live-stream width produced by the same decode (optional, needs
+        analysis_width; default: the analysis frame)
+      - face_tracking: follow faces between frames and run recognition only for new or
+        unconfirmed tracks (optional, default 1); track_refresh_s: re-recognize tracked
+        faces this often (optional, default 2.0)
+      - det_profile: detector input size, one of 320 | 480 | 640 | 1024, or 'auto' to pick
+        the smallest size that keeps this camera's faces detectable (optional, default 640)
+      - reprobe: 1 to redo the decoder variant search (transport x decode threads) that the
+        first connect runs and stores; reconnects reuse the stored variant (optional)
+    Options that are not sent keep the value stored for the camera.
     """
     cam_id = request.form.get('id') or f"cam-{uuid.uuid4().hex[:8]}"
     url = request.form.get('url')
@@ -1201,6 +3052,10 @@ def api_rtsp_start():
     except Exception:
         timeout_ms_int = 5000000
     mode = request.form.get('mode', 'watchlist')
+    try:
+        options = _worker_options_from_form(request.form, _worker_options(_get_camera(cam_id) or {}))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     emb = None
     gallery = None
@@ -1215,15 +3070,7 @@ def api_rtsp_start():
             return jsonify({'error': 'no face detected in known image'}), 400
     else:
         # watchlist mode
-        wl = dbm.get_watchlist(DB_CONN)
-        gallery = []
-        for p in wl:
-            for vec in p.get('embeddings', []):
-                try:
-                    arr = np.array(vec, dtype=np.float32)
-                except Exception:
-                    continue
-                gallery.append((p['person_id'], p['person_name'], arr))
+        gallery = _load_gallery()
         if not gallery:
             return jsonify({'error': 'watchlist is empty; add persons/images first or use mode=single with known'}), 400
 
@@ -1234,7 +3081,7 @@ def api_rtsp_start():
         except Exception:
             pass
 
-    w = RtspWorker(cam_id, url, emb, threshold=thr, target_fps=fps, transport=transport, timeout_ms=timeout_ms_int, mode=mode, gallery=gallery)
+    w = RtspWorker(cam_id, url, emb, threshold=thr, target_fps=fps, transport=transport, timeout_ms=timeout_ms_int, mode=mode, gallery=gallery, **options)
     RTSP_WORKERS[cam_id] = w
     w.start()
     # persist camera
@@ -1248,6 +3095,8 @@ def api_rtsp_start():
             'threshold': thr,
             'mode': mode,
             'enabled': 1,
+            # the worker persists its own probe results
+            **{k: v for k, v in options.items() if k != 'probe'},
         })
     except Exception:
         pass
@@ -1299,14 +3148,88 @@ def api_rtsp_status(cam_id: str):
         'status': 'running' if running else 'stopped',
         'last_seen': w.last_seen,
         'matches_count': w.matches_count,
+        'frames_processed': w.frame_idx,
         'last_error': w.last_error,
         'last_confidence': w.last_confidence,
+        # Capture/recognition decoupling: frames the recognition loop never saw and
+        # frames that were already old when it picked them up
+        **w.frame_stats(),
+        **w.health_stats(),
+        **w.gate_stats(),
+        **w.rate_stats(),
+        'latency_ms': w.latency.percentiles(),
+        'decoder': w.decoder,
+        'source': source_kind(w.substream_url or w.url),
+        'decode_mode': w.decode_mode,
+        'decode_mode_active': w._decode_mode_active,
+        'dual_stream': bool(w.substream_url),
+        'roi': w._zone.polygons if w._zone is not None else None,
+        'faces_outside_roi': w._zone.faces_dropped if w._zone is not None else 0,
+        'tiling': w._tiler.spec if w._tiler is not None else None,
+        'tiles_run': w._tiler.tiles_run if w._tiler is not None else 0,
+        'det_profile': w.det_profile,
+        'det_size': w.det_size,
+        'face_tracking': w._tracker is not None,
+        'active_tracks': len(w._tracker.tracks) if w._tracker is not None else 0,
+        'recognitions_run': w._tracker.recognized if w._tracker is not None else None,
+        'recognitions_reused': w._tracker.reused if w._tracker is not None else None,
+        'main_frames_retrieved': w._main_tap.retrieved if w._main_tap is not None else 0,
+        'main_frame_sync': w._main_tap.stats() if w._main_tap is not None else None,
+        'bus_subscribers': w.frame_bus.subscribers,
+        'probe': w.probe.get(w.substream_url or w.url),
+        'analysis_width': w.analysis_width,
+        'display_width': w.display_width,
     }
+    if w._push_queue is not None:
+        status_data.update({
+            'push_queued': len(w._push_queue),
+            'push_rejected': w._push_queue.rejected,
+            'push_invalid': w._push_queue.invalid,
+        })
     # Convert to JSON-serializable format
     status_data = convert_to_json_serializable(status_data)
     return jsonify(status_data)
 
 
+@app.route('/api/ingest/<cam_id>/frames', methods=['POST'])
+def api_ingest_frames(cam_id: str):
+    """
+    Push-mode ingest for cameras started with url=push://.
+    multipart/form-data expected:
+      - frames: one or more JPEG/PNG files, oldest first
+      - ts: capture time per frame in epoch milliseconds, same order (optional,
+        receive time is used when missing)
+    Frames go through the same detection/matching/event path as live cameras. When the
+    camera's queue is full the remaining frames are refused with 429 and Retry-After.
+    """
+    w = RTSP_WORKERS.get(cam_id)
+    if not w:
+        return jsonify({'error': 'not_found'}), 404
+    if w._push_queue is None:
+        return jsonify({'error': 'camera is not a push:// camera'}), 400
+    files = request.files.getlist('frames')
+    if not files:
+        return jsonify({'error': 'no frames'}), 400
+    stamps = request.form.getlist('ts')
+    batch = []
+    for i, fs in enumerate(files):
+        ts = None
+        if i < len(stamps) and stamps[i] != '':
+            try:
+                ts = float(stamps[i]) / 1000.0
+            except ValueError:
+                return jsonify({'error': f'invalid ts for frame {i}'}), 400
+        batch.append((fs.read(), ts))
+    accepted, rejected = w.submit_frames(batch)
+    body = {'id': cam_id, 'accepted': accepted, 'rejected': rejected, 'queued': len(w._push_queue)}
+    if rejected:
+        resp = jsonify(body)
+        resp.status_code = 429
+        resp.headers['Retry-After'] = str(w.push_retry_after())
+        return resp
+    return jsonify(body)
+
+
 @app.route('/api/rtsp/events/<cam_id>')
 def api_rtsp_events(cam_id: str):
     w = RTSP_WORKERS.get(cam_id)
@@ -1352,6 +3275,74 @@ def api_rtsp_snapshot(cam_id: str):
     return app.response_class(jpg, mimetype='image/jpeg')
 
 
+@app.route('/api/inference/stats')
+def api_inference_stats():
+    """Shared detection scheduler: batch sizes, queueing and per-camera service counts; cpu_pool:
+    the CPU inference processes (workers ready, requests and busy time per worker)."""
+    return jsonify({**INFERENCE.stats(), 'cpu_pool': CPU_POOL.stats()})
+
+
+@app.route('/api/rtsp/previews')
+def api_rtsp_previews():
+    """
+    Low-res previews of many cameras in one response, for camera walls.
+    Query params:
+      - ids: comma-separated camera ids (optional, default: all running cameras)
+      - width: preview width in px (optional, default PREVIEW_WIDTH, 64..640)
+      - format: 'multipart' (default): multipart/mixed, one image/jpeg part per camera with
+        an X-Camera-Id header; 'sprite': a single JPEG grid, with X-Preview-Map holding
+        {"<cam_id>": [x, y, w, h]}
+    Each camera's preview is regenerated at most once per PREVIEW_INTERVAL_S. Cameras with
+    no frame yet are listed in X-Preview-Missing.
+    """
+    ids = [i for i in request.args.get('ids', '').split(',') if i] or sorted(RTSP_WORKERS)
+    try:
+        width = min(640, max(64, int(request.args.get('width', PREVIEW_WIDTH))))
+    except ValueError:
+        return jsonify({'error': 'width must be an integer'}), 400
+    fmt = request.args.get('format', 'multipart')
+    if fmt not in ('multipart', 'sprite'):
+        return jsonify({'error': "format must be 'multipart' or 'sprite'"}), 400
+
+    previews, missing = [], []
+    for cam_id in ids:
+        w = RTSP_WORKERS.get(cam_id)
+        got = w.preview(width) if w else None
+        if got is None:
+            missing.append(cam_id)
+        else:
+            previews.append((cam_id, got[0], got[1]))
+    headers = {'Cache-Control': f'max-age={int(PREVIEW_INTERVAL_S)}', 'X-Preview-Missing': ','.join(missing)}
+
+    if fmt == 'sprite':
+        if not previews:
+            return ('', 204, headers)
+        cols = math.ceil(math.sqrt(len(previews)))
+        cell_h = max(img.shape[0] for _, img, _ in previews)
+        rows = math.ceil(len(previews) / cols)
+        sprite = np.zeros((rows * cell_h, cols * width, 3), dtype=np.uint8)
+        offsets = {}
+        for n, (cam_id, img, _) in enumerate(previews):
+            x, y = (n % cols) * width, (n // cols) * cell_h
+            h, w_ = img.shape[:2]
+            sprite[y:y + h, x:x + w_] = img
+            offsets[cam_id] = [x, y, w_, h]
+        ok, buf = cv2.imencode('.jpg', sprite, [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_QUALITY])
+        if not ok:
+            return jsonify({'error': 'encode failed'}), 500
+        headers['X-Preview-Map'] = json.dumps(offsets, separators=(',', ':'))
+        return app.response_class(buf.tobytes(), mimetype='image/jpeg', headers=headers)
+
+    boundary = 'preview'
+    body = bytearray()
+    for cam_id, _, jpg in previews:
+        body += (f'--{boundary}\r\nContent-Type: image/jpeg\r\nX-Camera-Id: {cam_id}\r\n'
+                 f'Content-Length: {len(jpg)}\r\n\r\n').encode()
+        body += jpg + b'\r\n'
+    body += f'--{boundary}--\r\n'.encode()
+    return app.response_class(bytes(body), mimetype=f'multipart/mixed; boundary={boundary}', headers=headers)
+
+
 @app.route('/api/rtsp/stream/<cam_id>')
 def api_rtsp_stream(cam_id: str):
     """
@@ -1479,7 +3470,19 @@ def api_watchlist():
 
 @app.route('/api/cameras', methods=['GET'])
 def api_cameras():
-    return jsonify({'cameras': dbm.list_cameras(DB_CONN)})
+    cams = dbm.list_cameras(DB_CONN)
+    now = datetime.now()
+    for cam in cams:
+        w = RTSP_WORKERS.get(cam['id'])
+        if w is not None:
+            cam['schedule_state'] = w.schedule_info(now)
+        elif cam.get('schedule'):
+            sched = CameraSchedule(cam['schedule'])
+            cam['schedule_state'] = {'state': 'stopped', 'today': sched.today(now),
+                                     'outside': sched.spec['outside'], 'outside_fps': sched.outside_fps}
+        else:
+            cam['schedule_state'] = None
+    return jsonify({'cameras': cams})
 
 
 @app.route('/api/cameras/cleanup', methods=['POST'])
@@ -1506,58 +3509,8 @@ def api_cameras_cleanup():
 def api_cameras_reload():
     """Reload all enabled cameras from database"""
     try:
-        cameras = dbm.list_cameras(DB_CONN)
-        reloaded = []
-        failed = []
-        
-        for cam in cameras:
-            if cam.get('enabled') != 1:
-                continue
-                
-            cam_id = cam['id']
-            
-            # Stop existing worker if running
-            if cam_id in RTSP_WORKERS:
-                try:
-                    RTSP_WORKERS[cam_id].stop()
-                    del RTSP_WORKERS[cam_id]
-                except Exception:
-                    pass
-            
-            # Get mode and setup
-            mode = cam.get('mode', 'watchlist')
-            gallery = []
-            emb = None
-            
-            if mode == 'watchlist':
-                wl = dbm.get_watchlist(DB_CONN)
-                for p in wl:
-                    for vec in p.get('embeddings', []):
-                        try:
-                            arr = np.array(vec, dtype=np.float32)
-                            gallery.append((p['person_id'], p['person_name'], arr))
-                        except Exception:
-                            continue
-            
-            # Start worker
-            try:
-                w = RtspWorker(
-                    cam_id, 
-                    cam['url'], 
-                    emb,
-                    threshold=cam.get('threshold', 0.6),
-                    target_fps=cam.get('fps', 15.0),
-                    transport=cam.get('transport', 'tcp'),
-                    timeout_ms=5000000,
-                    mode=mode,
-                    gallery=gallery
-                )
-                RTSP_WORKERS[cam_id] = w
-                w.start()
-                reloaded.append(cam_id)
-            except Exception as e:
-                failed.append({'id': cam_id, 'error': str(e)})
-        
+        cameras = [c for c in dbm.list_cameras(DB_CONN) if c.get('enabled') == 1]
+        reloaded, failed = _start_camera_workers(cameras)
         return jsonify({
             'reloaded': reloaded,
             'failed': failed,
@@ -1567,6 +3520,109 @@ def api_cameras_reload():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/cameras/boot-status', methods=['GET'])
+def api_cameras_boot_status():
+    """Progress of the background camera start after server boot."""
+    status = dict(BOOT_STATUS)
+    workers = [RTSP_WORKERS.get(cam_id) for cam_id in status.get('cameras', [])]
+    status['streaming'] = sum(1 for w in workers if w is not None and w.health == HEALTH_STREAMING)
+    status['connecting'] = sum(1 for w in workers if w is not None and w.health != HEALTH_STREAMING)
+    return jsonify(status)
+
+
+@app.route('/api/cameras/<cam_id>', methods=['PATCH'])
+def api_camera_patch(cam_id):
+    """
+    Change a running camera's parameters without reconnecting its stream.
+    JSON body or form fields, all optional:
+      - threshold, fps, mode ('watchlist' | 'single'), name
+      - reload_gallery: re-read the watchlist (watchlist mode)
+      - known: image file with the face to match (mode=single, multipart only)
+      - motion_gate, motion_threshold, motion_keepalive_s, roi, tiling, adaptive_fps, fps_min,
+        fps_max, schedule, face_tracking, track_refresh_s, det_profile
+    Stream settings (url, transport, decoder, substream_url, decode_mode, ...) need
+    /api/rtsp/start. Changes are persisted to the camera record.
+    """
+    w = RTSP_WORKERS.get(cam_id)
+    if not w:
+        return jsonify({'error': 'not_found'}), 404
+    data = request.get_json(silent=True) if request.is_json else request.form
+    data = data or {}
+    stream_keys = [k for k in ('url', 'transport', 'timeout_ms', 'decoder', 'substream_url',
+                               'decode_mode', 'decode_fraction', 'analysis_width', 'display_width')
+                   if k in data]
+    if stream_keys:
+        return jsonify({'error': f'{stream_keys} cannot change on a running stream; use /api/rtsp/start'}), 409
+
+    cam = _get_camera(cam_id) or {}
+    current = {**_worker_options(cam), **{k: getattr(w, k) for k in ('decoder', 'substream_url', 'decode_mode')}}
+    try:
+        options = _worker_options_from_form(data, current)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    live: Dict[str, Any] = {}
+    for group in LIVE_OPTION_GROUPS:
+        if any(k in data for k in group):
+            live.update((k, options[k]) for k in group)
+    try:
+        threshold = float(data['threshold']) if data.get('threshold') is not None else None
+        fps = float(data['fps']) if data.get('fps') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'threshold and fps must be numbers'}), 400
+    if fps is not None and fps <= 0:
+        return jsonify({'error': 'fps must be > 0'}), 400
+    mode = data.get('mode')
+    if mode is not None and mode not in ('watchlist', 'single'):
+        return jsonify({'error': "mode must be 'watchlist' or 'single'"}), 400
+
+    known_emb = None
+    known_fs = request.files.get('known')
+    if known_fs is not None:
+        rec = store.save_upload(known_fs, 'image')
+        img = cv2.imread(rec['path'])
+        known_emb, _ = _face_embedding(img) if img is not None else (None, None)
+        if known_emb is None:
+            return jsonify({'error': 'no face detected in known image'}), 400
+    if (mode or w.mode) == 'single' and known_emb is None and w.known is None:
+        return jsonify({'error': 'mode=single needs a known image'}), 400
+    gallery = None
+    if _parse_bool(data.get('reload_gallery'), False) or (mode == 'watchlist' and w.mode != 'watchlist'):
+        gallery = _load_gallery()
+        if not gallery:
+            return jsonify({'error': 'watchlist is empty; add persons/images first'}), 400
+
+    w.reconfigure(threshold=threshold, target_fps=fps, mode=mode, known_emb=known_emb, gallery=gallery, **live)
+
+    try:
+        dbm.upsert_camera(DB_CONN, {
+            'id': cam_id,
+            'name': data.get('name') or cam.get('name') or cam_id,
+            'url': w.url,
+            'transport': w.transport,
+            'fps': fps if fps is not None else cam.get('fps', 1.0 / w.target_dt),
+            'threshold': w.threshold,
+            'mode': w.mode,
+            'enabled': cam.get('enabled', 1),
+            **{k: options[k] for k in LIVE_OPTIONS},
+        })
+    except Exception as e:
+        return jsonify({'error': f'applied but not persisted: {e}'}), 500
+    return jsonify({
+        'id': cam_id,
+        'status': 'reconfigured',
+        'threshold': w.threshold,
+        'mode': w.mode,
+        'effective_fps': round(1.0 / w.target_dt, 2),
+        'gallery_size': len(w.gallery),
+        'roi': w._zone.polygons if w._zone is not None else None,
+        'tiling': w._tiler.spec if w._tiler is not None else None,
+        'motion_gate': w._motion_gate is not None,
+        'adaptive_fps': w._rate is not None,
+        'face_tracking': w._tracker is not None,
+        'det_profile': w.det_profile,
+    })
+
+
 @app.route('/api/cameras/<cam_id>', methods=['DELETE'])
 def api_camera_delete(cam_id):
     """Delete a specific camera"""
@@ -2008,37 +4064,38 @@ def api_event_full_image(event_id):
 
 
 # Start enabled cameras (watchlist mode) on boot
+# Background boot progress, see /api/cameras/boot-status
+BOOT_STATUS: Dict[str, Any] = {'state': 'idle', 'total': 0, 'started': 0, 'failed': [], 'cameras': []}
+
+
 def _boot_start_cameras():
+    BOOT_STATUS.update(state='running', started_at=time.time())
     try:
-        cams = dbm.list_cameras(DB_CONN)
-        for c in cams:
-            if int(c.get('enabled', 0)) != 1:
-                continue
-            cam_id = c['id']
-            url = c['url']
-            if not url:
-                continue
-            thr = float(c.get('threshold', 0.6))
-            fps = float(c.get('fps', 3.0))
-            transport = c.get('transport', 'tcp')
-            mode = c.get('mode', 'watchlist')
-            # load watchlist gallery
-            wl = dbm.get_watchlist(DB_CONN)
-            gallery = []
-            for p in wl:
-                for vec in p.get('embeddings', []):
-                    try:
-                        arr = np.array(vec, dtype=np.float32)
-                    except Exception:
-                        continue
-                    gallery.append((p['person_id'], p['person_name'], arr))
-            w = RtspWorker(cam_id, url, None, threshold=thr, target_fps=fps, transport=transport, timeout_ms=5000000, mode=mode, gallery=gallery)
-            RTSP_WORKERS[cam_id] = w
-            w.start()
-    except Exception:
-        pass
+        cams = [c for c in dbm.list_cameras(DB_CONN) if int(c.get('enabled', 0)) == 1 and c.get('url')]
+        BOOT_STATUS.update(total=len(cams), cameras=[c['id'] for c in cams])
+        _start_camera_workers(cams, progress=BOOT_STATUS)
+        BOOT_STATUS['state'] = 'done'
+    except Exception as e:
+        BOOT_STATUS.update(state='error', error=str(e))
+    BOOT_STATUS['finished_at'] = time.time()
+
+# Start cameras off the import path so the HTTP API is up right away
+threading.Thread(target=_boot_start_cameras, daemon=True).start()
+
+SCHEDULE_TICK_S = 15.0
+
 
-_boot_start_cameras()
+def _schedule_loop():
+    """Re-evaluate every running camera's compute schedule."""
+    while True:
+        now = datetime.now()
+        for cam_id, w in list(RTSP_WORKERS.items()):
+            prev = w.schedule_state
+            if w.apply_schedule(now) != prev:
+                print(f"🕒 Camera {cam_id}: schedule {prev} -> {w.schedule_state}")
+        time.sleep(SCHEDULE_TICK_S)
+
+threading.Thread(target=_schedule_loop, daemon=True).start()
 
 # Job status endpoint (file-backed and in-memory)
 @app.route("/api/jobs/<job_id>", methods=["GET"])
@@ -2144,7 +4201,7 @@ def api_video_to_video():
                 ok, frame = capA.read()
                 if not ok:
                     break
-                faces = fa.get(frame)
+                faces = _analyze_faces(frame)
                 for f in faces:
                     emb = _normalize(f.embedding)
                     t = float(idx) / float(fpsA)
@@ -2163,7 +4220,7 @@ def api_video_to_video():
                 ok, frame = capB.read()
                 if not ok:
                     break
-                faces = fa.get(frame)
+                faces = _analyze_faces(frame)
                 for f in faces:
                     emb = _normalize(f.embedding)
                     t = float(idx) / float(fpsB)
@@ -2315,7 +4372,7 @@ def api_video_analysis_start():
                 job['progress'] = progress
                 
                 # Detect faces
-                faces = fa.get(frame)
+                faces = _analyze_faces(frame)
                 num_faces = len(faces)
                 face_counts.append(num_faces)
                 
@@ -2515,6 +4572,8 @@ def api_rtsp_analysis_start():
         threshold = float(request.form.get('threshold', 0.6))
         use_watchlist = request.form.get('use_watchlist', 'true').lower() == 'true'
         skip_frames = int(request.form.get('skip_frames', 1))
+        # Sampling rate when the camera is already running and frames come off its bus (0 = all)
+        sample_fps = float(request.form.get('fps', 0) or 0)
         
         if not rtsp_id:
             return jsonify({'error': 'RTSP ID is required'}), 400
@@ -2536,6 +4595,7 @@ def api_rtsp_analysis_start():
             'threshold': threshold,
             'use_watchlist': use_watchlist,
             'skip_frames': skip_frames,
+            'fps': sample_fps,
             'created_at': time.time(),
             'result': None,
             'error': None
@@ -2567,6 +4627,8 @@ def process_rtsp_analysis_job(job_id: str):
     if not job:
         return
         
+    bus_sub = None
+    worker = None
     try:
         job['status'] = 'running'
         rtsp_id = job['rtsp_id']
@@ -2595,16 +4657,25 @@ def process_rtsp_analysis_job(job_id: str):
             except Exception as e:
                 print(f"Failed to load gallery: {e}")
         
-        # Try to get RTSP URL from camera configuration
-        # In a real implementation, you'd look up the RTSP URL by ID
-        # For now, we'll simulate the process or try common patterns
-        
-        rtsp_urls = [
-            f"rtsp://127.0.0.1:8554/{rtsp_id}",
-            f"rtsp://localhost:8554/{rtsp_id}",
-            f"rtsp://192.168.1.100:554/{rtsp_id}",
-            rtsp_id  # In case full URL is provided
-        ]
+        # A running camera is already decoding this stream: take frames off its bus instead
+        # of opening a second session (some cameras refuse one)
+        worker = RTSP_WORKERS.get(rtsp_id)
+        if worker is not None and worker.thread is not None and worker.thread.is_alive():
+            bus_sub = worker.frame_bus.subscribe(job.get('fps', 0.0))
+            print(f"Analysing {rtsp_id} from the running camera's frame bus")
+
+        rtsp_urls = []
+        if bus_sub is None:
+            # Configured camera that is not running: its own URL first, then common patterns
+            cam = _get_camera(rtsp_id)
+            if cam and cam.get('url'):
+                rtsp_urls.append(cam['url'])
+            rtsp_urls += [
+                f"rtsp://127.0.0.1:8554/{rtsp_id}",
+                f"rtsp://localhost:8554/{rtsp_id}",
+                f"rtsp://192.168.1.100:554/{rtsp_id}",
+                rtsp_id  # In case full URL is provided
+            ]
         
         cap = None
         for rtsp_url in rtsp_urls:
@@ -2642,7 +4713,7 @@ def process_rtsp_analysis_job(job_id: str):
                     cap.release()
                 cap = None
         
-        if cap is None:
+        if cap is None and bus_sub is None:
             # Fallback: generate synthetic data for demo
             print(f"Could not connect to RTSP stream {rtsp_id}, generating demo results")
             result = generate_demo_rtsp_results(rtsp_id, duration)
@@ -2652,9 +4723,15 @@ def process_rtsp_analysis_job(job_id: str):
             return
             
         # Process RTSP stream
-        fps = cap.get(cv2.CAP_PROP_FPS) or 25
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if bus_sub is not None:
+            # Bounded by duration; frames carry their capture time, and the rate they came at
+            # (the camera's, or the subscription's fps) is measured from those
+            fps = 0.0
+            width = height = 0  # taken from the first frame
+        else:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 25
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         
         total_frames = int(duration * fps)
         detections = []
@@ -2668,16 +4745,35 @@ def process_rtsp_analysis_job(job_id: str):
         max_faces_in_frame = 0
         start_time = time.time()
         
-        print(f"Processing RTSP stream: {fps} FPS, {width}x{height}, {total_frames} frames expected")
+        if bus_sub is not None:
+            print(f"Processing camera {rtsp_id} frames for {duration}s")
+        else:
+            print(f"Processing RTSP stream: {fps} FPS, {width}x{height}, {total_frames} frames expected")
         
         valid_frames = 0
         corrupted_frames = 0
         
-        while frame_count < total_frames:
-            ret, frame = cap.read()
-            if not ret:
-                print(f"Failed to read frame {frame_count}, breaking")
-                break
+        last_seq = 0
+        start_ts = frame_ts = None  # capture times of the first and current bus frame
+        while bus_sub is not None or frame_count < total_frames:
+            if bus_sub is not None:
+                if time.time() - start_time >= duration:
+                    break
+                item = bus_sub.get(last_seq, timeout=1.0)
+                if item is None:
+                    if bus_sub.closed:
+                        print(f"Camera {rtsp_id} stopped during analysis, finishing early")
+                        break
+                    continue
+                last_seq, frame_ts, frame = item
+                if start_ts is None:
+                    start_ts = frame_ts
+                    height, width = frame.shape[:2]
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    print(f"Failed to read frame {frame_count}, breaking")
+                    break
                 
             # Skip frames if requested
             if frame_count % skip_frames != 0:
@@ -2687,7 +4783,10 @@ def process_rtsp_analysis_job(job_id: str):
             processed_frames += 1
             
             # Update progress
-            progress = frame_count / total_frames
+            if bus_sub is not None:
+                progress = min(1.0, (time.time() - start_time) / duration)
+            else:
+                progress = frame_count / total_frames
             job['progress'] = progress
             
             # Detect faces
@@ -2698,7 +4797,7 @@ def process_rtsp_analysis_job(job_id: str):
                         # Validate frame data
                         if np.any(frame):  # Frame contains actual data
                             valid_frames += 1
-                            faces = fa.get(frame)
+                            faces = _analyze_faces(frame)
                             frame_detections = []
                             num_faces = len(faces)
                             
@@ -2773,7 +4872,7 @@ def process_rtsp_analysis_job(job_id: str):
                             if frame_detections:
                                 detections.append({
                                     'frame': frame_count,
-                                    'timestamp': frame_count / fps,
+                                    'timestamp': frame_ts - start_ts if bus_sub is not None else frame_count / fps,
                                     'faces': frame_detections
                                 })
                         else:
@@ -2796,7 +4895,12 @@ def process_rtsp_analysis_job(job_id: str):
             if elapsed > duration + 5:  # 5 second buffer
                 break
         
-        cap.release()
+        if bus_sub is not None:
+            worker.frame_bus.unsubscribe(bus_sub)
+            if frame_count > 1 and frame_ts > start_ts:
+                fps = (frame_count - 1) / (frame_ts - start_ts)
+        else:
+            cap.release()
         
         # Calculate final statistics
         unique_faces = len(unique_face_embeddings)
@@ -2846,6 +4950,8 @@ def process_rtsp_analysis_job(job_id: str):
         print(f"Error in RTSP analysis: {e}")
         job['status'] = 'error'
         job['error'] = str(e)
+        if bus_sub is not None:
+            worker.frame_bus.unsubscribe(bus_sub)
 
 
 def generate_demo_rtsp_results(rtsp_id: str, duration: int):
@@ -0,0 +1,110 @@
+"""Weekly compute windows for a camera: parsing and evaluation.
+
+A camera's schedule says when it runs full inference; outside its windows it drops to
+a cheaper profile (reduced fps, snapshot only, or paused). Kept free of Flask/model
+imports so it can be used and tested on its own.
+"""
+import json
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Schedule states: inside a window / outside it with each of the 'outside' profiles
+SCHEDULE_ACTIVE = 'active'      # full inference (also: no schedule)
+SCHEDULE_REDUCED = 'reduced'    # inference at the schedule's outside_fps
+SCHEDULE_SNAPSHOT = 'snapshot'  # no inference, live snapshot refreshed once per second
+SCHEDULE_PAUSED = 'paused'      # no inference, no snapshot; the stream is still drained
+SCHEDULE_OUTSIDE = {'reduced': SCHEDULE_REDUCED, 'snapshot': SCHEDULE_SNAPSHOT, 'pause': SCHEDULE_PAUSED}
+_DAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+def _parse_days(days) -> list:
+    """'mon-fri', 'daily', ['sat', 'sun'] or [0, 6] (0 = Monday) -> sorted weekday numbers."""
+    if days in (None, 'daily', '*'):
+        return list(range(7))
+    if isinstance(days, str):
+        days = [d.strip() for d in days.split(',')]
+    out = set()
+    for d in days:
+        if isinstance(d, int) and 0 <= d <= 6:
+            out.add(d)
+        elif isinstance(d, str) and '-' in d:
+            a, b = (_DAY_NAMES.index(x.strip().lower()[:3]) for x in d.split('-', 1))
+            out.update(range(a, b + 1) if a <= b else list(range(a, 7)) + list(range(0, b + 1)))
+        elif isinstance(d, str) and d.lower()[:3] in _DAY_NAMES:
+            out.add(_DAY_NAMES.index(d.lower()[:3]))
+        else:
+            raise ValueError(f'bad day: {d!r}')
+    return sorted(out)
+
+
+def _parse_hhmm(value: str) -> int:
+    h, m = str(value).split(':')
+    minutes = int(h) * 60 + int(m)
+    if not 0 <= minutes <= 24 * 60:
+        raise ValueError(f'bad time: {value!r}')
+    return minutes
+
+
+def parse_schedule(value) -> Optional[dict]:
+    """Validate a weekly compute schedule (server local time). Raises ValueError.
+
+    {"windows": [{"days": "mon-fri", "start": "08:00", "end": "18:00"}, ...],
+     "outside": "snapshot" | "pause" | "reduced", "outside_fps": 0.5}
+    A window whose end is before its start runs past midnight.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    if not isinstance(value, dict) or not isinstance(value.get('windows'), list) or not value['windows']:
+        raise ValueError('schedule needs a non-empty "windows" list')
+    windows = []
+    try:
+        for win in value['windows']:
+            start, end = _parse_hhmm(win['start']), _parse_hhmm(win['end'])
+            windows.append({'days': _parse_days(win.get('days')), 'start': win['start'], 'end': win['end']})
+            if start == end:
+                raise ValueError('schedule window start and end are equal')
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f'bad schedule window: {e}')
+    outside = value.get('outside', 'snapshot')
+    if outside not in SCHEDULE_OUTSIDE:
+        raise ValueError(f'schedule outside must be one of {list(SCHEDULE_OUTSIDE)}')
+    spec = {'windows': windows, 'outside': outside}
+    if outside == 'reduced':
+        spec['outside_fps'] = float(value.get('outside_fps', 0.5))
+        if spec['outside_fps'] <= 0:
+            raise ValueError('schedule outside_fps must be > 0')
+    return spec
+
+
+class CameraSchedule:
+    """Weekly compute windows for one camera, evaluated by the scheduler thread."""
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.outside_state = SCHEDULE_OUTSIDE[spec['outside']]
+        self.outside_fps = spec.get('outside_fps')
+        self._windows = [(set(w['days']), _parse_hhmm(w['start']), _parse_hhmm(w['end'])) for w in spec['windows']]
+
+    def _intervals_from(self, day: datetime):
+        """(start, end) datetimes of the windows that begin on the given day."""
+        midnight = day.replace(hour=0, minute=0, second=0, microsecond=0)
+        for days, start, end in self._windows:
+            if midnight.weekday() in days:
+                stop = end if end > start else end + 24 * 60
+                yield midnight + timedelta(minutes=start), midnight + timedelta(minutes=stop)
+
+    def is_open(self, now: datetime) -> bool:
+        # windows from yesterday can run past midnight into today
+        for day in (now - timedelta(days=1), now):
+            if any(a <= now < b for a, b in self._intervals_from(day)):
+                return True
+        return False
+
+    def state(self, now: datetime) -> str:
+        return SCHEDULE_ACTIVE if self.is_open(now) else self.outside_state
+
+    def today(self, now: datetime) -> list:
+        """Today's windows as [start, end] 'HH:MM' strings (end may be tomorrow)."""
+        return [[a.strftime('%H:%M'), b.strftime('%H:%M')] for a, b in sorted(self._intervals_from(now))]
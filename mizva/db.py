@@ -8,6 +8,33 @@ from typing import Any, Dict, List, Optional, Tuple
 
 DB_LOCK = threading.Lock()
 
+# Per-camera options added after the original cameras schema: (column, SQL type).
+# upsert_camera only writes the ones present in the camera dict, so callers that
+# don't know about an option leave its stored value alone.
+CAMERA_OPTION_COLUMNS: List[Tuple[str, str]] = [
+    ("decoder", "TEXT DEFAULT 'inprocess'"),
+    ("motion_gate", "INTEGER DEFAULT 0"),
+    ("motion_threshold", "REAL DEFAULT 0.01"),
+    ("motion_keepalive_s", "REAL DEFAULT 2.0"),
+    ("substream_url", "TEXT"),
+    ("decode_mode", "TEXT DEFAULT 'all'"),
+    ("decode_fraction", "REAL DEFAULT 0.25"),
+    ("roi", "TEXT"),
+    ("adaptive_fps", "INTEGER DEFAULT 0"),
+    ("fps_min", "REAL DEFAULT 1.0"),
+    ("fps_max", "REAL DEFAULT 15.0"),
+    ("schedule", "TEXT"),
+    ("probe", "TEXT"),
+    ("analysis_width", "INTEGER DEFAULT 0"),
+    ("display_width", "INTEGER DEFAULT 0"),
+    ("tiling", "TEXT"),
+    ("face_tracking", "INTEGER DEFAULT 1"),
+    ("track_refresh_s", "REAL DEFAULT 2.0"),
+    ("det_profile", "TEXT"),  # NULL = the detector's default profile
+]
+# Option columns holding JSON documents (stored as text, returned parsed)
+CAMERA_JSON_COLUMNS = ("roi", "schedule", "probe", "tiling")
+
 
 def get_db_path(repo_root: Path) -> Path:
     data = repo_root / 'data'
@@ -144,6 +171,11 @@ def init_db(conn: sqlite3.Connection) -> None:
               external_ref_id TEXT,
               sync_status TEXT DEFAULT 'pending',
               
+              -- Latency (capture_ts is the frame's stream time on wall-clock, ms)
+              capture_ts INTEGER,
+              latency_ms REAL,
+              latency_breakdown TEXT, -- JSON: {"queue": 3.1, "detect": 12.0, "embed": 4.2}
+              
               FOREIGN KEY(camera_id) REFERENCES cameras(id)
             )
             """
@@ -198,7 +230,10 @@ def init_db(conn: sqlite3.Connection) -> None:
             ("frame_fps", "REAL"),
             ("model_version", "TEXT"),
             ("external_ref_id", "TEXT"),
-            ("sync_status", "TEXT DEFAULT 'pending'")
+            ("sync_status", "TEXT DEFAULT 'pending'"),
+            ("capture_ts", "INTEGER"),
+            ("latency_ms", "REAL"),
+            ("latency_breakdown", "TEXT")
         ]
         
         for col_name, col_type in new_columns:
@@ -217,6 +252,12 @@ def init_db(conn: sqlite3.Connection) -> None:
         except sqlite3.OperationalError:
             pass  # Column already exists
 
+        for col_name, col_type in CAMERA_OPTION_COLUMNS:
+            try:
+                conn.execute(f"ALTER TABLE cameras ADD COLUMN {col_name} {col_type}")
+            except sqlite3.OperationalError:
+                pass  # Column already exists
+
 
 def _now_ms() -> int:
     return int(time.time() * 1000)
@@ -314,30 +355,48 @@ def get_watchlist(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
 
 
 def upsert_camera(conn: sqlite3.Connection, cam: Dict[str, Any]) -> None:
+    cols = ["id", "name", "url", "transport", "fps", "threshold", "mode", "enabled", "created_at"]
+    vals: List[Any] = [
+        cam["id"], cam["name"], cam["url"], cam.get("transport", "tcp"), cam.get("fps", 3.0), cam.get("threshold", 0.6), cam.get("mode", "watchlist"), int(cam.get("enabled", 1)), _now_ms(),
+    ]
+    for col_name, _ in CAMERA_OPTION_COLUMNS:
+        if col_name in cam:
+            val = cam[col_name]
+            if col_name in CAMERA_JSON_COLUMNS and val is not None:
+                val = json.dumps(val)
+            cols.append(col_name)
+            vals.append(val)
+    updates = ",\n              ".join(f"{c}=excluded.{c}" for c in cols if c not in ("id", "created_at"))
     with DB_LOCK, conn:
         conn.execute(
-            """
-            INSERT INTO cameras(id, name, url, transport, fps, threshold, mode, enabled, created_at)
-            VALUES(?,?,?,?,?,?,?,?,?)
+            f"""
+            INSERT INTO cameras({', '.join(cols)})
+            VALUES({','.join('?' for _ in cols)})
             ON CONFLICT(id) DO UPDATE SET
-              name=excluded.name,
-              url=excluded.url,
-              transport=excluded.transport,
-              fps=excluded.fps,
-              threshold=excluded.threshold,
-              mode=excluded.mode,
-              enabled=excluded.enabled
+              {updates}
             """,
-            (
-                cam["id"], cam["name"], cam["url"], cam.get("transport", "tcp"), cam.get("fps", 3.0), cam.get("threshold", 0.6), cam.get("mode", "watchlist"), int(cam.get("enabled", 1)), _now_ms(),
-            ),
+            vals,
         )
 
 
 def list_cameras(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
     with DB_LOCK:
         rows = conn.execute("SELECT * FROM cameras ORDER BY created_at DESC").fetchall()
-    return [dict(r) for r in rows]
+    cams = [dict(r) for r in rows]
+    for cam in cams:
+        for col_name in CAMERA_JSON_COLUMNS:
+            if cam.get(col_name):
+                try:
+                    cam[col_name] = json.loads(cam[col_name])
+                except ValueError:
+                    cam[col_name] = None
+    return cams
+
+
+def update_camera_probe(conn: sqlite3.Connection, cam_id: str, probe: Dict[str, Any]) -> None:
+    """Store a camera's decoder probe results (no-op for cameras that were never saved)."""
+    with DB_LOCK, conn:
+        conn.execute("UPDATE cameras SET probe=? WHERE id=?", (json.dumps(probe), cam_id))
 
 
 def remove_camera(conn: sqlite3.Connection, cam_id: str) -> None:
@@ -394,7 +453,12 @@ def insert_event(conn: sqlite3.Connection, ev: Dict[str, Any]) -> int:
             'time_ms': float,
             'fps': float,
             'model_version': str
-        }
+        },
+
+        # Latency
+        'capture_ts': int (ms, frame capture time),
+        'latency_ms': float (capture -> persist),
+        'latency_breakdown': {'queue': float, 'detect': float, 'embed': float}
     }
     """
     with DB_LOCK, conn:
@@ -429,9 +493,10 @@ def insert_event(conn: sqlite3.Connection, ev: Dict[str, Any]) -> int:
                 track_duration, track_confidence, is_new_track,
                 event_type, alert_level, is_blacklisted, is_whitelisted,
                 processing_time_ms, frame_fps, model_version,
-                external_ref_id, sync_status
+                external_ref_id, sync_status,
+                capture_ts, latency_ms, latency_breakdown
             )
-            VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+            VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
             """,
             (
                 # Core event data
@@ -501,7 +566,12 @@ def insert_event(conn: sqlite3.Connection, ev: Dict[str, Any]) -> int:
                 
                 # External integration
                 ev.get("external_ref_id"),
-                ev.get("sync_status", "pending")
+                ev.get("sync_status", "pending"),
+
+                # Latency: capture time (stream PTS on wall-clock) and capture -> persist
+                ev.get("capture_ts"),
+                ev.get("latency_ms"),
+                json.dumps(ev["latency_breakdown"]) if ev.get("latency_breakdown") else None
             ),
         )
         lid = cur.lastrowid
@@ -0,0 +1,31 @@
+"""Duplicate removal for face detections from overlapping detector runs (tiles and the
+full frame).
+
+Faces are anything with a .bbox (x1, y1, x2, y2) and a .det_score, such as insightface
+Face objects. Kept free of Flask/model imports so it can be used and tested on its own.
+"""
+import numpy as np
+
+# Boxes this much inside a higher-scoring one are duplicates too: a face cut at a tile edge
+TILE_CONTAIN_THRESHOLD = 0.8
+
+
+def merge_faces(faces: list, iou_threshold: float) -> list:
+    """Greedy NMS over detections from overlapping tiles (and the full frame)."""
+    if len(faces) < 2:
+        return faces
+    boxes = np.array([f.bbox for f in faces], dtype=np.float32)
+    scores = np.array([float(f.det_score) for f in faces], dtype=np.float32)
+    areas = (boxes[:, 2] - boxes[:, 0]).clip(0) * (boxes[:, 3] - boxes[:, 1]).clip(0)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i, rest = order[0], order[1:]
+        keep.append(i)
+        iw = (np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0])).clip(0)
+        ih = (np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1])).clip(0)
+        inter = iw * ih
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-6)
+        contained = inter / (np.minimum(areas[i], areas[rest]) + 1e-6)
+        order = rest[(iou < iou_threshold) & (contained < TILE_CONTAIN_THRESHOLD)]
+    return [faces[i] for i in keep]
@@ -0,0 +1,110 @@
+"""IoU tracking of detected faces between processed frames, so a face that keeps its
+track keeps its identity without running the recognition model again.
+
+Faces are anything with a .bbox (x1, y1, x2, y2), such as insightface Face objects.
+Kept free of Flask/model imports so it can be used and tested on its own.
+"""
+from typing import Optional
+
+import numpy as np
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> float:
+    """Intersection over union of two (x1, y1, x2, y2) boxes."""
+    iw = min(a[2], b[2]) - max(a[0], b[0])
+    ih = min(a[3], b[3]) - max(a[1], b[1])
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    return float(inter / ((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter + 1e-6))
+
+
+class FaceTrack:
+    """One face followed across processed frames, with its last recognition result."""
+
+    __slots__ = ('id', 'bbox', 'velocity', 'last_ts', 'first_ts', 'hits', 'embedding', 'result',
+                 'recognized_at', 'streak', 'params')
+
+    def __init__(self, track_id: int, bbox: np.ndarray, ts: float):
+        self.id = track_id
+        self.bbox = bbox
+        self.velocity = np.zeros(2, dtype=np.float32)  # box centre motion, px/s
+        self.last_ts = self.first_ts = ts
+        self.hits = 1
+        self.embedding: Optional[np.ndarray] = None
+        self.result: Optional[tuple] = None  # (sim, matched, person_id, person_name)
+        self.recognized_at = 0.0
+        self.streak = 0  # consecutive recognitions that agreed on the identity
+        self.params = None  # RecognitionParams the result was matched with
+
+    def predicted(self, ts: float) -> np.ndarray:
+        dx, dy = self.velocity * (ts - self.last_ts)
+        return self.bbox + np.array([dx, dy, dx, dy], dtype=np.float32)
+
+    @property
+    def confirmed(self) -> bool:
+        return self.streak >= FaceTracker.CONFIRM_HITS
+
+
+class FaceTracker:
+    """IoU association of detections between consecutive processed frames, with a constant
+    velocity guess for where each face moved to. A face that keeps its track keeps its
+    identity, so the embedding model and gallery scan only run for new tracks, tracks whose
+    identity is not confirmed yet (CONFIRM_HITS recognitions in a row agreeing), every
+    refresh_s, and after the camera's matching settings changed."""
+
+    CONFIRM_HITS = 2
+    IOU_MIN = 0.3
+    MAX_AGE_S = 1.5  # drop tracks unseen this long (or 3 processing intervals, if longer)
+
+    def __init__(self, refresh_s: float = 2.0):
+        self.refresh_s = float(refresh_s)
+        self.tracks: list = []
+        self._next_id = 1
+        self.recognized = 0  # faces that ran the recognition model
+        self.reused = 0      # faces that took their track's identity
+
+    def update(self, faces: list, ts: float, interval_s: float = 0.0) -> list:
+        """Assign each face a track (new ones for unmatched faces). Returns tracks aligned with faces."""
+        max_age = max(self.MAX_AGE_S, 3.0 * interval_s)
+        self.tracks = [t for t in self.tracks if ts - t.last_ts <= max_age]
+        pairs = []
+        for ti, t in enumerate(self.tracks):
+            guess = t.predicted(ts)
+            for fi, f in enumerate(faces):
+                iou = box_iou(guess, f.bbox)
+                if iou >= self.IOU_MIN:
+                    pairs.append((iou, ti, fi))
+        pairs.sort(reverse=True)
+        assigned: list = [None] * len(faces)
+        used = set()
+        for _, ti, fi in pairs:
+            if ti in used or assigned[fi] is not None:
+                continue
+            t = self.tracks[ti]
+            bbox = np.array(faces[fi].bbox, dtype=np.float32)
+            dt = ts - t.last_ts
+            if dt > 0:
+                moved = ((bbox[:2] + bbox[2:]) - (t.bbox[:2] + t.bbox[2:])) / 2.0 / dt
+                t.velocity = 0.5 * t.velocity + 0.5 * moved
+            t.bbox, t.last_ts = bbox, ts
+            t.hits += 1
+            assigned[fi] = t
+            used.add(ti)
+        for fi, f in enumerate(faces):
+            if assigned[fi] is None:
+                t = FaceTrack(self._next_id, np.array(f.bbox, dtype=np.float32), ts)
+                self._next_id += 1
+                self.tracks.append(t)
+                assigned[fi] = t
+        return assigned
+
+    def needs_recognition(self, track: FaceTrack, ts: float, params) -> bool:
+        return (track.result is None or not track.confirmed or track.params is not params
+                or ts - track.recognized_at >= self.refresh_s)
+
+    def record(self, track: FaceTrack, ts: float, embedding: np.ndarray, result: tuple, params):
+        identity = (result[1], result[2])
+        track.streak = track.streak + 1 if track.result is not None and (track.result[1], track.result[2]) == identity else 1
+        track.embedding, track.result = embedding, result
+        track.recognized_at, track.params = ts, params
@@ -0,0 +1,408 @@
+"""Per-camera decoder subprocess feeding a shared-memory frame ring.
+
+The parent (RtspWorker) creates a SharedFrameRing and launches this file as a
+child process for each camera. The child gets its own FFmpeg capture options
+through its environment, so cameras no longer race on the process-global
+OPENCV_FFMPEG_CAPTURE_OPTIONS, and decoding runs outside the parent's GIL.
+
+The ring is a lock-free "latest frame" buffer with a single writer (the child)
+and a single reader (the worker). The reader pins the slot it is using and the
+writer never writes into the pinned or the latest slot, so the reader can map
+frames zero-copy while the child keeps decoding.
+
+Kept free of Flask/model imports so the child process starts fast.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Header fields (int64)
+_H_LATEST = 0      # slot index of the newest complete frame, -1 if none
+_H_SEQ = 1         # sequence number of the newest complete frame
+_H_HELD = 2        # slot currently pinned by the reader, -1 if none
+_H_STATE = 3       # decoder state, see STATE_*
+_H_STOP = 4        # set to 1 by the parent to ask the child to exit
+_H_HEARTBEAT = 5   # reader heartbeat (time.time_ns), child exits if it goes stale
+_H_SRC_SIZE = 6    # decoded stream size as width << 32 | height, 0 until the first frame
+_HEADER_LEN = 8
+_META_LEN = 4      # per slot: seq, ts_ns, height, width
+
+STATE_STARTING = 0
+STATE_STREAMING = 1
+STATE_FAILED = 2
+
+PARENT_HEARTBEAT_TIMEOUT_S = 15.0
+
+
+class PtsClock:
+    """Maps stream presentation timestamps (ms) onto wall-clock capture times.
+
+    The offset is the smallest (receive time - pts) seen in the session: the frame
+    that came through with the least buffering anchors the mapping, and every later
+    frame is stamped pts + offset, so its age includes the buffering it went through.
+    Without usable timestamps (missing, not increasing, or jumping) the receive time
+    is used and the mapping starts over.
+    """
+
+    MAX_JUMP_S = 10.0
+
+    def __init__(self):
+        self.offset: Optional[float] = None
+        self._last_pts: Optional[float] = None
+
+    def stamp(self, pts_ms: Optional[float], recv_ts: float) -> float:
+        if pts_ms is None or pts_ms < 0:
+            self.offset = self._last_pts = None
+            return recv_ts
+        pts = pts_ms / 1000.0
+        if self._last_pts is not None and not (0 < pts - self._last_pts < self.MAX_JUMP_S):
+            self.offset = None
+        self._last_pts = pts
+        if self.offset is None or recv_ts - pts < self.offset:
+            self.offset = recv_ts - pts
+        return pts + self.offset
+
+
+def _attach_untracked(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing segment without letting this process' resource tracker unlink it on exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')  # type: ignore[attr-defined]
+        except Exception:
+            pass
+        return shm
+
+
+class SharedFrameRing:
+    """Fixed-capacity BGR frame ring in shared memory.
+
+    Each slot can hold any frame up to max_width x max_height; frames are stored
+    contiguously so the reader gets a plain (h, w, 3) uint8 view.
+    """
+
+    def __init__(self, name: Optional[str] = None, slots: int = 4,
+                 max_width: int = 1920, max_height: int = 1080, create: bool = False):
+        if slots < 3:
+            raise ValueError('SharedFrameRing needs at least 3 slots')
+        self.slots = int(slots)
+        self.max_width = int(max_width)
+        self.max_height = int(max_height)
+        self.slot_bytes = self.max_width * self.max_height * 3
+        self._meta_off = _HEADER_LEN * 8
+        self._data_off = self._meta_off + self.slots * _META_LEN * 8
+        self._data_off += (-self._data_off) % 64  # keep slots cache-line aligned
+        size = self._data_off + self.slots * self.slot_bytes
+        self.owner = create
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = _attach_untracked(name or '')
+        self.name = self.shm.name
+        self._header = np.ndarray((_HEADER_LEN,), dtype=np.int64, buffer=self.shm.buf, offset=0)
+        self._meta = np.ndarray((self.slots, _META_LEN), dtype=np.int64, buffer=self.shm.buf, offset=self._meta_off)
+        if create:
+            self._header[:] = 0
+            self._header[_H_LATEST] = -1
+            self._header[_H_HELD] = -1
+            self._header[_H_HEARTBEAT] = time.time_ns()
+            self._meta[:] = 0
+        # reader-side statistics, same names as LatestFrameMailbox
+        self.dropped = 0
+        self._last_read_seq = 0
+        self._closed_seq = 0
+
+    # ----- shared state -----
+    @property
+    def state(self) -> int:
+        return int(self._header[_H_STATE])
+
+    @state.setter
+    def state(self, value: int):
+        self._header[_H_STATE] = int(value)
+
+    @property
+    def stop_requested(self) -> bool:
+        return bool(self._header[_H_STOP])
+
+    def request_stop(self):
+        self._header[_H_STOP] = 1
+
+    @property
+    def put_count(self) -> int:
+        header = self._header
+        return int(header[_H_SEQ]) if header is not None else self._closed_seq
+
+    @property
+    def source_size(self) -> Optional[Tuple[int, int]]:
+        """(width, height) the stream decodes at, which is larger than the frames when they
+        had to be downscaled to fit the ring. None before the first frame."""
+        packed = int(self._header[_H_SRC_SIZE])
+        return (packed >> 32, packed & 0xFFFFFFFF) if packed else None
+
+    @source_size.setter
+    def source_size(self, size: Tuple[int, int]):
+        self._header[_H_SRC_SIZE] = (int(size[0]) << 32) | int(size[1])
+
+    def heartbeat_age(self) -> float:
+        return (time.time_ns() - int(self._header[_H_HEARTBEAT])) / 1e9
+
+    def slot_view(self, slot: int, height: int, width: int) -> np.ndarray:
+        if height * width * 3 > self.slot_bytes:
+            raise ValueError(f'frame {width}x{height} exceeds ring capacity {self.max_width}x{self.max_height}')
+        return np.ndarray((height, width, 3), dtype=np.uint8, buffer=self.shm.buf,
+                          offset=self._data_off + slot * self.slot_bytes)
+
+    # ----- writer side (decoder child) -----
+    def next_write_slot(self) -> int:
+        """Pick a slot that is neither the latest frame nor pinned by the reader."""
+        latest = int(self._header[_H_LATEST])
+        held = int(self._header[_H_HELD])
+        for slot in range(self.slots):
+            if slot != latest and slot != held:
+                return slot
+        raise RuntimeError('no free ring slot')  # unreachable with >= 3 slots
+
+    def publish(self, slot: int, height: int, width: int, ts: float):
+        """Make a fully written slot the newest frame."""
+        seq = int(self._header[_H_SEQ]) + 1
+        meta = self._meta[slot]
+        meta[0] = seq
+        meta[1] = int(ts * 1e9)
+        meta[2] = height
+        meta[3] = width
+        self._header[_H_LATEST] = slot
+        self._header[_H_SEQ] = seq
+
+    def write(self, frame: np.ndarray, ts: float):
+        h, w = frame.shape[:2]
+        slot = self.next_write_slot()
+        np.copyto(self.slot_view(slot, h, w), frame)
+        self.publish(slot, h, w, ts)
+
+    # ----- reader side (RtspWorker) -----
+    def get(self, after_seq: int = 0, timeout: float = 1.0):
+        """Wait for a frame newer than after_seq. Returns (seq, ts, frame_view) or None on timeout.
+
+        The returned view stays valid until the next get() call.
+        """
+        deadline = time.time() + timeout
+        while True:
+            self._header[_H_HEARTBEAT] = time.time_ns()
+            if int(self._header[_H_SEQ]) > after_seq:
+                slot = int(self._header[_H_LATEST])
+                self._header[_H_HELD] = slot
+                # the writer may have moved on between reading LATEST and pinning it
+                if int(self._header[_H_LATEST]) == slot:
+                    seq, ts_ns, h, w = (int(v) for v in self._meta[slot])
+                    if self._last_read_seq and seq > self._last_read_seq + 1:
+                        self.dropped += seq - self._last_read_seq - 1
+                    self._last_read_seq = seq
+                    return seq, ts_ns / 1e9, self.slot_view(slot, h, w)
+                continue
+            if time.time() >= deadline:
+                return None
+            time.sleep(0.002)
+
+    def close(self):
+        if self._header is None:
+            return
+        self._closed_seq = int(self._header[_H_SEQ])
+        # drop numpy views before closing the mapping
+        self._header = None  # type: ignore[assignment]
+        self._meta = None  # type: ignore[assignment]
+        try:
+            self.shm.close()
+        except Exception:
+            pass
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except Exception:
+                pass
+
+
+class DecoderProcess:
+    """Parent-side handle of one camera's decoder child process."""
+
+    def __init__(self, urls: List[str], capture_options: str, slots: int = 4,
+                 max_width: int = 1920, max_height: int = 1080, max_read_failures: int = 50,
+                 stride: int = 1):
+        self.urls = list(urls)
+        self.stride = max(1, int(stride))
+        self.capture_options = capture_options
+        self.max_read_failures = int(max_read_failures)
+        self.ring = SharedFrameRing(slots=slots, max_width=max_width, max_height=max_height, create=True)
+        self.proc: Optional[subprocess.Popen] = None
+        self._stderr_tail: List[str] = []
+
+    def start(self, timeout: float = 10.0):
+        """Launch the child and wait until it streams. Returns (ok, info)."""
+        cmd = [sys.executable, os.path.abspath(__file__),
+               '--shm', self.ring.name,
+               '--slots', str(self.ring.slots),
+               '--max-width', str(self.ring.max_width),
+               '--max-height', str(self.ring.max_height),
+               '--max-read-failures', str(self.max_read_failures),
+               '--stride', str(self.stride)]
+        for u in self.urls:
+            cmd += ['--url', u]
+        env = dict(os.environ)
+        env['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = self.capture_options
+        self.proc = subprocess.Popen(cmd, env=env, stdin=subprocess.DEVNULL,
+                                     stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        threading.Thread(target=self._drain_stderr, daemon=True).start()
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self.ring._header[_H_HEARTBEAT] = time.time_ns()
+            if self.ring.state == STATE_STREAMING:
+                return True, 'subprocess'
+            if self.ring.state == STATE_FAILED or self.proc.poll() is not None:
+                break
+            time.sleep(0.05)
+        reason = self._stderr_tail[-1] if self._stderr_tail else 'decoder did not start streaming'
+        self.stop()
+        return False, reason
+
+    def _drain_stderr(self):
+        proc = self.proc
+        if proc is None or proc.stderr is None:
+            return
+        for line in proc.stderr:
+            line = line.strip()
+            if line:
+                self._stderr_tail = (self._stderr_tail + [line])[-20:]
+
+    @property
+    def downscaled(self) -> bool:
+        """The stream is larger than the ring, so the child shrinks every frame to fit."""
+        size = self.ring.source_size
+        return size is not None and (size[0] > self.ring.max_width or size[1] > self.ring.max_height)
+
+    @property
+    def last_error(self) -> str:
+        return self._stderr_tail[-1] if self._stderr_tail else 'decoder process exited'
+
+    def is_alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None and self.ring.state != STATE_FAILED
+
+    def stop(self):
+        if self.proc is not None:
+            self.ring.request_stop()
+            try:
+                self.proc.wait(timeout=2.0)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait(timeout=2.0)
+        self.ring.close()
+
+
+def _ring_fit(w: int, h: int, ring: SharedFrameRing) -> Tuple[int, int]:
+    """Frame size that fits the ring capacity, keeping the aspect ratio."""
+    if w <= ring.max_width and h <= ring.max_height:
+        return w, h
+    scale = min(ring.max_width / w, ring.max_height / h)
+    return int(w * scale), int(h * scale)
+
+
+def decoder_main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description='MizVa per-camera decoder process')
+    ap.add_argument('--shm', required=True)
+    ap.add_argument('--url', action='append', required=True)
+    ap.add_argument('--slots', type=int, default=4)
+    ap.add_argument('--max-width', type=int, default=1920)
+    ap.add_argument('--max-height', type=int, default=1080)
+    ap.add_argument('--max-read-failures', type=int, default=50)
+    ap.add_argument('--stride', type=int, default=1, help='publish only every Nth frame')
+    args = ap.parse_args(argv)
+
+    import cv2
+    ring = SharedFrameRing(args.shm, slots=args.slots, max_width=args.max_width, max_height=args.max_height)
+    cap = None
+    try:
+        for u in args.url:
+            c = cv2.VideoCapture(u, cv2.CAP_FFMPEG)
+            if c.isOpened():
+                c.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                cap = c
+                break
+            c.release()
+        if cap is None:
+            print('failed to open stream (tried variants)', file=sys.stderr)
+            ring.state = STATE_FAILED
+            return 1
+
+        failures = 0
+        n = 0
+        clock = PtsClock()
+        shape = None  # once the stream size is known, decode straight into the ring slot
+        src_buf = None  # streams larger than the ring: decode buffer reused for every frame
+        while not ring.stop_requested:
+            if ring.heartbeat_age() > PARENT_HEARTBEAT_TIMEOUT_S:
+                print('parent stopped reading, exiting', file=sys.stderr)
+                break
+            n += 1
+            if args.stride > 1 and n % args.stride:
+                # skipped frames are decoded by FFmpeg but never converted or copied
+                if cap.grab():
+                    failures = 0
+                    continue
+                failures += 1
+                if failures >= args.max_read_failures:
+                    print('failed to read frame', file=sys.stderr)
+                    ring.state = STATE_FAILED
+                    return 1
+                time.sleep(0.01)
+                continue
+            slot = ring.next_write_slot()
+            view = None
+            if shape is not None:
+                view = ring.slot_view(slot, shape[0], shape[1])
+                ok, frame = cap.read(view)
+            else:
+                ok, frame = cap.read(src_buf) if src_buf is not None else cap.read()
+            if not ok or frame is None:
+                failures += 1
+                if failures >= args.max_read_failures:
+                    print('failed to read frame', file=sys.stderr)
+                    ring.state = STATE_FAILED
+                    return 1
+                time.sleep(0.01)
+                continue
+            failures = 0
+            ts = clock.stamp(cap.get(cv2.CAP_PROP_POS_MSEC), time.time())
+            if shape is not None and np.may_share_memory(frame, view):
+                ring.publish(slot, shape[0], shape[1], ts)
+            else:
+                fh, fw = frame.shape[:2]
+                w, h = _ring_fit(fw, fh, ring)
+                dst = ring.slot_view(slot, h, w)
+                if (w, h) == (fw, fh):
+                    np.copyto(dst, frame)
+                    # streams that fit the ring as-is are decoded straight into the slots from now on
+                    shape = (h, w)
+                else:
+                    cv2.resize(frame, (w, h), dst=dst, interpolation=cv2.INTER_AREA)
+                    src_buf = frame
+                ring.source_size = (fw, fh)
+                ring.publish(slot, h, w, ts)
+            ring.state = STATE_STREAMING
+        return 0
+    finally:
+        if cap is not None:
+            cap.release()
+        ring.close()
+
+
+if __name__ == '__main__':
+    sys.exit(decoder_main())
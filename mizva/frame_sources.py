@@ -0,0 +1,516 @@
+"""Frame sources consumed by RtspWorker.
+
+Every source looks like a cv2.VideoCapture (isOpened / grab / retrieve / read /
+get / release), so the worker's capture thread drives them all the same way:
+
+    rtsp://... (or any URL FFmpeg opens)    RtspSource
+    file:///path/clip.mp4?pace=native       VideoFileSource, loops; pace=fast reads flat out
+    dir://data/images?fps=5                 ImageDirSource, cycles through the images
+    synthetic://?width=1280&height=720&fps=25&image=test.jpg
+                                            SyntheticSource, moving sprite over a static scene
+    push://                                 PushFrameQueue, JPEGs POSTed by edge devices
+
+A plain local path is treated as file:// (or dir:// for a directory). The
+non-RTSP sources let N "cameras" run the full live pipeline on one box for
+load testing.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+
+
+class CaptureOptionsEnv:
+    """Keeps the process-global OPENCV_FFMPEG_CAPTURE_OPTIONS at one value while the
+    VideoCapture opens that read it run (in-process decoder only).
+
+    OpenCV reads the variable somewhere inside the open, which includes the RTSP connect,
+    so it must not change until the open returns. Opens that need the same options (the
+    common case: one transport and timeout for the whole site) run concurrently; an open
+    with different options waits until they finish, and new same-option opens queue
+    behind it so it is not starved.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._value: Optional[str] = None
+        self._users = 0
+        self._waiting = 0  # opens waiting for a different value
+
+    @contextmanager
+    def use(self, options: str):
+        with self._cond:
+            if self._users and self._value != options:
+                self._waiting += 1
+                self._cond.wait_for(lambda: self._users == 0)
+                self._waiting -= 1
+            else:
+                self._cond.wait_for(lambda: self._users == 0
+                                    or (self._value == options and not self._waiting))
+            if self._users == 0:
+                os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = options
+                self._value = options
+            self._users += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._users -= 1
+                if self._users == 0:
+                    self._cond.notify_all()
+
+
+FFMPEG_OPTIONS_ENV = CaptureOptionsEnv()
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+SOURCE_RTSP = 'rtsp'
+SOURCE_FILE = 'file'
+SOURCE_DIR = 'dir'
+SOURCE_SYNTHETIC = 'synthetic'
+SOURCE_PUSH = 'push'
+
+
+def parse_source_url(url: str) -> Tuple[str, str, Dict[str, str]]:
+    """Split a camera URL into (kind, target, params)."""
+    parsed = urlparse(url)
+    params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+    if parsed.scheme in (SOURCE_FILE, SOURCE_DIR):
+        return parsed.scheme, (parsed.netloc + parsed.path) or '.', params
+    if parsed.scheme in (SOURCE_SYNTHETIC, SOURCE_PUSH):
+        return parsed.scheme, '', params
+    if '://' not in url and os.path.exists(url):
+        return (SOURCE_DIR if os.path.isdir(url) else SOURCE_FILE), url, {}
+    return SOURCE_RTSP, url, {}
+
+
+def source_kind(url: str) -> str:
+    return parse_source_url(url)[0]
+
+
+class FrameSource(ABC):
+    """Base class; subclasses implement open() and read()."""
+
+    kind = 'base'
+    # Timestamps from get(CAP_PROP_POS_MSEC); -1 when the source has none
+    _pos_ms = -1.0
+
+    @abstractmethod
+    def open(self) -> Tuple[bool, str]:
+        """Connect / load the source. Returns (ok, info or failure reason)."""
+
+    def isOpened(self) -> bool:
+        return False
+
+    @abstractmethod
+    def read(self, image: Optional[np.ndarray] = None):
+        """Next frame as (ok, frame); image, when given, is a buffer the frame may be decoded into."""
+
+    def grab(self) -> bool:
+        self._grabbed = self.read()
+        return self._grabbed[0]
+
+    def retrieve(self, image: Optional[np.ndarray] = None):
+        return getattr(self, '_grabbed', (False, None))
+
+    def get(self, prop) -> float:
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return self._pos_ms
+        return 0.0
+
+    def release(self):
+        pass
+
+
+class _Pacer:
+    """Sleeps so that frame n is handed out at start + n / fps (no catch-up bursts after stalls)."""
+
+    def __init__(self, fps: float):
+        self.dt = 1.0 / fps if fps > 0 else 0.0
+        self._next = 0.0
+
+    def wait(self):
+        if not self.dt:
+            return
+        now = time.time()
+        if self._next > now:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = max(now, self._next) + self.dt
+
+
+class RtspSource(FrameSource):
+    """Live stream through OpenCV's FFmpeg backend, trying URL variants in order."""
+
+    kind = SOURCE_RTSP
+
+    def __init__(self, variants: List[Tuple[str, str]], capture_options: str):
+        self.variants = variants
+        self.capture_options = capture_options
+        self.cap: Optional[cv2.VideoCapture] = None
+
+    def open(self) -> Tuple[bool, str]:
+        reason = None
+        for tag, u in self.variants:
+            try:
+                # OPENCV_FFMPEG_CAPTURE_OPTIONS is process-global and only read while opening;
+                # cameras with the same options connect in parallel
+                with FFMPEG_OPTIONS_ENV.use(self.capture_options):
+                    c = cv2.VideoCapture(u, cv2.CAP_FFMPEG)
+                if c.isOpened():
+                    # Codec, size and rate are whatever the camera sends (see probe_capture);
+                    # setting them on a network capture only pretends to change them
+                    c.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimal buffer for lowest latency
+                    self.cap = c
+                    return True, tag
+                c.release()
+            except Exception as e:
+                reason = str(e)
+        return False, reason or 'unknown error'
+
+    def isOpened(self) -> bool:
+        return self.cap is not None and self.cap.isOpened()
+
+    def read(self, image: Optional[np.ndarray] = None):
+        return self.cap.read(image)
+
+    def grab(self) -> bool:
+        return self.cap.grab()
+
+    def retrieve(self, image: Optional[np.ndarray] = None):
+        return self.cap.retrieve(image)
+
+    def get(self, prop) -> float:
+        return self.cap.get(prop)
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+def fourcc_name(code: float) -> str:
+    """CAP_PROP_FOURCC value as text ('h264', 'hevc', ...), '' when the backend reports none."""
+    code = int(code or 0)
+    name = ''.join(chr((code >> (8 * i)) & 0xFF) for i in range(4))
+    return name.strip('\x00 ').lower() if code > 0 and name.isprintable() else ''
+
+
+def probe_capture(cap, frames: int = 12, timeout: float = 5.0) -> Dict[str, object]:
+    """Read a few frames from an opened source and measure what decoding them costs.
+
+    decode_ms is process CPU time per frame: it includes FFmpeg's own decode threads, which
+    thread CPU time would miss, but also anything else the process runs meanwhile. Run it
+    through probe_isolated() to get the cost of the decode alone.
+    """
+    n = 0
+    shape = None
+    first_at = last_at = 0.0
+    t0 = time.time()
+    cpu0 = time.process_time()
+    while n < frames and time.time() - t0 < timeout:
+        ok, frame = cap.read()
+        if not ok or frame is None:
+            break
+        last_at = time.time()
+        if n == 0:
+            first_at = last_at
+            shape = frame.shape
+        n += 1
+    cpu = time.process_time() - cpu0
+    fps = (n - 1) / (last_at - first_at) if n > 1 and last_at > first_at else 0.0
+    return {
+        'frames': n,
+        'codec': fourcc_name(cap.get(cv2.CAP_PROP_FOURCC)),
+        'width': int(shape[1]) if shape else 0,
+        'height': int(shape[0]) if shape else 0,
+        'fps': round(fps, 2),
+        'decode_ms': round(cpu * 1000.0 / n, 2) if n else None,
+    }
+
+
+def probe_isolated(variants: List[Tuple[str, str]], capture_options: str, frames: int = 12,
+                   timeout: float = 5.0, open_timeout: float = 15.0) -> Tuple[Optional[Dict[str, object]], str]:
+    """Open a stream and run probe_capture() in a short-lived child process of its own, so its
+    process CPU time is the decode and nothing else the server is running.
+
+    Returns (stats, tag of the variant that opened), or (None, reason) when none opened.
+    """
+    cmd = [sys.executable, os.path.abspath(__file__), '--frames', str(frames), '--timeout', str(timeout)]
+    for tag, url in variants:
+        cmd += ['--variant', tag, url]
+    env = dict(os.environ)
+    env['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = capture_options
+    try:
+        out = subprocess.run(cmd, env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True,
+                             timeout=open_timeout + timeout + 10.0)
+    except subprocess.TimeoutExpired:
+        return None, 'probe process timed out'
+    lines = out.stdout.strip().splitlines()
+    try:
+        result = json.loads(lines[-1])
+    except (IndexError, ValueError):
+        errors = out.stderr.strip().splitlines()
+        return None, errors[-1] if errors else f'probe process exited with {out.returncode}'
+    if not result.get('ok'):
+        return None, result.get('info') or 'unknown error'
+    return result['stats'], result['info']
+
+
+class VideoFileSource(FrameSource):
+    """Video file replayed in a loop, paced to its native FPS ('native') or read flat out ('fast')."""
+
+    kind = SOURCE_FILE
+
+    def __init__(self, path: str, pace: str = 'native', loop: bool = True):
+        self.path = path
+        self.pace = pace
+        self.loop = loop
+        self.cap: Optional[cv2.VideoCapture] = None
+        self.fps = 25.0
+        self._n = 0
+        self._pacer = _Pacer(0.0)
+
+    def open(self) -> Tuple[bool, str]:
+        if not os.path.isfile(self.path):
+            return False, f'no such file: {self.path}'
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            return False, f'cannot open {self.path}'
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self._pacer = _Pacer(self.fps if self.pace == 'native' else 0.0)
+        return True, f'file:{self.pace}'
+
+    def isOpened(self) -> bool:
+        return self.cap is not None and self.cap.isOpened()
+
+    def read(self, image: Optional[np.ndarray] = None):
+        if self.cap is None:
+            return False, None
+        self._pacer.wait()
+        ok, frame = self.cap.read(image)
+        if not ok and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.cap.read(image)
+        if ok:
+            # keep timestamps increasing across loops
+            self._pos_ms = self._n * 1000.0 / self.fps
+            self._n += 1
+        return ok, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class ImageDirSource(FrameSource):
+    """Cycles through the images of a directory (e.g. data/images) at a fixed FPS (0 = flat out)."""
+
+    kind = SOURCE_DIR
+
+    def __init__(self, path: str, fps: float = 5.0, loop: bool = True):
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.files: List[str] = []
+        self._i = 0
+        self._pacer = _Pacer(fps)
+
+    def open(self) -> Tuple[bool, str]:
+        if not os.path.isdir(self.path):
+            return False, f'no such directory: {self.path}'
+        self.files = sorted(os.path.join(self.path, f) for f in os.listdir(self.path)
+                            if f.lower().endswith(IMAGE_EXTS))
+        if not self.files:
+            return False, f'no images in {self.path}'
+        return True, f'dir:{len(self.files)} images'
+
+    def isOpened(self) -> bool:
+        return bool(self.files)
+
+    def read(self, image: Optional[np.ndarray] = None):
+        for _ in range(len(self.files)):
+            if self._i >= len(self.files):
+                if not self.loop:
+                    return False, None
+                self._i = 0
+            path = self.files[self._i]
+            self._i += 1
+            frame = cv2.imread(path)
+            if frame is not None:
+                self._pacer.wait()
+                self._pos_ms = time.time() * 1000.0
+                return True, frame
+        return False, None
+
+    def release(self):
+        self.files = []
+
+
+class SyntheticSource(FrameSource):
+    """Generated frames: a sprite (an image file, or a plain ellipse) bouncing over a static scene."""
+
+    kind = SOURCE_SYNTHETIC
+
+    def __init__(self, width: int = 1280, height: int = 720, fps: float = 25.0, image: Optional[str] = None):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.image = image
+        self._pacer = _Pacer(fps)
+        self._bg: Optional[np.ndarray] = None
+        self._sprite: Optional[np.ndarray] = None
+        self._pos = np.array([0.0, 0.0])
+        self._vel = np.array([7.0, 5.0])
+        self._n = 0
+
+    def open(self) -> Tuple[bool, str]:
+        if self.width < 32 or self.height < 32:
+            return False, 'synthetic frames must be at least 32x32'
+        ramp = np.linspace(40, 200, self.width, dtype=np.uint8)
+        self._bg = np.repeat(np.repeat(ramp[None, :, None], self.height, axis=0), 3, axis=2)
+        sprite = cv2.imread(self.image) if self.image else None
+        side = max(16, min(self.width, self.height) // 3)
+        if sprite is None:
+            sprite = np.full((side, side, 3), 90, dtype=np.uint8)
+            cv2.ellipse(sprite, (side // 2, side // 2), (side // 3, side // 2 - 2), 0, 0, 360, (170, 190, 220), -1)
+        else:
+            scale = side / max(sprite.shape[:2])
+            sprite = cv2.resize(sprite, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        self._sprite = sprite
+        return True, f'synthetic:{self.width}x{self.height}@{self.fps:g}'
+
+    def isOpened(self) -> bool:
+        return self._bg is not None
+
+    def read(self, image: Optional[np.ndarray] = None):
+        if self._bg is None:
+            return False, None
+        self._pacer.wait()
+        frame = image if image is not None and image.shape == self._bg.shape else np.empty_like(self._bg)
+        np.copyto(frame, self._bg)
+        sh, sw = self._sprite.shape[:2]
+        limit = np.array([self.width - sw, self.height - sh], dtype=np.float64)
+        self._pos += self._vel
+        for i in (0, 1):
+            if not 0 <= self._pos[i] <= limit[i]:
+                self._vel[i] = -self._vel[i]
+                self._pos[i] = min(max(self._pos[i], 0), limit[i])
+        x, y = int(self._pos[0]), int(self._pos[1])
+        frame[y:y + sh, x:x + sw] = self._sprite
+        self._pos_ms = self._n * 1000.0 / self.fps if self.fps > 0 else time.time() * 1000.0
+        self._n += 1
+        return True, frame
+
+    def release(self):
+        self._bg = None
+
+
+def open_local_source(url: str) -> Tuple[Optional[FrameSource], str]:
+    """Open a file://, dir:// or synthetic:// source (or a plain local path). Returns (source, info)."""
+    kind, target, params = parse_source_url(url)
+    try:
+        if kind == SOURCE_FILE:
+            src: FrameSource = VideoFileSource(target, pace=params.get('pace', 'native'),
+                                               loop=params.get('loop', '1') != '0')
+        elif kind == SOURCE_DIR:
+            src = ImageDirSource(target, fps=float(params.get('fps', 5.0)), loop=params.get('loop', '1') != '0')
+        elif kind == SOURCE_SYNTHETIC:
+            src = SyntheticSource(int(params.get('width', 1280)), int(params.get('height', 720)),
+                                  float(params.get('fps', 25.0)), params.get('image'))
+        else:
+            return None, f'not a local source: {url}'
+    except ValueError as e:
+        return None, f'bad source parameters: {e}'
+    ok, info = src.open()
+    if not ok:
+        src.release()
+        return None, info
+    return src, info
+
+
+class PushFrameQueue:
+    """Encoded frames POSTed by an edge device (push://), handed to the worker in arrival order.
+
+    Takes the place of the capture mailbox, but nothing is overwritten: every accepted
+    frame is analysed. submit() refuses frames once maxsize are waiting so the HTTP
+    layer can answer 429. JPEGs are decoded on the worker thread when taken.
+    """
+
+    kind = SOURCE_PUSH
+    lossless = True  # the worker analyses every frame instead of sampling at its fps
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._q: deque = deque()
+        self._cond = threading.Condition()
+        self._seq = 0
+        self.put_count = 0
+        self.dropped = 0  # never overwrites; kept for the mailbox interface
+        self.rejected = 0  # refused because the queue was full
+        self.invalid = 0   # could not be decoded
+        self.allocations = 0
+
+    def __len__(self) -> int:
+        return len(self._q)
+
+    def submit(self, data: bytes, ts: Optional[float] = None) -> bool:
+        """Queue one encoded frame with its capture time (epoch seconds). False when full."""
+        with self._cond:
+            if len(self._q) >= self.maxsize:
+                self.rejected += 1
+                return False
+            self._q.append((data, ts if ts is not None else time.time()))
+            self.put_count += 1
+            self._cond.notify_all()
+            return True
+
+    def get(self, after_seq: int = 0, timeout: float = 1.0):
+        """Take the oldest frame. Returns (seq, ts, frame) or None on timeout."""
+        deadline = time.time() + timeout
+        while True:
+            with self._cond:
+                if not self._cond.wait_for(lambda: bool(self._q), timeout=max(0.0, deadline - time.time())):
+                    return None
+                data, ts = self._q.popleft()
+                self._seq += 1
+                seq = self._seq
+            frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                self.allocations += 1
+                return seq, ts, frame
+            self.invalid += 1
+
+
+def probe_main(argv=None) -> int:
+    """Child side of probe_isolated(): prints one JSON line with the outcome."""
+    ap = argparse.ArgumentParser(description='MizVa stream decode probe')
+    ap.add_argument('--variant', nargs=2, action='append', required=True, metavar=('TAG', 'URL'))
+    ap.add_argument('--frames', type=int, default=12)
+    ap.add_argument('--timeout', type=float, default=5.0)
+    args = ap.parse_args(argv)
+    src = RtspSource([tuple(v) for v in args.variant], os.environ.get('OPENCV_FFMPEG_CAPTURE_OPTIONS', ''))
+    ok, info = src.open()
+    result: Dict[str, object] = {'ok': ok, 'info': info}
+    if ok:
+        result['stats'] = probe_capture(src, frames=args.frames, timeout=args.timeout)
+        src.release()
+    print(json.dumps(result), flush=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(probe_main())
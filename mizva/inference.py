@@ -0,0 +1,362 @@
+"""Central face-detection scheduler shared by all camera workers.
+
+Workers used to call the global FaceAnalysis detector from their own threads, so
+N cameras contended for one ONNX session a frame at a time and the accelerator
+never saw a batch. InferenceService owns the detector session instead:
+
+    worker thread                          scheduler thread
+    ---------------------------------      ----------------------------------
+    letterbox + blob (own CPU time)  --->  per-camera queues, round-robin
+    wait on Future                         batch up to max_batch, or whatever
+                                           is pending after max_wait_ms
+    decode boxes / NMS (own CPU time) <--  one session.run() per batch
+
+Only session.run() is serialized; pre- and post-processing stay on the calling
+workers. Cameras are served round-robin (at most one request per camera per
+pass), so a camera submitting many tiles cannot starve the others.
+
+SCRFD models exported with a batch dimension (det.batched) run the whole batch
+in one call. Models without one (stock buffalo_l det_10g) gain nothing from a
+scheduler that can only run them one request at a time, so detect_many() runs
+them inline on the calling worker's thread instead: ONNX Runtime sessions are
+thread-safe, and the cameras' session.run() calls overlap. stats() reports
+which path is in use ('mode') and how many calls went inline.
+
+A failed or timed-out scheduled request is retried once inline with
+det.detect(), so one bad batch costs its cameras a retry, not their frames.
+
+Recognition is batched per call instead: embed_faces() aligns every face chip
+it is given (one frame's faces, or several frames') and runs the ArcFace model
+once per max_batch chips rather than once per face.
+
+Kept free of Flask and model-loading imports: the service is handed the
+detector that the app already prepared.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+try:
+    from insightface.utils import face_align  # type: ignore
+except Exception:
+    face_align = None  # embed_faces() then falls back to rec.get() per face
+
+
+def _distance2bbox(points: np.ndarray, distance: np.ndarray) -> np.ndarray:
+    return np.stack([points[:, 0] - distance[:, 0], points[:, 1] - distance[:, 1],
+                     points[:, 0] + distance[:, 2], points[:, 1] + distance[:, 3]], axis=-1)
+
+
+def _distance2kps(points: np.ndarray, distance: np.ndarray) -> np.ndarray:
+    preds = []
+    for i in range(0, distance.shape[1], 2):
+        preds.append(points[:, i % 2] + distance[:, i])
+        preds.append(points[:, i % 2 + 1] + distance[:, i + 1])
+    return np.stack(preds, axis=-1)
+
+
+class _Request:
+    __slots__ = ('cam_id', 'image', 'blob', 'det_scale', 'input_size', 'future', 'queued_at')
+
+    def __init__(self, cam_id: str, image: np.ndarray, input_size: Optional[Tuple[int, int]] = None):
+        self.cam_id = cam_id
+        self.image = image
+        self.blob: Optional[np.ndarray] = None
+        self.det_scale = 1.0
+        self.input_size = input_size
+        self.future: Future = Future()
+        self.queued_at = time.time()
+
+
+class InferenceService:
+    """Batches detector calls from all cameras with per-camera fairness.
+
+    detect_many(cam_id, images) returns the same (bboxes, kpss) per image as
+    det.detect(img, max_num=0); bboxes are N x 5 (x1, y1, x2, y2, score).
+    """
+
+    def __init__(self, det, max_batch: int = 8, max_wait_ms: float = 4.0):
+        self.det = det
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+        # SCRFD internals used to split detect() into preprocess / run / decode
+        self._native = (all(hasattr(det, a) for a in ('session', 'input_name', 'output_names', 'fmc',
+                                                      '_feat_stride_fpn', '_num_anchors', 'center_cache',
+                                                      'use_kps', 'input_mean', 'input_std', 'nms'))
+                        and getattr(det, 'input_size', None) is not None)
+        self._batched = self._native and bool(getattr(det, 'batched', False))
+        self._cond = threading.Condition()
+        self._queues: 'OrderedDict[str, deque]' = OrderedDict()
+        self._pending = 0
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        # stats
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.wait_ms_total = 0.0
+        self.run_ms_total = 0.0
+        self.served: Dict[str, int] = {}
+        self.inline_calls = 0
+        self.retries = 0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop = False
+        self._thread = threading.Thread(target=self._loop, name='inference', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # -- caller side -------------------------------------------------------
+
+    def _prepare(self, req: _Request, input_size: Optional[Tuple[int, int]] = None):
+        """Letterbox into the detector input exactly as SCRFD.detect() does, and make the blob."""
+        det = self.det
+        input_size = tuple(input_size or det.input_size)
+        img = req.image
+        im_ratio = float(img.shape[0]) / img.shape[1]
+        model_ratio = float(input_size[1]) / input_size[0]
+        if im_ratio > model_ratio:
+            new_height = input_size[1]
+            new_width = int(new_height / im_ratio)
+        else:
+            new_width = input_size[0]
+            new_height = int(new_width * im_ratio)
+        req.det_scale = float(new_height) / img.shape[0]
+        det_img = np.zeros((input_size[1], input_size[0], 3), dtype=np.uint8)
+        det_img[:new_height, :new_width, :] = cv2.resize(img, (new_width, new_height))
+        req.blob = cv2.dnn.blobFromImage(det_img, 1.0 / det.input_std, input_size,
+                                         (det.input_mean, det.input_mean, det.input_mean), swapRB=True)
+        req.input_size = input_size
+        req.image = None  # the scheduler only needs the blob
+
+    def submit(self, cam_id: str, images: List[np.ndarray],
+               input_size: Optional[Tuple[int, int]] = None) -> List[Future]:
+        """Queue images for one camera; all are prepared first and enqueued together, so the
+        tiles of one frame can land in the same batch."""
+        reqs = [_Request(cam_id, img, input_size) for img in images]
+        if self._native:
+            for req in reqs:
+                self._prepare(req, input_size)
+        with self._cond:
+            self._queues.setdefault(cam_id, deque()).extend(reqs)
+            self._pending += len(reqs)
+            self._cond.notify_all()
+        return [req.future for req in reqs]
+
+    def detect_many(self, cam_id: str, images: List[np.ndarray], timeout: float = 10.0,
+                    input_size: Optional[Tuple[int, int]] = None) -> list:
+        """(bboxes, kpss) for each image, like det.detect(). Runs inline on the calling thread if
+        the scheduler is down or the model cannot batch; a request that fails or times out in the
+        scheduler is retried once inline (a second failure raises)."""
+        if not self.running or not self._batched:
+            self.inline_calls += len(images)
+            return [self._detect_inline(cam_id, img, input_size) for img in images]
+        futures = self.submit(cam_id, images, input_size)
+        results = []
+        for img, future in zip(images, futures):
+            try:
+                outs, det_scale, size = future.result(timeout=timeout)
+                results.append(self._decode(outs, det_scale, size) if self._native else outs)
+            except Exception as e:
+                self.retries += 1
+                print(f"⚠️ Scheduled detection for {cam_id} failed ({type(e).__name__}: {e}), retrying inline")
+                results.append(self.det.detect(img, input_size=input_size, max_num=0, metric='default'))
+        return results
+
+    def _detect_inline(self, cam_id: str, img: np.ndarray, input_size: Optional[Tuple[int, int]]):
+        result = self.det.detect(img, input_size=input_size, max_num=0, metric='default')
+        self.served[cam_id] = self.served.get(cam_id, 0) + 1
+        return result
+
+    def _decode(self, outs: list, det_scale: float, input_size: Tuple[int, int]):
+        """SCRFD.forward()'s anchor decoding plus detect()'s NMS, for one image's outputs."""
+        det = self.det
+        fmc = det.fmc
+        threshold = det.det_thresh
+        input_width, input_height = input_size
+        scores_list, bboxes_list, kpss_list = [], [], []
+        for idx, stride in enumerate(det._feat_stride_fpn):
+            scores = outs[idx]
+            bbox_preds = outs[idx + fmc] * stride
+            height, width = input_height // stride, input_width // stride
+            key = (height, width, stride)
+            anchor_centers = det.center_cache.get(key)
+            if anchor_centers is None:
+                anchor_centers = np.stack(np.mgrid[:height, :width][::-1], axis=-1).astype(np.float32)
+                anchor_centers = (anchor_centers * stride).reshape((-1, 2))
+                if det._num_anchors > 1:
+                    anchor_centers = np.stack([anchor_centers] * det._num_anchors, axis=1).reshape((-1, 2))
+                if len(det.center_cache) < 100:
+                    det.center_cache[key] = anchor_centers
+            pos_inds = np.where(scores >= threshold)[0]
+            scores_list.append(scores[pos_inds])
+            bboxes_list.append(_distance2bbox(anchor_centers, bbox_preds)[pos_inds])
+            if det.use_kps:
+                kps_preds = outs[idx + fmc * 2] * stride
+                kpss = _distance2kps(anchor_centers, kps_preds)
+                kpss_list.append(kpss.reshape((kpss.shape[0], -1, 2))[pos_inds])
+        scores = np.vstack(scores_list)
+        order = scores.ravel().argsort()[::-1]
+        bboxes = np.vstack(bboxes_list) / det_scale
+        pre_det = np.hstack((bboxes, scores)).astype(np.float32, copy=False)[order, :]
+        keep = det.nms(pre_det)
+        kpss = None
+        if det.use_kps:
+            kpss = (np.vstack(kpss_list) / det_scale)[order, :, :][keep, :, :]
+        return pre_det[keep, :], kpss
+
+    # -- scheduler side ----------------------------------------------------
+
+    def _take_batch(self) -> List[_Request]:
+        """Round-robin over cameras: one request per camera per pass until the batch is full."""
+        batch: List[_Request] = []
+        while len(batch) < self.max_batch and self._pending:
+            for cam_id in list(self._queues):
+                q = self._queues[cam_id]
+                batch.append(q.popleft())
+                self._pending -= 1
+                # served cameras go to the back, so the next batch starts with the others
+                if q:
+                    self._queues.move_to_end(cam_id)
+                else:
+                    del self._queues[cam_id]
+                if len(batch) >= self.max_batch:
+                    break
+        return batch
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._stop)
+                if self._stop:
+                    break
+                # Give other cameras max_wait to join the batch, unless it is already full
+                # (or the model runs one request per call anyway)
+                oldest = min(q[0].queued_at for q in self._queues.values())
+                deadline = oldest + self.max_wait_s
+                while self._batched and self._pending < self.max_batch and not self._stop:
+                    left = deadline - time.time()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+                batch = self._take_batch()
+            if batch:
+                self._run(batch)
+        with self._cond:
+            # fail whatever is left so no worker waits on it forever
+            for q in self._queues.values():
+                for req in q:
+                    req.future.set_exception(RuntimeError('inference service stopped'))
+            self._queues.clear()
+            self._pending = 0
+
+    def _run(self, batch: List[_Request]):
+        started = time.time()
+        try:
+            if not self._native:
+                for req in batch:
+                    req.future.set_result((self.det.detect(req.image, input_size=req.input_size, max_num=0,
+                                                           metric='default'), 1.0, None))
+            elif self._batched:
+                # one run per input size (cameras may use different detector sizes)
+                groups: Dict[tuple, List[_Request]] = {}
+                for req in batch:
+                    groups.setdefault(req.input_size, []).append(req)
+                for size, reqs in groups.items():
+                    try:
+                        blob = np.concatenate([r.blob for r in reqs]) if len(reqs) > 1 else reqs[0].blob
+                        net_outs = self.det.session.run(self.det.output_names, {self.det.input_name: blob})
+                    except Exception as e:
+                        # only this size group fails; its callers retry inline
+                        for req in reqs:
+                            req.future.set_exception(e)
+                        continue
+                    for i, req in enumerate(reqs):
+                        req.future.set_result(([out[i] for out in net_outs], req.det_scale, size))
+            else:
+                for req in batch:
+                    net_outs = self.det.session.run(self.det.output_names, {self.det.input_name: req.blob})
+                    req.future.set_result((net_outs, req.det_scale, req.input_size))
+        except Exception as e:
+            for req in batch:
+                if not req.future.done():
+                    req.future.set_exception(e)
+        done = time.time()
+        self.batches += 1
+        self.items += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        self.run_ms_total += (done - started) * 1000
+        for req in batch:
+            self.wait_ms_total += (started - req.queued_at) * 1000
+            self.served[req.cam_id] = self.served.get(req.cam_id, 0) + 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            queued = {cam_id: len(q) for cam_id, q in self._queues.items()}
+        return {
+            'running': self.running,
+            # batched: one session.run per scheduled batch; inline: callers run the model on their
+            # own threads concurrently (no batch dimension, or not SCRFD-like)
+            'mode': 'batched' if self._batched else 'inline',
+            'inline_calls': self.inline_calls,
+            'retries': self.retries,
+            'max_batch': self.max_batch,
+            'max_wait_ms': round(self.max_wait_s * 1000, 2),
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'max_batch_seen': self.max_batch_seen,
+            'avg_queue_ms': round(self.wait_ms_total / self.items, 2) if self.items else 0.0,
+            'avg_run_ms': round(self.run_ms_total / self.batches, 2) if self.batches else 0.0,
+            'queued': queued,
+            'served': dict(self.served),
+        }
+
+
+def recognition_batch_size(rec, max_batch: int) -> int:
+    """Chips per forward pass the recognition model accepts: max_batch for a dynamic batch
+    dimension, 1 for models exported with a fixed one (or without ArcFace internals)."""
+    if face_align is None or not all(hasattr(rec, a) for a in ('get_feat', 'input_size', 'input_shape')):
+        return 1
+    dim = rec.input_shape[0]
+    return 1 if isinstance(dim, int) and dim > 0 else max(1, int(max_batch))
+
+
+def embed_faces(rec, items: List[Tuple[np.ndarray, object]], max_batch: int = 32) -> int:
+    """Set face.embedding for (image, face) pairs, as rec.get(image, face) would.
+
+    Chips are aligned on the caller's thread and embedded max_batch at a time, so faces
+    from several frames can share one forward pass. Returns the number of model calls.
+    """
+    batch = recognition_batch_size(rec, max_batch)
+    if batch == 1:
+        for img, face in items:
+            rec.get(img, face)
+        return len(items)
+    size = rec.input_size[0]
+    calls = 0
+    for start in range(0, len(items), batch):
+        chunk = items[start:start + batch]
+        chips = [face_align.norm_crop(img, landmark=face.kps, image_size=size) for img, face in chunk]
+        feats = rec.get_feat(chips)
+        for (_, face), feat in zip(chunk, feats):
+            face.embedding = feat.flatten()
+        calls += 1
+    return calls
@@ -0,0 +1,408 @@
+"""CPU inference process pool: detection and recognition outside the app's GIL.
+
+On CPU-only boxes every camera and API call shares the app's one FaceAnalysis,
+and Python threads serialize around it while each ONNX session spreads over all
+cores. CpuInferencePool runs N child processes instead (this file is the child),
+each with its own FaceAnalysis whose sessions are limited to `threads` intra-op
+threads, so N x threads matches the core count and throughput scales with it.
+
+Each child owns one shared-memory segment with an input area and an output
+area. A request is a short line on the child's stdin and the reply a line on
+its stdout; pixels and results only go through shared memory:
+
+    detect  image (already letterboxed to the detector size)  ->  n x 15 float32
+            rows: x1, y1, x2, y2, score, 5 landmarks (x, y)
+    embed   n aligned 112 x 112 face chips                      ->  n x dim float32
+
+The parent does the cheap resizing and alignment, so a 4K frame crosses into
+shared memory at detector size and a face as a 112 x 112 chip.
+
+Kept free of Flask imports so the child process starts fast; the child imports
+insightface the way the app does.
+"""
+import argparse
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from frame_ring import _attach_untracked
+except ImportError:
+    from mizva.frame_ring import _attach_untracked
+
+try:
+    from insightface.utils import face_align  # type: ignore
+except Exception:
+    face_align = None
+
+CHIP_SIZE = 112        # ArcFace input (buffalo_l)
+MAX_EMB_DIM = 1024
+MAX_FACES = 512        # detections returned per image
+DET_ROW = 15           # x1, y1, x2, y2, score, 5 x (x, y)
+WORKER_START_TIMEOUT_S = 120.0  # model load on a busy CPU box
+REQUEST_TIMEOUT_S = 30.0
+
+
+def _letterbox_size(h: int, w: int, size: int) -> Tuple[int, int]:
+    """(height, width) SCRFD.detect() scales an h x w image to inside a size x size input."""
+    if float(h) / w > 1.0:
+        return size, int(size / (float(h) / w))
+    return int(size * (float(h) / w)), size
+
+
+class _PoolWorker:
+    """Parent-side handle of one child: its process and shared-memory areas."""
+
+    def __init__(self, index: int, threads: int, det_size: int, max_side: int, max_chips: int):
+        self.index = index
+        self.threads = threads
+        self.det_size = det_size
+        self.max_side = max_side
+        self.max_chips = max_chips
+        self.in_bytes = max(max_side * max_side * 3, max_chips * CHIP_SIZE * CHIP_SIZE * 3)
+        self.out_floats = max(MAX_FACES * DET_ROW, max_chips * MAX_EMB_DIM)
+        self.shm = shared_memory.SharedMemory(create=True, size=self.in_bytes + self.out_floats * 4)
+        self.proc: Optional[subprocess.Popen] = None
+        self._replies: 'queue.Queue[str]' = queue.Queue()
+        self.emb_dim = 0
+        self.requests = 0
+        self.busy_s = 0.0
+        self._stderr_tail: List[str] = []
+
+    def start(self, timeout: float = WORKER_START_TIMEOUT_S) -> bool:
+        cmd = [sys.executable, os.path.abspath(__file__),
+               '--shm', self.shm.name,
+               '--threads', str(self.threads),
+               '--det-size', str(self.det_size),
+               '--max-side', str(self.max_side),
+               '--max-chips', str(self.max_chips)]
+        env = dict(os.environ)
+        # numpy / OpenCV / OpenMP pools in the child stay within its share of the cores too
+        for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+            env[var] = str(self.threads)
+        self.proc = subprocess.Popen(cmd, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.PIPE, text=True, bufsize=1)
+        self._replies = queue.Queue()
+        threading.Thread(target=self._drain_stdout, args=(self.proc, self._replies), daemon=True).start()
+        threading.Thread(target=self._drain_stderr, daemon=True).start()
+        # the reply to start-up is "ready <emb_dim>" once the models are loaded
+        reply = self._readline(timeout)
+        if reply is None or not reply.startswith('ready'):
+            self.stop()
+            return False
+        self.emb_dim = int(reply.split()[1])
+        return True
+
+    def _drain_stderr(self):
+        proc = self.proc
+        if proc is None or proc.stderr is None:
+            return
+        for line in proc.stderr:
+            line = line.strip()
+            if line:
+                self._stderr_tail = (self._stderr_tail + [line])[-20:]
+
+    @staticmethod
+    def _drain_stdout(proc: subprocess.Popen, replies: 'queue.Queue[str]'):
+        for line in proc.stdout:  # type: ignore[union-attr]
+            replies.put(line.strip())
+        replies.put('')  # EOF: the child exited
+
+    def _readline(self, timeout: float) -> Optional[str]:
+        """One reply line; None if the child died or did not answer in time (it is then killed)."""
+        try:
+            line = self._replies.get(timeout=timeout)
+        except queue.Empty:
+            line = ''
+        if not line:
+            self.stop()
+            return None
+        return line
+
+    @property
+    def last_error(self) -> str:
+        return self._stderr_tail[-1] if self._stderr_tail else 'inference worker exited'
+
+    def is_alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def _request(self, line: str) -> int:
+        started = time.time()
+        try:
+            self.proc.stdin.write(line + '\n')  # type: ignore[union-attr]
+            self.proc.stdin.flush()  # type: ignore[union-attr]
+        except (OSError, ValueError, AttributeError):
+            self.stop()
+            raise RuntimeError(self.last_error)
+        reply = self._readline(REQUEST_TIMEOUT_S)
+        self.requests += 1
+        self.busy_s += time.time() - started
+        if reply is None:
+            raise RuntimeError(f'inference worker {self.index} stopped answering (last: {self.last_error})')
+        status, _, value = reply.partition(' ')
+        if status != 'ok':
+            raise RuntimeError(value or 'inference worker error')
+        return int(value)
+
+    def _input(self, shape: tuple) -> np.ndarray:
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    def _output(self, rows: int, cols: int) -> np.ndarray:
+        return np.ndarray((rows, cols), dtype=np.float32, buffer=self.shm.buf, offset=self.in_bytes)
+
+    def detect(self, img: np.ndarray, size: int):
+        """(bboxes n x 5, kpss n x 5 x 2) like det.detect(img, input_size=(size, size))."""
+        import cv2
+        h, w = img.shape[:2]
+        scale = 1.0
+        if max(h, w) > size:
+            # shrink to the letterboxed size here, so only detector-sized pixels are copied
+            nh, nw = _letterbox_size(h, w, size)
+            scale = float(nh) / h
+            img = cv2.resize(img, (nw, nh))
+            h, w = nh, nw
+        np.copyto(self._input((h, w, 3)), img)
+        n = self._request(f'detect {h} {w} {size}')
+        rows = self._output(n, DET_ROW).copy()
+        bboxes = rows[:, :5]
+        kpss = rows[:, 5:].reshape(n, 5, 2)
+        if scale != 1.0:
+            bboxes[:, :4] /= scale
+            kpss /= scale
+        return bboxes, kpss
+
+    def embed(self, chips: List[np.ndarray]) -> np.ndarray:
+        """Embeddings (n x dim) of aligned CHIP_SIZE face chips, n <= max_chips."""
+        np.copyto(self._input((len(chips), CHIP_SIZE, CHIP_SIZE, 3)), np.stack(chips))
+        n = self._request(f'embed {len(chips)}')
+        return self._output(n, self.emb_dim).copy()
+
+    def stop(self):
+        proc, self.proc = self.proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()  # type: ignore[union-attr]
+            proc.wait(timeout=2.0)
+        except Exception:
+            proc.kill()
+            try:
+                proc.wait(timeout=2.0)
+            except Exception:
+                pass
+
+    def close(self):
+        self.stop()
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except Exception:
+            pass
+
+
+class CpuInferencePool:
+    """N inference worker processes, each with its own model limited to `threads` intra-op threads.
+
+    Calls block the calling thread only (pipe I/O releases the GIL); each request goes to
+    whichever worker is idle. Workers start in the background: until one is ready,
+    running is False and callers use the in-process model. A worker that dies is restarted.
+    """
+
+    def __init__(self, workers: int, threads: int = 2, det_size: int = 640,
+                 max_side: int = 1024, max_chips: int = 32):
+        self.workers = max(1, int(workers))
+        self.threads = max(1, int(threads))
+        self.det_size = int(det_size)
+        self.max_side = int(max_side)
+        self.max_chips = max(1, int(max_chips))
+        self._idle: 'queue.Queue[_PoolWorker]' = queue.Queue()
+        self._all: List[_PoolWorker] = []
+        self._ready = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stopped = False
+        self.restarts = 0
+        self.failures = 0
+
+    def start(self):
+        if self._all:
+            return
+        self._stopped = False
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='cpu-pool')
+        for i in range(self.workers):
+            worker = _PoolWorker(i, self.threads, self.det_size, self.max_side, self.max_chips)
+            self._all.append(worker)
+            threading.Thread(target=self._launch, args=(worker,), daemon=True).start()
+
+    def _launch(self, worker: _PoolWorker):
+        if worker.start() and not self._stopped:
+            with self._lock:
+                self._ready += 1
+            self._idle.put(worker)
+        elif not self._stopped:
+            print(f"⚠️ CPU inference worker {worker.index} failed to start: {worker.last_error}")
+
+    def stop(self):
+        self._stopped = True
+        for worker in self._all:
+            worker.close()
+        self._all = []
+        self._ready = 0
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    @property
+    def running(self) -> bool:
+        return self._ready > 0 and not self._stopped
+
+    def _call(self, fn, *args):
+        """Run fn(worker, *args) on an idle worker; restarts the worker if it died on the way."""
+        worker = self._idle.get(timeout=REQUEST_TIMEOUT_S)
+        try:
+            return fn(worker, *args)
+        except RuntimeError:
+            self.failures += 1
+            raise
+        finally:
+            if worker.is_alive():
+                self._idle.put(worker)
+            elif not self._stopped:
+                with self._lock:
+                    self._ready -= 1
+                    self.restarts += 1
+                threading.Thread(target=self._launch, args=(worker,), daemon=True).start()
+
+    def detect_many(self, images: List[np.ndarray], input_size: Optional[Tuple[int, int]] = None) -> list:
+        """(bboxes, kpss) per image, like det.detect(); images run on the workers in parallel."""
+        size = int(input_size[0]) if input_size else self.det_size
+        if size > self.max_side:
+            raise ValueError(f'detector size {size} exceeds the pool maximum {self.max_side}')
+        if len(images) == 1:
+            return [self._call(_PoolWorker.detect, images[0], size)]
+        futures = [self._executor.submit(self._call, _PoolWorker.detect, img, size) for img in images]  # type: ignore[union-attr]
+        return [f.result() for f in futures]
+
+    def embed_faces(self, items: List[Tuple[np.ndarray, object]]) -> int:
+        """Set face.embedding for (image, face) pairs: chips are aligned here and embedded
+        max_chips at a time on the workers. Returns the number of worker requests."""
+        if face_align is None:
+            raise RuntimeError('insightface.utils.face_align is not available')
+        chips = [face_align.norm_crop(img, landmark=face.kps, image_size=CHIP_SIZE) for img, face in items]
+        chunks = [chips[i:i + self.max_chips] for i in range(0, len(chips), self.max_chips)]
+        if len(chunks) == 1:
+            feats = [self._call(_PoolWorker.embed, chunks[0])]
+        else:
+            futures = [self._executor.submit(self._call, _PoolWorker.embed, c) for c in chunks]  # type: ignore[union-attr]
+            feats = [f.result() for f in futures]
+        for (_, face), feat in zip(items, np.concatenate(feats)):
+            face.embedding = feat
+        return len(chunks)
+
+    def stats(self) -> Dict[str, object]:
+        workers = list(self._all)
+        return {
+            'running': self.running,
+            'workers': self.workers,
+            'ready': self._ready,
+            'idle': self._idle.qsize(),
+            'threads_per_worker': self.threads,
+            'requests': [w.requests for w in workers],
+            'busy_s': [round(w.busy_s, 2) for w in workers],
+            'restarts': self.restarts,
+            'failures': self.failures,
+        }
+
+
+def _limit_threads(fa, threads: int):
+    """Recreate the models' ONNX sessions on CPU with `threads` intra-op threads."""
+    import onnxruntime
+    opts = onnxruntime.SessionOptions()
+    opts.intra_op_num_threads = threads
+    opts.inter_op_num_threads = 1
+    opts.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    for model in fa.models.values():
+        if getattr(model, 'model_file', None) and getattr(model, 'session', None) is not None:
+            model.session = onnxruntime.InferenceSession(model.model_file, sess_options=opts,
+                                                         providers=['CPUExecutionProvider'])
+
+
+def worker_main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description='MizVa CPU inference worker process')
+    ap.add_argument('--shm', required=True)
+    ap.add_argument('--threads', type=int, default=2)
+    ap.add_argument('--det-size', type=int, default=640)
+    ap.add_argument('--max-side', type=int, default=1024)
+    ap.add_argument('--max-chips', type=int, default=32)
+    args = ap.parse_args(argv)
+
+    # replies go to the real stdout; everything else printed (model loading) goes to stderr
+    reply = os.fdopen(os.dup(1), 'w', buffering=1)
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    import cv2
+    cv2.setNumThreads(1)
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'insightface', 'python-package'))
+    from insightface.app import FaceAnalysis  # type: ignore
+
+    fa = FaceAnalysis(allowed_modules=['detection', 'recognition'], providers=['CPUExecutionProvider'])
+    fa.prepare(ctx_id=-1, det_size=(args.det_size, args.det_size))
+    try:
+        _limit_threads(fa, args.threads)
+    except Exception as e:
+        print(f'could not limit intra-op threads: {e}', file=sys.stderr)
+    det, rec = fa.det_model, fa.models['recognition']
+    if tuple(rec.input_size)[0] != CHIP_SIZE:
+        print(f'recognition input {rec.input_size} is not {CHIP_SIZE}x{CHIP_SIZE}', file=sys.stderr)
+        return 1
+
+    shm = _attach_untracked(args.shm)
+    in_bytes = max(args.max_side * args.max_side * 3, args.max_chips * CHIP_SIZE * CHIP_SIZE * 3)
+    out_floats = max(MAX_FACES * DET_ROW, args.max_chips * MAX_EMB_DIM)
+    buf = shm.buf
+    out = np.ndarray((out_floats,), dtype=np.float32, buffer=buf, offset=in_bytes)
+    emb_dim = int(rec.get_feat([np.zeros((CHIP_SIZE, CHIP_SIZE, 3), dtype=np.uint8)]).shape[1])
+    reply.write(f'ready {emb_dim}\n')
+    try:
+        for line in sys.stdin:
+            parts = line.split()
+            if not parts:
+                continue
+            try:
+                if parts[0] == 'detect':
+                    h, w, size = (int(v) for v in parts[1:4])
+                    img = np.ndarray((h, w, 3), dtype=np.uint8, buffer=buf)
+                    bboxes, kpss = det.detect(img, input_size=(size, size), max_num=0, metric='default')
+                    n = min(bboxes.shape[0], MAX_FACES)
+                    rows = out[:n * DET_ROW].reshape(n, DET_ROW)
+                    rows[:, :5] = bboxes[:n]
+                    rows[:, 5:] = kpss[:n].reshape(n, 10) if kpss is not None else 0.0
+                    reply.write(f'ok {n}\n')
+                elif parts[0] == 'embed':
+                    n = int(parts[1])
+                    chips = np.ndarray((n, CHIP_SIZE, CHIP_SIZE, 3), dtype=np.uint8, buffer=buf)
+                    feats = rec.get_feat(list(chips))
+                    out[:n * emb_dim] = np.asarray(feats, dtype=np.float32).ravel()
+                    reply.write(f'ok {n}\n')
+                else:
+                    reply.write(f'error unknown request {parts[0]}\n')
+            except Exception as e:
+                message = str(e).replace('\n', ' ')
+                reply.write(f'error {type(e).__name__}: {message}\n')
+    finally:
+        del out
+        shm.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(worker_main())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Load test: drive N synthetic/file "cameras" through a running MizVa server.
+
+Starts N cameras on the same source URL (synthetic://, file://, dir://, see
+mizva/frame_sources.py), lets them run, then prints per-camera and total
+throughput and latency from /api/rtsp/status and stops them again.
+
+Example:
+    python load_test.py --cameras 8 --url "synthetic://?width=1920&height=1080&fps=25&image=../../test.jpg"
+"""
+import argparse
+import sys
+import time
+
+import requests
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--server', default='http://127.0.0.1:5000')
+    ap.add_argument('--cameras', type=int, default=4)
+    ap.add_argument('--url', default='synthetic://?width=1920&height=1080&fps=25')
+    ap.add_argument('--fps', type=float, default=5.0, help='recognition fps per camera')
+    ap.add_argument('--mode', default='watchlist', help="'watchlist' needs a non-empty watchlist")
+    ap.add_argument('--duration', type=float, default=30.0)
+    ap.add_argument('--prefix', default='load')
+    args = ap.parse_args()
+
+    ids = [f'{args.prefix}-{i}' for i in range(args.cameras)]
+    for cam_id in ids:
+        r = requests.post(f'{args.server}/api/rtsp/start',
+                          data={'id': cam_id, 'url': args.url, 'fps': args.fps, 'mode': args.mode})
+        if r.status_code != 200:
+            print(f'{cam_id}: start failed: {r.status_code} {r.text}')
+            sys.exit(1)
+    print(f'Started {len(ids)} cameras on {args.url}, running {args.duration:.0f}s...')
+
+    try:
+        time.sleep(args.duration)
+        total_frames = 0
+        print(f'{"camera":<12} {"health":<12} {"frames":>8} {"processed":>9} {"fps":>6} {"queue p50":>10} {"e2e p50":>8}')
+        for cam_id in ids:
+            st = requests.get(f'{args.server}/api/rtsp/status/{cam_id}').json()
+            lat = st.get('latency_ms', {})
+            queue_p50 = lat.get('queue', {}).get('p50')
+            e2e_p50 = lat.get('capture_to_publish', {}).get('p50')
+            total_frames += st.get('frames_captured', 0)
+            print(f'{cam_id:<12} {st.get("health", "?"):<12} {st.get("frames_captured", 0):>8} '
+                  f'{st.get("frames_processed", "-"):>9} {st.get("effective_fps", 0):>6} '
+                  f'{queue_p50 if queue_p50 is not None else "-":>10} {e2e_p50 if e2e_p50 is not None else "-":>8}')
+        print(f'Total captured: {total_frames} frames, {total_frames / args.duration:.1f} fps aggregate')
+    finally:
+        for cam_id in ids:
+            requests.post(f'{args.server}/api/rtsp/stop', json={'id': cam_id})
+
+
+if __name__ == '__main__':
+    main()
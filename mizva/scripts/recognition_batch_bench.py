@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Benchmark: per-face recognition cost versus recognition batch size.
+
+Detects the faces in an image, repeats them up to --faces (a crowded frame),
+then embeds them with mizva.inference.embed_faces at each batch size and prints
+the model calls and the time per face. Batch size 1 is the old per-face path.
+
+Example:
+    python recognition_batch_bench.py --image ../../test.jpg --faces 32 --batches 1,4,8,16,32
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Ensure project root (two levels up) is on sys.path when running as a script
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from insightface.app import FaceAnalysis  # noqa: E402
+from mizva.inference import embed_faces, recognition_batch_size  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--image', default=str(ROOT / 'test.jpg'))
+    ap.add_argument('--faces', type=int, default=32, help='faces per simulated frame')
+    ap.add_argument('--batches', default='1,2,4,8,16,32')
+    ap.add_argument('--repeat', type=int, default=10, help='timed runs per batch size')
+    ap.add_argument('--ctx', type=int, default=-1, help='0 = GPU, -1 = CPU')
+    args = ap.parse_args()
+
+    img = cv2.imread(args.image)
+    if img is None:
+        print(f'Failed to load {args.image}')
+        sys.exit(1)
+    fa = FaceAnalysis(allowed_modules=['detection', 'recognition'])
+    fa.prepare(ctx_id=args.ctx, det_size=(640, 640))
+    rec = fa.models['recognition']
+    bboxes, kpss = fa.det_model.detect(img, max_num=0, metric='default')
+    if bboxes.shape[0] == 0 or kpss is None:
+        print('No face with landmarks in the image')
+        sys.exit(1)
+    print(f'{bboxes.shape[0]} face(s) in {args.image}, repeated to {args.faces}; '
+          f'model batch dimension: {rec.input_shape[0]}')
+
+    class _Face:  # what embed_faces needs from an insightface Face
+        def __init__(self, kps):
+            self.kps = kps
+            self.embedding = None
+
+    items = [(img, _Face(kpss[i % bboxes.shape[0]])) for i in range(args.faces)]
+    embed_faces(rec, items, 1)  # warm-up (session init, allocations)
+    reference = [face.embedding.copy() for _, face in items]
+
+    print(f'{"batch":>6} {"calls":>6} {"ms/frame":>9} {"ms/face":>8} {"speedup":>8} {"max diff":>9}')
+    base = None
+    for batch in [int(b) for b in args.batches.split(',') if b.strip()]:
+        effective = recognition_batch_size(rec, batch)
+        embed_faces(rec, items, batch)
+        times = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            calls = embed_faces(rec, items, batch)
+            times.append(time.perf_counter() - started)
+        ms = float(np.median(times)) * 1000
+        base = base or ms
+        diff = max(float(np.abs(face.embedding - ref).max()) for (_, face), ref in zip(items, reference))
+        note = '' if effective == batch else f'  (model runs batch {effective})'
+        print(f'{batch:>6} {calls:>6} {ms:>9.2f} {ms / len(items):>8.3f} {base / ms:>7.2f}x {diff:>9.2e}{note}')
+
+
+if __name__ == '__main__':
+    main()
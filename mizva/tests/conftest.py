@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# The app's modules sit next to each other in mizva/ and import each other flat
+# (mizva/mizva is a different package), so tests import them the same way
+APP_DIR = Path(__file__).resolve().parents[1]
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import pytest
+
+from camera_schedule import (CameraSchedule, SCHEDULE_ACTIVE, SCHEDULE_REDUCED, SCHEDULE_SNAPSHOT,
+                             parse_schedule)
+
+# 2024-01-01 is a Monday
+MON, TUE, SUN = 1, 2, 7
+
+
+def at(day, hh, mm=0):
+    return datetime(2024, 1, day, hh, mm)
+
+
+def night_shift(days='mon'):
+    return CameraSchedule(parse_schedule({'windows': [{'days': days, 'start': '22:00', 'end': '06:00'}]}))
+
+
+def test_window_runs_past_midnight():
+    sched = night_shift()
+    assert not sched.is_open(at(MON, 21, 59))
+    assert sched.is_open(at(MON, 22))
+    assert sched.is_open(at(MON, 23, 30))
+    assert sched.is_open(at(TUE, 2))
+    assert not sched.is_open(at(TUE, 6))
+
+
+def test_window_belongs_to_the_day_it_starts():
+    sched = night_shift()
+    # Monday's early hours are Sunday's window, which is not scheduled
+    assert not sched.is_open(at(MON, 2))
+    assert not sched.is_open(at(TUE, 22, 30))
+    assert not sched.is_open(at(SUN, 23))
+
+
+def test_state_outside_windows():
+    assert night_shift().state(at(MON, 12)) == SCHEDULE_SNAPSHOT
+    assert night_shift().state(at(MON, 23)) == SCHEDULE_ACTIVE
+    reduced = CameraSchedule(parse_schedule({'windows': [{'start': '08:00', 'end': '18:00'}],
+                                             'outside': 'reduced', 'outside_fps': 0.2}))
+    assert reduced.state(at(SUN, 7)) == SCHEDULE_REDUCED
+    assert reduced.outside_fps == 0.2
+
+
+def test_today_lists_windows_starting_today():
+    assert night_shift().today(at(MON, 9)) == [['22:00', '06:00']]
+    assert night_shift().today(at(TUE, 9)) == []
+
+
+def test_day_ranges_wrap_around_the_week():
+    spec = parse_schedule({'windows': [{'days': 'fri-mon', 'start': '00:00', 'end': '24:00'}]})
+    assert spec['windows'][0]['days'] == [0, 4, 5, 6]
+
+
+@pytest.mark.parametrize('value', [
+    {'windows': []},
+    {'windows': [{'start': '08:00', 'end': '08:00'}]},
+    {'windows': [{'start': '08:00'}]},
+    {'windows': [{'start': '25:00', 'end': '26:00'}]},
+    {'windows': [{'days': 'someday', 'start': '08:00', 'end': '09:00'}]},
+    {'windows': [{'start': '08:00', 'end': '09:00'}], 'outside': 'off'},
+    {'windows': [{'start': '08:00', 'end': '09:00'}], 'outside': 'reduced', 'outside_fps': 0},
+])
+def test_invalid_schedules_are_rejected(value):
+    with pytest.raises(ValueError):
+        parse_schedule(value)
+
+
+def test_empty_schedule_means_none():
+    assert parse_schedule(None) is None
+    assert parse_schedule('') is None
@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from face_boxes import merge_faces
+
+
+def face(x1, y1, x2, y2, score=0.9):
+    return SimpleNamespace(bbox=np.array([x1, y1, x2, y2], dtype=np.float32), det_score=score)
+
+
+def test_merge_faces_keeps_the_best_of_overlapping_detections():
+    best = face(0, 0, 100, 100, score=0.9)
+    dup = face(5, 5, 105, 105, score=0.6)
+    other = face(300, 0, 400, 100, score=0.5)
+    assert merge_faces([dup, other, best], iou_threshold=0.4) == [best, other]
+
+
+def test_merge_faces_drops_a_face_cut_at_a_tile_edge():
+    whole = face(0, 0, 100, 100, score=0.9)
+    half = face(50, 0, 100, 100, score=0.95)  # IoU 0.5 is under the threshold, but it is inside
+    assert merge_faces([whole, half], iou_threshold=0.6) == [half]
+
+
+def test_merge_faces_leaves_single_and_empty_lists_alone():
+    f = face(0, 0, 10, 10)
+    assert merge_faces([f], 0.4) == [f]
+    assert merge_faces([], 0.4) == []
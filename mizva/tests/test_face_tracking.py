@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from face_tracking import FaceTracker, box_iou
+
+
+def face(x1, y1, x2, y2, score=0.9):
+    return SimpleNamespace(bbox=np.array([x1, y1, x2, y2], dtype=np.float32), det_score=score)
+
+
+def test_box_iou():
+    a = np.array([0, 0, 10, 10], dtype=np.float32)
+    assert box_iou(a, a) == pytest.approx(1.0)
+    assert box_iou(a, np.array([10, 0, 20, 10])) == 0.0
+    assert box_iou(a, np.array([5, 0, 15, 10])) == pytest.approx(50 / 150)
+
+
+def test_tracks_follow_faces_by_iou():
+    tracker = FaceTracker()
+    a, b = tracker.update([face(0, 0, 100, 100), face(300, 0, 400, 100)], ts=0.0)
+    assert a.id != b.id
+    # Same faces, listed the other way round and slightly moved
+    b2, a2 = tracker.update([face(305, 0, 405, 100), face(5, 0, 105, 100)], ts=0.1)
+    assert (a2, b2) == (a, b)
+    assert a.hits == 2
+    # A face nowhere near an existing track starts a new one
+    (c,) = tracker.update([face(600, 600, 700, 700)], ts=0.2)
+    assert c.id not in (a.id, b.id)
+
+
+def test_velocity_keeps_fast_faces_on_their_track():
+    tracker = FaceTracker()
+    (t,) = tracker.update([face(0, 0, 100, 100)], ts=0.0)
+    tracker.update([face(40, 0, 140, 100)], ts=0.1)
+    # 60 px on the next step: the last box no longer overlaps enough, the predicted one does
+    assert box_iou(np.array([40, 0, 140, 100]), np.array([100, 0, 200, 100])) < FaceTracker.IOU_MIN
+    (t3,) = tracker.update([face(100, 0, 200, 100)], ts=0.2)
+    assert t3 is t
+
+
+def test_unseen_tracks_expire():
+    tracker = FaceTracker()
+    (t,) = tracker.update([face(0, 0, 100, 100)], ts=0.0)
+    tracker.update([], ts=FaceTracker.MAX_AGE_S + 0.1)
+    assert tracker.tracks == []
+    (t2,) = tracker.update([face(0, 0, 100, 100)], ts=FaceTracker.MAX_AGE_S + 0.2)
+    assert t2.id != t.id
+
+
+def test_identity_confirms_after_agreeing_recognitions_and_refreshes():
+    tracker = FaceTracker(refresh_s=2.0)
+    params = object()
+    (t,) = tracker.update([face(0, 0, 100, 100)], ts=0.0)
+    assert tracker.needs_recognition(t, 0.0, params)
+    alice = (0.8, True, 1, 'alice')
+    tracker.record(t, 0.0, np.zeros(512), alice, params)
+    assert not t.confirmed
+    assert tracker.needs_recognition(t, 0.1, params)
+    tracker.record(t, 0.1, np.zeros(512), alice, params)
+    assert t.confirmed
+    assert not tracker.needs_recognition(t, 0.2, params)
+    # Refresh interval elapsed, or the camera's matching settings changed
+    assert tracker.needs_recognition(t, 2.1, params)
+    assert tracker.needs_recognition(t, 0.2, object())
+
+
+def test_disagreeing_recognition_restarts_the_streak():
+    tracker = FaceTracker()
+    params = object()
+    (t,) = tracker.update([face(0, 0, 100, 100)], ts=0.0)
+    tracker.record(t, 0.0, np.zeros(512), (0.8, True, 1, 'alice'), params)
+    tracker.record(t, 0.1, np.zeros(512), (0.8, True, 1, 'alice'), params)
+    tracker.record(t, 0.2, np.zeros(512), (0.7, True, 2, 'bob'), params)
+    assert t.streak == 1
+    assert not t.confirmed
+    assert tracker.needs_recognition(t, 0.3, params)
@@ -0,0 +1,35 @@
+import pytest
+
+from frame_ring import PtsClock
+
+
+def test_offset_anchors_on_the_least_buffered_frame():
+    clock = PtsClock()
+    assert clock.stamp(0, recv_ts=100.3) == pytest.approx(100.3)
+    # Arrived with less delay than the first frame: it becomes the anchor
+    assert clock.stamp(40, recv_ts=100.2) == pytest.approx(100.2)
+    # A late frame keeps the anchor, so its stamp is earlier than its arrival
+    assert clock.stamp(80, recv_ts=100.9) == pytest.approx(100.24)
+
+
+def test_pts_wrap_restarts_the_mapping():
+    clock = PtsClock()
+    clock.stamp(95_000_000, recv_ts=500.0)
+    clock.stamp(95_000_040, recv_ts=500.04)
+    # 33-bit PTS wrapped (or the camera restarted its clock): stamps follow the receive time
+    assert clock.stamp(10, recv_ts=500.08) == pytest.approx(500.08)
+    assert clock.stamp(50, recv_ts=500.13) == pytest.approx(500.12)
+
+
+def test_forward_jump_restarts_the_mapping():
+    clock = PtsClock()
+    clock.stamp(0, recv_ts=10.0)
+    assert clock.stamp((PtsClock.MAX_JUMP_S + 5) * 1000, recv_ts=10.1) == pytest.approx(10.1)
+
+
+def test_missing_pts_uses_receive_time():
+    clock = PtsClock()
+    clock.stamp(0, recv_ts=10.0)
+    assert clock.stamp(None, recv_ts=10.5) == 10.5
+    assert clock.stamp(-1, recv_ts=10.6) == 10.6
+    assert clock.offset is None
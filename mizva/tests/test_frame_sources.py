@@ -0,0 +1,24 @@
+import pytest
+
+from frame_sources import FrameSource, SyntheticSource
+
+
+def test_frame_source_is_abstract():
+    with pytest.raises(TypeError):
+        FrameSource()
+
+    class OpenOnly(FrameSource):
+        def open(self):
+            return True, 'ok'
+
+    with pytest.raises(TypeError):
+        OpenOnly()
+
+
+def test_synthetic_source_reads_frames():
+    src = SyntheticSource(width=64, height=48, fps=0)
+    ok, info = src.open()
+    assert ok, info
+    ok, frame = src.read()
+    assert ok and frame.shape == (48, 64, 3)
+    src.release()